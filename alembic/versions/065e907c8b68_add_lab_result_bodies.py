@@ -0,0 +1,102 @@
+"""add lab_result_bodies (compressed large lab results) and result_summary/result_size
+
+Revision ID: 065e907c8b68
+Revises: 9b6116de9b6a
+Create Date: 2026-10-19 18:47:05.201337
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '065e907c8b68'
+down_revision: Union[str, Sequence[str], None] = '9b6116de9b6a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 500
+
+# copia congelada de lab_bodies.split_result con los límites de esta migración (no se leen
+# de settings: el backfill no depende de la configuración del momento en que se corre)
+_INLINE_BYTES = 4096
+_SUMMARY_CHARS = 200
+
+
+def _split_result(text: str) -> tuple[dict, bytes | None]:
+    raw = text.encode("utf-8")
+    flat = " ".join(text.split())
+    summary = flat if len(flat) <= _SUMMARY_CHARS else flat[:_SUMMARY_CHARS - 1].rstrip() + "…"
+    cols = {"result_summary": summary, "result_size": len(raw)}
+    if len(raw) <= _INLINE_BYTES:
+        return {**cols, "result": text}, None
+    return {**cols, "result": ""}, zlib.compress(raw, 6)
+
+
+def upgrade() -> None:
+    op.add_column("lab_results", sa.Column("result_summary", sa.String(length=255), nullable=False, server_default=""))
+    op.add_column("lab_results", sa.Column("result_size", sa.Integer(), nullable=False, server_default="0"))
+    op.create_table(
+        "lab_result_bodies",
+        sa.Column("lab_id", sa.String(length=36), sa.ForeignKey("lab_results.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("encoding", sa.String(length=8), nullable=False),
+        sa.Column("body", sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), nullable=False),
+    )
+
+    # backfill por lotes (keyset por id): resumen y tamaño de todos, y los grandes se comprimen
+    labs = sa.table(
+        "lab_results",
+        sa.column("id", sa.String), sa.column("result", sa.Text),
+        sa.column("result_summary", sa.String), sa.column("result_size", sa.Integer),
+    )
+    bodies = sa.table(
+        "lab_result_bodies",
+        sa.column("lab_id", sa.String), sa.column("encoding", sa.String), sa.column("body", sa.LargeBinary),
+    )
+    conn = op.get_bind()
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(labs.c.id, labs.c.result)
+            .where(labs.c.id > last_id)
+            .order_by(labs.c.id)
+            .limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        updates, new_bodies = [], []
+        for r in rows:
+            cols, body = _split_result(r.result or "")
+            updates.append({"b_id": r.id, **cols})
+            if body is not None:
+                new_bodies.append({"lab_id": r.id, "encoding": "zlib", "body": body})
+        if new_bodies:
+            conn.execute(bodies.insert(), new_bodies)
+        conn.execute(
+            labs.update()
+            .where(labs.c.id == sa.bindparam("b_id"))
+            .values(
+                result=sa.bindparam("result"),
+                result_summary=sa.bindparam("result_summary"),
+                result_size=sa.bindparam("result_size"),
+            ),
+            updates,
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    # devuelve los cuerpos comprimidos a lab_results.result antes de borrar la tabla
+    conn = op.get_bind()
+    for lab_id, body in conn.execute(sa.text("SELECT lab_id, body FROM lab_result_bodies")).all():
+        conn.execute(
+            sa.text("UPDATE lab_results SET result = :result WHERE id = :id"),
+            {"result": zlib.decompress(body).decode("utf-8"), "id": lab_id},
+        )
+    op.drop_table("lab_result_bodies")
+    op.drop_column("lab_results", "result_size")
+    op.drop_column("lab_results", "result_summary")
@@ -0,0 +1,40 @@
+"""add appointment busy-interval indexes
+
+Revision ID: 6749cc4679e7
+Revises: 3aa9e2917cb8
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6749cc4679e7'
+down_revision: Union[str, Sequence[str], None] = '3aa9e2917cb8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Solapamientos del doctor en cualquier clínica (check de cada reserva)
+    op.create_index(
+        "ix_appt_doctor_busy",
+        "appointments",
+        ["doctor_id", "starts_at", "ends_at"],
+        unique=False,
+    )
+    # Solapamientos del paciente en cualquier clínica
+    op.create_index(
+        "ix_appt_patient_busy",
+        "appointments",
+        ["patient_id", "starts_at", "ends_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_appt_patient_busy", table_name="appointments")
+    op.drop_index("ix_appt_doctor_busy", table_name="appointments")
@@ -0,0 +1,112 @@
+"""add search_terms (prefix index for the doctor directory)
+
+Revision ID: 6cb291aa36a4
+Revises: edd710d3992b
+Create Date: 2026-10-19 19:52:10.331870
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6cb291aa36a4'
+down_revision: Union[str, Sequence[str], None] = 'edd710d3992b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 500
+
+# copia congelada de text_search.tokenize y search_index.entity_terms a la fecha de esta
+# migración: un cambio posterior al tokenizador no tiene que cambiar lo que hace el backfill
+DOCTOR = "doctor"
+TERM_MAX = 64
+_STOPWORDS = frozenset("""
+a al algo como con de del e el en entre es esta este la las lo los mas me mi no o para
+pero por que se sin su sus un una uno unos unas y ya
+""".split())
+_WORD = re.compile(r"\w+")
+
+
+def _fold(text: str) -> str:
+    out = []
+    for ch in text:
+        base = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c)).lower()
+        out.append(base if len(base) == 1 else ch)
+    return "".join(out)
+
+
+def _tokenize(text: str) -> list[str]:
+    return [w for w in _WORD.findall(_fold(text)) if len(w) > 1 and w not in _STOPWORDS]
+
+
+def _entity_terms(entity_type: str, entity_id: str, fields: dict[str, list[str | None]]) -> list[dict]:
+    rows = set()
+    for field_name, texts in fields.items():
+        for text in texts:
+            for t in _tokenize(text or ""):
+                rows.add((t[:TERM_MAX], field_name))
+    return [
+        {"entity_type": entity_type, "entity_id": entity_id, "term": t, "field": f}
+        for t, f in sorted(rows)
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_terms",
+        sa.Column("entity_type", sa.String(length=16), primary_key=True),
+        sa.Column(
+            "term", sa.String(length=64).with_variant(mysql.VARCHAR(64, collation="utf8mb4_bin"), "mysql"),
+            primary_key=True,
+        ),
+        sa.Column("entity_id", sa.String(length=36), primary_key=True),
+        sa.Column("field", sa.String(length=16), primary_key=True),
+    )
+    op.create_index("ix_search_term_entity", "search_terms", ["entity_type", "entity_id"])
+
+    # backfill de doctores por lotes (keyset por id)
+    doctors = sa.table("doctors", sa.column("id", sa.String), sa.column("name", sa.String), sa.column("specialty", sa.String))
+    clinics = sa.table("clinics", sa.column("id", sa.String), sa.column("name", sa.String))
+    links = sa.table("clinic_doctors", sa.column("clinic_id", sa.String), sa.column("doctor_id", sa.String))
+    terms = sa.table(
+        "search_terms",
+        sa.column("entity_type", sa.String), sa.column("term", sa.String),
+        sa.column("entity_id", sa.String), sa.column("field", sa.String),
+    )
+    conn = op.get_bind()
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(doctors.c.id, doctors.c.name, doctors.c.specialty)
+            .where(doctors.c.id > last_id)
+            .order_by(doctors.c.id)
+            .limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        clinic_names: dict[str, list[str]] = {}
+        for doctor_id, name in conn.execute(
+            sa.select(links.c.doctor_id, clinics.c.name)
+            .join(clinics, clinics.c.id == links.c.clinic_id)
+            .where(links.c.doctor_id.in_([r.id for r in rows]))
+        ):
+            clinic_names.setdefault(doctor_id, []).append(name)
+        new_terms = []
+        for r in rows:
+            new_terms += _entity_terms(DOCTOR, r.id, {
+                "name": [r.name], "specialty": [r.specialty], "clinic": clinic_names.get(r.id, []),
+            })
+        if new_terms:
+            conn.execute(terms.insert(), new_terms)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.drop_index("ix_search_term_entity", table_name="search_terms")
+    op.drop_table("search_terms")
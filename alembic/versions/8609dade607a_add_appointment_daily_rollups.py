@@ -0,0 +1,61 @@
+"""add appointment_daily_rollups (analítica de ocupación)
+
+Revision ID: 8609dade607a
+Revises: 935835dfeeb5
+Create Date: 2026-10-19 13:02:55.104822
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8609dade607a'
+down_revision: Union[str, Sequence[str], None] = '935835dfeeb5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "appointment_daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("doctor_id", sa.String(length=36), primary_key=True),
+        sa.Column("clinic_id", sa.String(length=36), primary_key=True),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancelled", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("booked_minutes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("virtual_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("presencial_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_rollup_clinic_day", "appointment_daily_rollups", ["clinic_id", "day"], unique=False)
+    op.create_index("ix_rollup_doctor_day", "appointment_daily_rollups", ["doctor_id", "day"], unique=False)
+
+    # backfill de toda la historia con un solo INSERT ... SELECT agrupado
+    if op.get_bind().dialect.name == "sqlite":
+        minutes = "CAST(ROUND((julianday(ends_at) - julianday(starts_at)) * 1440) AS INTEGER)"
+    else:
+        minutes = "TIMESTAMPDIFF(MINUTE, starts_at, ends_at)"
+    op.execute(f"""
+        INSERT INTO appointment_daily_rollups
+            (day, doctor_id, clinic_id, total, cancelled, booked_minutes, virtual_count, presencial_count, updated_at)
+        SELECT
+            DATE(starts_at), doctor_id, clinic_id,
+            COUNT(*),
+            SUM(CASE WHEN status = 'cancelled' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status <> 'cancelled' THEN {minutes} ELSE 0 END),
+            SUM(CASE WHEN status <> 'cancelled' AND type = 'virtual' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status <> 'cancelled' AND type = 'presencial' THEN 1 ELSE 0 END),
+            CURRENT_TIMESTAMP
+        FROM appointments
+        GROUP BY DATE(starts_at), doctor_id, clinic_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rollup_doctor_day", table_name="appointment_daily_rollups")
+    op.drop_index("ix_rollup_clinic_day", table_name="appointment_daily_rollups")
+    op.drop_table("appointment_daily_rollups")
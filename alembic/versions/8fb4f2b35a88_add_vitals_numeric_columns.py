@@ -0,0 +1,129 @@
+"""add numeric representation to vitals (metric_code, num_value, num_value2, unit)
+
+Revision ID: 8fb4f2b35a88
+Revises: 8609dade607a
+Create Date: 2026-10-19 14:11:32.406187
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8fb4f2b35a88'
+down_revision: Union[str, Sequence[str], None] = '8609dade607a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 1000
+
+# copia congelada de vitals_parse.parse_vital (alias, unidades y conversiones) a la fecha de
+# esta migración: agregar alias o cambiar conversiones después no cambia este backfill.
+# código -> (unidad canónica, alias, {unidad: (factor, offset)}, par "a/b")
+_F_TO_C = (5 / 9, -160 / 9)
+_METRICS = {
+    "bp": ("mmHg", ("ta", "pa", "presion arterial", "tension arterial", "presion", "bp", "blood pressure"),
+           {"mmhg": (1, 0), "kpa": (7.50062, 0), "cmhg": (10, 0)}, True),
+    "hr": ("bpm", ("fc", "frecuencia cardiaca", "pulso", "hr", "heart rate"),
+           {"bpm": (1, 0), "lpm": (1, 0), "/min": (1, 0), "x'": (1, 0)}, False),
+    "rr": ("rpm", ("fr", "frecuencia respiratoria", "rr", "respiratory rate"),
+           {"rpm": (1, 0), "/min": (1, 0), "x'": (1, 0)}, False),
+    "temp": ("°C", ("t", "temp", "temperatura", "temperature"),
+             {"°c": (1, 0), "ºc": (1, 0), "c": (1, 0), "°f": _F_TO_C, "ºf": _F_TO_C, "f": _F_TO_C}, False),
+    "spo2": ("%", ("spo2", "sato2", "sat", "saturacion", "saturacion de oxigeno", "oximetria"),
+             {"%": (1, 0)}, False),
+    "weight": ("kg", ("peso", "weight"),
+               {"kg": (1, 0), "kgs": (1, 0), "g": (0.001, 0), "lb": (0.453592, 0), "lbs": (0.453592, 0)}, False),
+    "height": ("cm", ("talla", "altura", "estatura", "height"),
+               {"cm": (1, 0), "m": (100, 0), "mts": (100, 0), "in": (2.54, 0)}, False),
+    "bmi": ("kg/m2", ("imc", "bmi", "indice de masa corporal"),
+            {"kg/m2": (1, 0), "kg/m²": (1, 0)}, False),
+    "glucose": ("mg/dL", ("glucemia", "glucosa", "glucose", "hgt"),
+                {"mg/dl": (1, 0), "mmol/l": (18.016, 0)}, False),
+}
+_BY_ALIAS = {alias: code for code, m in _METRICS.items() for alias in m[1]}
+_NUM = r"[-+]?\d+(?:[.,]\d+)?"
+_PAIR_RE = re.compile(rf"^\s*({_NUM})\s*/\s*({_NUM})\s*(.*)$")
+_SINGLE_RE = re.compile(rf"^\s*({_NUM})\s*(.*)$")
+
+
+def _parse_vital(metric: str | None, value: str | None) -> dict | None:
+    """{metric_code, num_value, num_value2, unit} o None si la métrica no se reconoce."""
+    key = unicodedata.normalize("NFKD", metric or "")
+    key = " ".join("".join(ch for ch in key if not unicodedata.combining(ch)).lower().replace(".", " ").split())
+    code = _BY_ALIAS.get(key) or (key if key in _METRICS else None)
+    if not code:
+        return None
+    unit, _, conversions, pair = _METRICS[code]
+    out = {"metric_code": code, "num_value": None, "num_value2": None, "unit": None}
+    match = (_PAIR_RE if pair else _SINGLE_RE).match((value or "").strip())
+    if not match:
+        return out
+    *nums, unit_text = match.groups()
+    unit_key = unit_text.strip().lower().replace(" ", "")
+    if unit_key and unit_key not in conversions:
+        return out
+    factor, offset = conversions[unit_key] if unit_key else (1, 0)
+    values = [round(float(n.replace(",", ".")) * factor + offset, 3) for n in nums]
+    out.update(num_value=values[0], num_value2=values[1] if pair else None, unit=unit)
+    return out
+
+
+def upgrade() -> None:
+    op.add_column("vitals", sa.Column("metric_code", sa.String(length=16), nullable=True))
+    op.add_column("vitals", sa.Column("num_value", sa.Float(), nullable=True))
+    op.add_column("vitals", sa.Column("num_value2", sa.Float(), nullable=True))
+    op.add_column("vitals", sa.Column("unit", sa.String(length=16), nullable=True))
+
+    # backfill: se parsea el texto existente por lotes (keyset por id)
+    vitals = sa.table(
+        "vitals",
+        sa.column("id", sa.String), sa.column("metric", sa.String), sa.column("value", sa.String),
+        sa.column("metric_code", sa.String), sa.column("num_value", sa.Float),
+        sa.column("num_value2", sa.Float), sa.column("unit", sa.String),
+    )
+    conn = op.get_bind()
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(vitals.c.id, vitals.c.metric, vitals.c.value)
+            .where(vitals.c.id > last_id)
+            .order_by(vitals.c.id)
+            .limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for r in rows:
+            p = _parse_vital(r.metric, r.value)
+            if p:
+                params.append({"b_id": r.id, **p})
+        if params:
+            conn.execute(
+                vitals.update()
+                .where(vitals.c.id == sa.bindparam("b_id"))
+                .values(
+                    metric_code=sa.bindparam("metric_code"), num_value=sa.bindparam("num_value"),
+                    num_value2=sa.bindparam("num_value2"), unit=sa.bindparam("unit"),
+                ),
+                params,
+            )
+        last_id = rows[-1].id
+
+    # series por paciente y métrica; cubre las columnas numéricas
+    op.create_index(
+        "ix_vital_patient_metric_date", "vitals",
+        ["patient_id", "metric_code", "date", "num_value", "num_value2"], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vital_patient_metric_date", table_name="vitals")
+    op.drop_column("vitals", "unit")
+    op.drop_column("vitals", "num_value2")
+    op.drop_column("vitals", "num_value")
+    op.drop_column("vitals", "metric_code")
@@ -0,0 +1,44 @@
+"""add appointment_reminders job queue
+
+Revision ID: 90dbfb5c79e0
+Revises: 6749cc4679e7
+Create Date: 2026-10-19 10:02:17.288415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90dbfb5c79e0'
+down_revision: Union[str, Sequence[str], None] = '6749cc4679e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "appointment_reminders",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("appointment_id", sa.String(length=36), sa.ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("channel", sa.String(length=32), nullable=False),
+        sa.Column("offset_minutes", sa.Integer(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.Enum("pending", "leased", "sent", "failed", "cancelled", name="reminderstatus"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("leased_until", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+    )
+    op.create_index("ix_appointment_reminders_appointment_id", "appointment_reminders", ["appointment_id"], unique=False)
+    # el worker sólo recorre (status='pending', due_at <= ahora)
+    op.create_index("ix_reminder_status_due", "appointment_reminders", ["status", "due_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reminder_status_due", table_name="appointment_reminders")
+    op.drop_index("ix_appointment_reminders_appointment_id", table_name="appointment_reminders")
+    op.drop_table("appointment_reminders")
@@ -0,0 +1,48 @@
+"""add calendar_feed_tokens and appointments.updated_at
+
+Revision ID: 935835dfeeb5
+Revises: cacb9c432a8f
+Create Date: 2026-10-19 12:08:41.730915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '935835dfeeb5'
+down_revision: Union[str, Sequence[str], None] = 'cacb9c432a8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # última modificación del turno (ETag/Last-Modified de los feeds); las filas existentes quedan con la fecha de la migración
+    op.add_column(
+        "appointments",
+        sa.Column(
+            "updated_at",
+            sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+            nullable=False,
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+        ),
+    )
+    op.create_table(
+        "calendar_feed_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("token", sa.String(length=64), nullable=False),
+        sa.Column("scope", sa.String(length=16), nullable=False),
+        sa.Column("owner_id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.UniqueConstraint("scope", "owner_id", name="uq_calendar_feed_owner"),
+    )
+    op.create_index("ix_calendar_feed_tokens_token", "calendar_feed_tokens", ["token"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_calendar_feed_tokens_token", table_name="calendar_feed_tokens")
+    op.drop_table("calendar_feed_tokens")
+    op.drop_column("appointments", "updated_at")
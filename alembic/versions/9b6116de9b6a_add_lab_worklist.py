@@ -0,0 +1,34 @@
+"""add lab_results.doctor_id and the (status, date) worklist index
+
+Revision ID: 9b6116de9b6a
+Revises: f30e14a4dcb6
+Create Date: 2026-10-19 18:02:31.774905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b6116de9b6a'
+down_revision: Union[str, Sequence[str], None] = 'f30e14a4dcb6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # doctor que pidió el estudio (los existentes quedan sin doctor)
+    op.add_column("lab_results", sa.Column("doctor_id", sa.String(length=36), nullable=True))
+    op.create_index("ix_lab_results_doctor_id", "lab_results", ["doctor_id"], unique=False)
+    op.create_foreign_key("fk_lab_results_doctor_id", "lab_results", "doctors", ["doctor_id"], ["id"])
+    # worklist: pendientes de todos los pacientes, los más viejos primero
+    op.create_index("ix_lab_status_date", "lab_results", ["status", "date"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lab_status_date", table_name="lab_results")
+    op.drop_constraint("fk_lab_results_doctor_id", "lab_results", type_="foreignkey")
+    op.drop_index("ix_lab_results_doctor_id", table_name="lab_results")
+    op.drop_column("lab_results", "doctor_id")
@@ -0,0 +1,53 @@
+"""add patient_latest_vitals (última lectura por paciente y métrica)
+
+Revision ID: c470b9293a41
+Revises: 8fb4f2b35a88
+Create Date: 2026-10-19 16:40:12.518310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c470b9293a41'
+down_revision: Union[str, Sequence[str], None] = '8fb4f2b35a88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "patient_latest_vitals",
+        sa.Column("patient_id", sa.String(length=36), sa.ForeignKey("patients.id"), primary_key=True),
+        sa.Column("metric_code", sa.String(length=16), primary_key=True),
+        sa.Column("vital_id", sa.String(length=36), nullable=False),
+        sa.Column("metric", sa.String(length=80), nullable=False),
+        sa.Column("value", sa.String(length=120), nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.Enum("Normal", "Alto", "Bajo", name="vitalstatus"), nullable=True),
+        sa.Column("num_value", sa.Float(), nullable=True),
+        sa.Column("num_value2", sa.Float(), nullable=True),
+        sa.Column("unit", sa.String(length=16), nullable=True),
+    )
+
+    # backfill: la última lectura de cada (paciente, métrica) con un solo INSERT ... SELECT
+    op.execute("""
+        INSERT INTO patient_latest_vitals
+            (patient_id, metric_code, vital_id, metric, value, date, status, num_value, num_value2, unit)
+        SELECT patient_id, metric_code, id, metric, value, date, status, num_value, num_value2, unit
+        FROM (
+            SELECT v.*, ROW_NUMBER() OVER (
+                PARTITION BY patient_id, metric_code ORDER BY date DESC, id DESC
+            ) AS rn
+            FROM vitals v
+            WHERE metric_code IS NOT NULL
+        ) ranked
+        WHERE rn = 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("patient_latest_vitals")
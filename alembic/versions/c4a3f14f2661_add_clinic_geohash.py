@@ -0,0 +1,81 @@
+"""add clinics.geohash for nearby search
+
+Revision ID: c4a3f14f2661
+Revises: f03e5c3245ae
+Create Date: 2026-10-19 20:41:03.557214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a3f14f2661'
+down_revision: Union[str, Sequence[str], None] = 'f03e5c3245ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 500
+
+# copia congelada de geo.geohash_encode con la precisión de esta migración
+_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _geohash(lat: float, lng: float) -> str:
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < _PRECISION:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            ch = ch * 2 + (lng >= mid)
+            lng_lo, lng_hi = (mid, lng_hi) if lng >= mid else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            ch = ch * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def upgrade() -> None:
+    op.add_column("clinics", sa.Column(
+        "geohash", sa.String(length=12).with_variant(mysql.VARCHAR(12, collation="utf8mb4_bin"), "mysql"),
+        nullable=True,
+    ))
+    op.create_index("ix_clinic_geohash", "clinics", ["geohash"])
+
+    # backfill por lotes (keyset por id) de las clínicas con coordenadas
+    clinics = sa.table(
+        "clinics",
+        sa.column("id", sa.String), sa.column("lat", sa.Float), sa.column("lng", sa.Float),
+        sa.column("geohash", sa.String),
+    )
+    conn = op.get_bind()
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(clinics.c.id, clinics.c.lat, clinics.c.lng)
+            .where(clinics.c.id > last_id, clinics.c.lat.is_not(None), clinics.c.lng.is_not(None))
+            .order_by(clinics.c.id)
+            .limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            clinics.update().where(clinics.c.id == sa.bindparam("b_id")).values(geohash=sa.bindparam("geohash")),
+            [{"b_id": r.id, "geohash": _geohash(r.lat, r.lng)} for r in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.drop_index("ix_clinic_geohash", table_name="clinics")
+    op.drop_column("clinics", "geohash")
@@ -0,0 +1,38 @@
+"""add doctor_next_slots (próximo turno libre por doctor y clínica)
+
+Revision ID: cacb9c432a8f
+Revises: 90dbfb5c79e0
+Create Date: 2026-10-19 11:24:05.513207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cacb9c432a8f'
+down_revision: Union[str, Sequence[str], None] = '90dbfb5c79e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "doctor_next_slots",
+        sa.Column("doctor_id", sa.String(length=36), sa.ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("clinic_id", sa.String(length=36), sa.ForeignKey("clinics.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("next_free_at", sa.DateTime(), nullable=True),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    # directorio público: doctores de una clínica ordenados/filtrados por disponibilidad
+    op.create_index("ix_next_slot_clinic_free", "doctor_next_slots", ["clinic_id", "next_free_at"], unique=False)
+    op.create_index("ix_next_slot_computed", "doctor_next_slots", ["computed_at"], unique=False)
+    # las filas se completan solas: el refresco de fondo calcula las membresías sin fila
+
+
+def downgrade() -> None:
+    op.drop_index("ix_next_slot_computed", table_name="doctor_next_slots")
+    op.drop_index("ix_next_slot_clinic_free", table_name="doctor_next_slots")
+    op.drop_table("doctor_next_slots")
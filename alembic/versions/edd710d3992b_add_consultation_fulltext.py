@@ -0,0 +1,29 @@
+"""add FULLTEXT index on consultations (diagnosis, notes)
+
+Revision ID: edd710d3992b
+Revises: 065e907c8b68
+Create Date: 2026-10-19 19:20:44.618032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'edd710d3992b'
+down_revision: Union[str, Sequence[str], None] = '065e907c8b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # sólo MySQL; en SQLite la búsqueda usa un índice invertido en memoria
+    if op.get_bind().dialect.name == "mysql":
+        op.create_index("ft_consultation_text", "consultations", ["diagnosis", "notes"], mysql_prefix="FULLTEXT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index("ft_consultation_text", table_name="consultations")
@@ -0,0 +1,119 @@
+"""add normalized lookup keys to patients and index patient names in search_terms
+
+Revision ID: f03e5c3245ae
+Revises: 6cb291aa36a4
+Create Date: 2026-10-19 20:14:37.902118
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f03e5c3245ae'
+down_revision: Union[str, Sequence[str], None] = '6cb291aa36a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 500
+
+# copia congelada de patient_search.lookup_keys, text_search.tokenize y
+# search_index.entity_terms a la fecha de esta migración (el backfill no cambia después)
+PATIENT = "patient"
+TERM_MAX = 64
+_STOPWORDS = frozenset("""
+a al algo como con de del e el en entre es esta este la las lo los mas me mi no o para
+pero por que se sin su sus un una uno unos unas y ya
+""".split())
+_WORD = re.compile(r"\w+")
+
+
+def _fold(text: str) -> str:
+    out = []
+    for ch in text:
+        base = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c)).lower()
+        out.append(base if len(base) == 1 else ch)
+    return "".join(out)
+
+
+def _lookup_keys(doc_id: str | None, email: str | None, phone: str | None) -> dict:
+    return {
+        "doc_id_key": re.sub(r"[^0-9A-Z]", "", _fold(doc_id or "").upper()) or None,
+        "email_key": (email or "").strip().lower() or None,
+        "phone_key": re.sub(r"\D", "", phone or "")[::-1] or None,
+    }
+
+
+def _name_terms(patient_id: str, name: str | None) -> list[dict]:
+    terms = {w[:TERM_MAX] for w in _WORD.findall(_fold(name or "")) if len(w) > 1 and w not in _STOPWORDS}
+    return [
+        {"entity_type": PATIENT, "entity_id": patient_id, "term": t, "field": "name"}
+        for t in sorted(terms)
+    ]
+
+
+def upgrade() -> None:
+    # collation binaria en MySQL: se buscan por rango de prefijo
+    for name, length in (("doc_id_key", 64), ("email_key", 255), ("phone_key", 50)):
+        op.add_column("patients", sa.Column(
+            name, sa.String(length=length).with_variant(mysql.VARCHAR(length, collation="utf8mb4_bin"), "mysql"),
+            nullable=True,
+        ))
+    op.create_index("ix_patient_doc_id_key", "patients", ["doc_id_key"])
+    op.create_index("ix_patient_email_key", "patients", ["email_key"])
+    op.create_index("ix_patient_phone_key", "patients", ["phone_key"])
+
+    # backfill por lotes (keyset por id): claves normalizadas y términos del nombre
+    patients = sa.table(
+        "patients",
+        sa.column("id", sa.String), sa.column("name", sa.String), sa.column("doc_id", sa.String),
+        sa.column("email", sa.String), sa.column("phone", sa.String),
+        sa.column("doc_id_key", sa.String), sa.column("email_key", sa.String), sa.column("phone_key", sa.String),
+    )
+    terms = sa.table(
+        "search_terms",
+        sa.column("entity_type", sa.String), sa.column("term", sa.String),
+        sa.column("entity_id", sa.String), sa.column("field", sa.String),
+    )
+    conn = op.get_bind()
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(patients.c.id, patients.c.name, patients.c.doc_id, patients.c.email, patients.c.phone)
+            .where(patients.c.id > last_id)
+            .order_by(patients.c.id)
+            .limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            patients.update()
+            .where(patients.c.id == sa.bindparam("b_id"))
+            .values(
+                doc_id_key=sa.bindparam("doc_id_key"),
+                email_key=sa.bindparam("email_key"),
+                phone_key=sa.bindparam("phone_key"),
+            ),
+            [{"b_id": r.id, **_lookup_keys(r.doc_id, r.email, r.phone)} for r in rows],
+        )
+        new_terms = []
+        for r in rows:
+            new_terms += _name_terms(r.id, r.name)
+        if new_terms:
+            conn.execute(terms.insert(), new_terms)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.execute(sa.text("DELETE FROM search_terms WHERE entity_type = 'patient'"))
+    op.drop_index("ix_patient_phone_key", table_name="patients")
+    op.drop_index("ix_patient_email_key", table_name="patients")
+    op.drop_index("ix_patient_doc_id_key", table_name="patients")
+    op.drop_column("patients", "phone_key")
+    op.drop_column("patients", "email_key")
+    op.drop_column("patients", "doc_id_key")
@@ -0,0 +1,40 @@
+"""add composite indexes for paginated clinical lists
+
+Revision ID: f30e14a4dcb6
+Revises: c470b9293a41
+Create Date: 2026-10-19 17:25:48.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f30e14a4dcb6'
+down_revision: Union[str, Sequence[str], None] = 'c470b9293a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, tabla, columnas): listados por paciente paginados por (fecha, id)
+_INDEXES = (
+    ("ix_consultation_patient_date", "consultations", ["patient_id", "date"]),
+    ("ix_lab_patient_date", "lab_results", ["patient_id", "date"]),
+    ("ix_lab_patient_status_date", "lab_results", ["patient_id", "status", "date"]),
+    ("ix_lab_patient_test_date", "lab_results", ["patient_id", "test", "date"]),
+    ("ix_vital_patient_date", "vitals", ["patient_id", "date"]),
+    ("ix_vital_patient_status_date", "vitals", ["patient_id", "status", "date"]),
+    ("ix_medication_patient_start", "medications", ["patient_id", "start_date"]),
+    ("ix_medication_patient_status_start", "medications", ["patient_id", "status", "start_date"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in _INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -115,6 +115,21 @@ async def get_current_user_from_token(token: str, db: AsyncSession) -> User:
         raise HTTPException(status_code=401, detail="Usuario no autorizado")
     return user
 
+# --- SSE (EventSource no permite mandar headers) ---
+bearer_optional = HTTPBearer(auto_error=False)
+
+async def get_current_user_sse(
+    creds: HTTPAuthorizationCredentials | None = Depends(bearer_optional),
+    token: str | None = Query(None),         # /stream?token=XXX  (o Authorization: Bearer XXX)
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    raw = creds.credentials if creds else token
+    if not raw:
+        raise HTTPException(status_code=401, detail="Token requerido")
+    if raw.lower().startswith("bearer "):
+        raw = raw[7:]
+    return await get_current_user_from_token(raw, db)
+
 # async def get_current_user_ws(ws: WebSocket, db: AsyncSession = Depends(get_db)) -> User:
 #     """
 #     Lee ?token=... del query string (o header Authorization) y retorna el User.
@@ -1,5 +1,53 @@
-import secrets, string
+import base64, json, secrets, string
+from datetime import date, datetime, time
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
 
 def gen_code(n: int = 8) -> str:
     alphabet = string.ascii_uppercase + string.digits
     return "".join(secrets.choice(alphabet) for _ in range(n))
+
+# ---------- paginación por cursor (keyset) ----------
+def encode_cursor(ts: datetime | None, *keys: str) -> str:
+    """Cursor opaco con la clave de orden de la última fila devuelta: (ts, *desempates)."""
+    raw = json.dumps([ts.isoformat() if ts else None, *keys], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, n_keys: int) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, *keys = json.loads(raw)
+        if len(keys) != n_keys or not all(isinstance(k, str) for k in keys):
+            raise ValueError
+        return (datetime.fromisoformat(ts) if ts is not None else None, *keys)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def keyset_before(ts_col, id_col, ts: datetime | date | None, id: str, nulls_last: bool = False):
+    """
+    Filas posteriores al cursor en orden (ts desc, id desc). Con nulls_last, las filas sin
+    ts van al final (como ordenan DESC MySQL y SQLite) y el cursor puede caer entre ellas.
+    """
+    if ts is None:
+        return and_(ts_col.is_(None), id_col < id)
+    cond = or_(ts_col < ts, and_(ts_col == ts, id_col < id))
+    return or_(cond, ts_col.is_(None)) if nulls_last else cond
+
+def keyset_after(ts_col, id_col, ts: datetime, id: str):
+    """Filas posteriores al cursor en orden (ts asc, id asc)."""
+    return or_(ts_col > ts, and_(ts_col == ts, id_col > id))
+
+def paginate(rows: list, limit: int, response: Response, ts_attr: str = "date") -> list:
+    """
+    Recorta una página pedida con limit + 1 filas; si hay más, deja el cursor de la
+    última fila en el header X-Next-Cursor.
+    """
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    ts = getattr(rows[-1], ts_attr)
+    if isinstance(ts, date) and not isinstance(ts, datetime):
+        ts = datetime.combine(ts, time())
+    response.headers["X-Next-Cursor"] = encode_cursor(ts, rows[-1].id)
+    return rows
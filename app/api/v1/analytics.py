@@ -0,0 +1,102 @@
+# app/api/v1/analytics.py
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_db
+from app.api.deps import require_roles
+from app.models.user import RoleEnum
+from app.models.rollup import AppointmentDailyRollup as R
+from app.schemas.analytics import UtilizationRowOut, RollupReconcileOut
+from app.services.rollups import reconcile_rollups
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], dependencies=[Depends(require_roles(RoleEnum.admin))])
+
+_GROUPS = {"day": R.day, "doctor": R.doctor_id, "clinic": R.clinic_id}
+_MAX_DAYS = 400
+
+def _check_range(date_from: date, date_to: date) -> None:
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="date_to debe ser posterior a date_from")
+    if (date_to - date_from).days > _MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Rango máximo: {_MAX_DAYS} días")
+
+def _ratio(a: int, b: int) -> float:
+    return round(a / b, 4) if b else 0.0
+
+# ---------- ocupación ----------
+@router.get("/utilization", response_model=list[UtilizationRowOut], response_model_exclude_none=True)
+async def utilization(
+    date_from: date = Query(...),
+    date_to:   date = Query(..., description="Exclusivo"),
+    group_by:  str = Query("day", description="Combinación de day,doctor,clinic"),
+    clinic_id: str | None = Query(None),
+    doctor_id: str | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Minutos reservados vs. ofrecidos, tasa de cancelación y reparto virtual/presencial,
+    leyendo sólo appointment_daily_rollups. Como no hay modelo de horarios, la oferta es
+    ANALYTICS_OFFERED_MINUTES_PER_DAY por cada día con actividad de un doctor en una clínica.
+    """
+    _check_range(date_from, date_to)
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = set(groups) - _GROUPS.keys()
+    if not groups or unknown:
+        raise HTTPException(status_code=400, detail=f"group_by inválido: {group_by}")
+    cols = [_GROUPS[g] for g in groups]
+
+    q = (
+        select(
+            *cols,
+            func.sum(R.total).label("total"),
+            func.sum(R.cancelled).label("cancelled"),
+            func.sum(R.booked_minutes).label("booked_minutes"),
+            func.sum(R.virtual_count).label("virtual_count"),
+            func.sum(R.presencial_count).label("presencial_count"),
+            # días-agenda con actividad (doctor, clínica, día) dentro del grupo
+            func.sum(case((R.total > 0, 1), else_=0)).label("agenda_days"),
+        )
+        .where(R.day >= date_from, R.day < date_to)
+        .group_by(*cols)
+        .order_by(*cols)
+    )
+    if clinic_id:
+        q = q.where(R.clinic_id == clinic_id)
+    if doctor_id:
+        q = q.where(R.doctor_id == doctor_id)
+
+    out = []
+    for r in (await db.execute(q)).all():
+        m = r._mapping
+        total, cancelled, booked = int(m["total"] or 0), int(m["cancelled"] or 0), int(m["booked_minutes"] or 0)
+        virtual, presencial = int(m["virtual_count"] or 0), int(m["presencial_count"] or 0)
+        offered = int(m["agenda_days"] or 0) * settings.ANALYTICS_OFFERED_MINUTES_PER_DAY
+        out.append(UtilizationRowOut(
+            **{c.key: m[c.key] for c in cols},
+            total=total,
+            cancelled=cancelled,
+            booked_minutes=booked,
+            offered_minutes=offered,
+            utilization=_ratio(booked, offered),
+            cancellation_rate=_ratio(cancelled, total),
+            virtual_share=_ratio(virtual, virtual + presencial),
+            presencial_share=_ratio(presencial, virtual + presencial),
+        ))
+    return out
+
+# ---------- reconciliación a pedido ----------
+@router.post("/rollups/reconcile", response_model=RollupReconcileOut)
+async def reconcile(
+    date_from: date = Query(...),
+    date_to:   date = Query(..., description="Exclusivo"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Recalcula los rollups del rango desde appointments (lo mismo que el job nocturno)."""
+    _check_range(date_from, date_to)
+    rows = await reconcile_rollups(db, date_from, date_to)
+    await db.commit()
+    return RollupReconcileOut(date_from=date_from, date_to=date_to, rows=rows)
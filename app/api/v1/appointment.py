@@ -1,22 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, delete
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, delete, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
+from typing import Literal
 
-from app.core.db import get_db
-from app.api.deps import get_current_user, require_roles
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.db import get_db, dialect_name, date_bucket
+from app.api.deps import get_current_user, get_current_user_sse, require_roles
 from app.models.user import User, RoleEnum
-from app.models.appointment import Appointment
+from app.models.appointment import Appointment, ApptStatus
 from app.models.doctor import Doctor
 from app.models.patient import Patient
 from app.models.clinic import Clinic
-from app.schemas.appointment import AppointmentCreate, AppointmentUpdate, AppointmentOut
+from app.schemas.appointment import (
+    AppointmentCreate, AppointmentUpdate, AppointmentOut,
+    AppointmentExpandedOut, AppointmentWithSpecialtyOut, AppointmentConflictOut,
+    CalendarBucketOut, DoctorAbsenceIn, BulkOperationOut,
+)
 from app.models.links import ClinicDoctor, ClinicPatient
+from app.schemas.clinic import ClinicOut
+from app.services.scheduling import busy_overlap_q, busy_facts, conflict_report, bulk_move_conflicts
+from app.services.event_bus import EventBus, sse_response
+from app.services.reminders import schedule_reminders
+from app.services.next_slots import sync_next_slots
+from app.services.rollups import apply_rollup_deltas
 
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
+# agregados de calendario por scope ("doctor"|"clinic"|"patient", id)
+_calendar_cache = TTLCache(settings.CALENDAR_CACHE_SECONDS)
+
+# feed de cambios (altas/cambios/bajas) para las pantallas de doctor/recepción
+appointment_bus = EventBus(settings.EVENT_LOG_SIZE)
+
 # ---------- helpers ----------
 async def _get_doctor_id_for_user(user: User, db: AsyncSession) -> str | None:
     if user.role != RoleEnum.doctor:
@@ -55,14 +75,139 @@ def _can_edit(user: User, ap: Appointment, my_doctor_id: str | None) -> bool:
     # editar/cancelar: admin o el doctor dueño
     return user.role == RoleEnum.admin or (user.role == RoleEnum.doctor and my_doctor_id == ap.doctor_id)
 
+_SCOPES = ("doctor", "clinic", "patient")
+
+def _snapshot(ap) -> dict:
+    """Vista compacta de un turno, para diffs, eventos y tablas derivadas."""
+    return AppointmentOut.model_validate(ap).model_dump()
+
+def _changed(before: dict | None, after: dict | None, *fields: str) -> bool:
+    if before is None or after is None:
+        return True
+    return any(before[f] != after[f] for f in fields)
+
+async def _sync_side_tables(db: AsyncSession, changes: list[tuple[dict | None, dict | None]]) -> None:
+    """
+    Mantiene, en la misma transacción, las tablas derivadas (recordatorios, próximo slot,
+    rollups) de uno o varios turnos. Cada cambio es (before, after): alta con before=None,
+    baja con after=None.
+    """
+    await schedule_reminders(db, [
+        (after["id"], after["starts_at"], after["status"])
+        for before, after in changes
+        if after and _changed(before, after, "starts_at", "status")
+    ])
+    await sync_next_slots(db, [
+        (before, after)
+        for before, after in changes
+        if _changed(before, after, "doctor_id", "starts_at", "ends_at", "status")
+    ])
+    await apply_rollup_deltas(db, changes)
+
+def _after_write(before: dict | None, after: dict | None) -> None:
+    """
+    Efectos post-commit de un alta (before=None), cambio o baja (after=None):
+    invalida el calendario de los scopes tocados y publica el evento SSE con un diff compacto.
+    """
+    snaps = [s for s in (before, after) if s]
+    scopes = {(scope, s[f"{scope}_id"]) for s in snaps for scope in _SCOPES}
+    _calendar_cache.invalidate_scopes(scopes)
+
+    if before is None and after:
+        appointment_bus.publish("appointment.created", scopes, jsonable_encoder(after))
+    elif after is None and before:
+        appointment_bus.publish("appointment.deleted", scopes, {"id": before["id"]})
+    elif before and after:
+        changes = {k: v for k, v in after.items() if before.get(k) != v}
+        if changes:
+            appointment_bus.publish(
+                "appointment.updated", scopes, {"id": after["id"], "changes": jsonable_encoder(changes)}
+            )
+
 def _validate_times(starts_at: datetime, ends_at: datetime) -> None:
     if ends_at <= starts_at:
         raise HTTPException(status_code=400, detail="ends_at debe ser posterior a starts_at")
 
-async def _exists_or_404(db: AsyncSession, model, id: str, what: str):
-    res = await db.execute(select(model).where(model.id == id))
-    if not res.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail=f"{what} no encontrado")
+# columnas exactas que devuelve AppointmentOut (sin hidratar ORM ni relaciones)
+_APPT_COLUMNS = (
+    Appointment.id,
+    Appointment.doctor_id,
+    Appointment.patient_id,
+    Appointment.clinic_id,
+    Appointment.starts_at,
+    Appointment.ends_at,
+    Appointment.type,
+    Appointment.status,
+)
+
+# expand -> (columna FK en el turno, columnas del resumen compacto)
+_EXPANDABLE = {
+    "doctor":  ("doctor_id",  (Doctor.id, Doctor.name, Doctor.specialty, Doctor.color, Doctor.photo_url)),
+    "patient": ("patient_id", (Patient.id, Patient.name, Patient.doc_id, Patient.photo_url)),
+    "clinic":  ("clinic_id",  (Clinic.id, Clinic.name, Clinic.city)),
+}
+
+# ClinicOut embebido, proyectado columna a columna (el id sale de Appointment.clinic_id)
+_CLINIC_OUT_COLUMNS = {
+    "name": Clinic.name, "address": Clinic.address, "city": Clinic.city, "phone": Clinic.phone,
+    "photo_url": Clinic.photo_url, "lat": Clinic.lat, "lng": Clinic.lng,
+}
+
+def _parse_expand(expand: str | None) -> set[str]:
+    if not expand:
+        return set()
+    parts = {p.strip() for p in expand.split(",") if p.strip()}
+    unknown = parts - _EXPANDABLE.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"expand inválido: {', '.join(sorted(unknown))}")
+    return parts
+
+async def _appointment_rows(db: AsyncSession, q, expand: set[str]) -> list[dict]:
+    """
+    Ejecuta una query proyectada sobre _APPT_COLUMNS y, sólo si se pidió,
+    agrega los resúmenes de doctor/paciente/clínica (una query IN por tipo).
+    """
+    rows = [dict(r._mapping) for r in (await db.execute(q)).all()]
+    for name in expand:
+        if not rows:
+            break
+        fk, cols = _EXPANDABLE[name]
+        ids = {r[fk] for r in rows}
+        res = await db.execute(select(*cols).where(cols[0].in_(ids)))
+        by_id = {b.id: dict(b._mapping) for b in res.all()}
+        for r in rows:
+            r[name] = by_id.get(r[fk])
+    return rows
+
+async def _booking_facts(
+    db: AsyncSession,
+    doctor_id: str,
+    patient_id: str,
+    clinic_id: str,
+    starts_at: datetime,
+    ends_at: datetime,
+):
+    """
+    Trae en un solo SELECT (un round trip) todos los hechos que necesita
+    la validación de un turno: existencia, pertenencia a la clínica y
+    solapamientos del doctor y del paciente (en cualquier clínica).
+    """
+    q = select(
+        select(Doctor.id).where(Doctor.id == doctor_id).exists().label("doctor_ok"),
+        select(Patient.id).where(Patient.id == patient_id).exists().label("patient_ok"),
+        select(Clinic.id).where(Clinic.id == clinic_id).exists().label("clinic_ok"),
+        select(ClinicDoctor.doctor_id).where(
+            ClinicDoctor.doctor_id == doctor_id,
+            ClinicDoctor.clinic_id == clinic_id,
+        ).exists().label("doctor_in_clinic"),
+        select(ClinicPatient.patient_id).where(
+            ClinicPatient.patient_id == patient_id,
+            ClinicPatient.clinic_id == clinic_id,
+        ).exists().label("patient_in_clinic"),
+        busy_overlap_q(Appointment.doctor_id, doctor_id, starts_at, ends_at).exists().label("doctor_busy"),
+        busy_overlap_q(Appointment.patient_id, patient_id, starts_at, ends_at).exists().label("patient_busy"),
+    )
+    return (await db.execute(q)).one()
 
 # ---------- create ----------
 @router.post("/", response_model=AppointmentOut, status_code=201, dependencies=[Depends(get_current_user)])
@@ -82,63 +227,44 @@ async def create_appointment(
 
     # Si el rol es paciente, obtenemos el patient_id desde el usuario actual
     if current.role == RoleEnum.patient:
-        # Buscamos el paciente por el user_id
-        patient = await db.execute(select(Patient).filter(Patient.user_id == current.id))
-        patient_data = patient.scalar_one_or_none()
-        if not patient_data:
+        my_pt = await _get_patient_id_for_user(current, db)
+        if not my_pt:
             raise HTTPException(status_code=400, detail="No se encontró el perfil de paciente asociado a este usuario")
-        payload.patient_id = patient_data.id  # Asignamos el patient_id al payload    
+        payload.patient_id = my_pt  # Asignamos el patient_id al payload
 
     # si sigue sin haber doctor_id (ni payload ni perfil)
     if not doctor_id:
-        if current.role != RoleEnum.admin:
-            raise HTTPException(status_code=400, detail="Falta doctor_id")
-        # si es admin y tampoco lo mandó
         raise HTTPException(status_code=400, detail="Falta doctor_id")
 
     _validate_times(payload.starts_at, payload.ends_at)
 
-    # validaciones de existencia
-    await _exists_or_404(db, Doctor, doctor_id, "Doctor")
-    await _exists_or_404(db, Patient, payload.patient_id, "Paciente")
-    await _exists_or_404(db, Clinic, payload.clinic_id, "Clínica")
-
-    # doctor ∈ clínica
-    res = await db.execute(
-        select(ClinicDoctor.doctor_id).where(
-            ClinicDoctor.doctor_id == doctor_id,
-            ClinicDoctor.clinic_id == payload.clinic_id,
-        )
+    # validaciones (existencia, pertenencia y solapamiento) en un solo round trip
+    facts = await _booking_facts(
+        db, doctor_id, payload.patient_id, payload.clinic_id, payload.starts_at, payload.ends_at
     )
-    if not res.scalar_one_or_none():
+    if not facts.doctor_ok:
+        raise HTTPException(status_code=404, detail="Doctor no encontrado")
+    if not facts.patient_ok:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    if not facts.clinic_ok:
+        raise HTTPException(status_code=404, detail="Clínica no encontrado")
+    if not facts.doctor_in_clinic:
         raise HTTPException(status_code=400, detail="El doctor no pertenece a la clínica")
-
     # (opcional) paciente ∈ clínica
-    res = await db.execute(
-        select(ClinicPatient.patient_id).where(
-            ClinicPatient.patient_id == payload.patient_id,
-            ClinicPatient.clinic_id == payload.clinic_id,
-        )
-    )
-    if not res.scalar_one_or_none():
+    if not facts.patient_in_clinic:
         raise HTTPException(status_code=400, detail="El paciente no pertenece a la clínica")
-
-    # --- evitar solapamientos del mismo doctor en la misma clínica ---
-    
-    overlap_q = select(Appointment.id).where(
-        Appointment.doctor_id == doctor_id,
-        Appointment.clinic_id == payload.clinic_id,
-        Appointment.starts_at < payload.ends_at, # empieza antes de que termine el nuevo
-        Appointment.ends_at   > payload.starts_at, # termina después de que empieza el nuevo
-        Appointment.status != "cancelled",   # opcional: ignorar cancelados
-    )
-    res = await db.execute(overlap_q)
-    if res.scalar_one_or_none():
+    # evitar solapamientos del doctor y del paciente (en cualquier clínica)
+    if facts.doctor_busy:
         raise HTTPException(
             status_code=400,
             detail="Ya existe un turno para este doctor que se solapa con el horario solicitado"
         )
-    
+    if facts.patient_busy:
+        raise HTTPException(
+            status_code=400,
+            detail="El paciente ya tiene un turno que se solapa con el horario solicitado"
+        )
+
     ap = Appointment(
         doctor_id=doctor_id,
         patient_id=payload.patient_id,
@@ -149,12 +275,21 @@ async def create_appointment(
         status=payload.status,  # type: ignore[arg-type]
     )
     db.add(ap)
+    await db.flush()          # asigna el id para las tablas derivadas
+    after = _snapshot(ap)
+    await _sync_side_tables(db, [(None, after)])
     await db.commit()
     await db.refresh(ap)
+    _after_write(None, after)
     return ap  # from_attributes=True en schema
 
 # ---------- list ----------
-@router.get("/", response_model=list[AppointmentOut], dependencies=[Depends(get_current_user)])
+@router.get(
+    "/",
+    response_model=list[AppointmentExpandedOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(get_current_user)],
+)
 async def list_appointments(
     date_from: datetime | None = Query(None),
     date_to:   datetime | None = Query(None),
@@ -162,17 +297,15 @@ async def list_appointments(
     status:    str | None = Query(None),
     limit:     int = Query(50, ge=1, le=200),
     offset:    int = Query(0, ge=0),
+    expand:    str | None = Query(None, description="doctor,patient,clinic"),
     current: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    expand_set = _parse_expand(expand)
     my_doc_id = await _get_doctor_id_for_user(current, db)
     my_pt_id  = await _get_patient_id_for_user(current, db)
 
-    q = select(Appointment).options(
-        selectinload(Appointment.doctor),
-        selectinload(Appointment.patient),
-        selectinload(Appointment.clinic),
-    )
+    q = select(*_APPT_COLUMNS)
 
     # alcance por rol
     if current.role == RoleEnum.doctor and my_doc_id:
@@ -191,43 +324,177 @@ async def list_appointments(
     if status in {"pending", "confirmed", "cancelled"}:
         q = q.where(Appointment.status == status)  # type: ignore[arg-type]
 
-    # res = await db.execute(q.order_by(Appointment.starts_at))
-    # return res.scalars().all()
-    res = await db.execute(q.order_by(Appointment.starts_at).offset(offset).limit(limit))
-    return res.scalars().all()
+    q = q.order_by(Appointment.starts_at, Appointment.id).offset(offset).limit(limit)
+    return await _appointment_rows(db, q, expand_set)
 
 # atajos cómodos
-@router.get("/doctor/me", response_model=list[AppointmentOut], dependencies=[Depends(require_roles(RoleEnum.doctor))])
+@router.get(
+    "/doctor/me",
+    response_model=list[AppointmentExpandedOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_roles(RoleEnum.doctor))],
+)
 async def my_doctor_appointments(
+    expand: str | None = Query(None, description="doctor,patient,clinic"),
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
 ):
+    expand_set = _parse_expand(expand)
     my_doc_id = await _get_doctor_id_for_user(current, db)
     if not my_doc_id:
         return []
-    res = await db.execute(
-        select(Appointment)
-        .options(selectinload(Appointment.patient), selectinload(Appointment.clinic))
+    q = (
+        select(*_APPT_COLUMNS)
         .where(Appointment.doctor_id == my_doc_id)
-        .order_by(Appointment.starts_at)
+        .order_by(Appointment.starts_at, Appointment.id)
     )
-    return res.scalars().all()
-
-@router.get("/patient/me", response_model=list[AppointmentOut], dependencies=[Depends(require_roles(RoleEnum.patient))])
+    return await _appointment_rows(db, q, expand_set)
+
+@router.get(
+    "/patient/me",
+    response_model=list[AppointmentExpandedOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_roles(RoleEnum.patient))],
+)
 async def my_patient_appointments(
+    expand: str | None = Query(None, description="doctor,patient,clinic"),
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
 ):
+    expand_set = _parse_expand(expand)
     my_pt_id = await _get_patient_id_for_user(current, db)
     if not my_pt_id:
         return []
-    res = await db.execute(
-        select(Appointment)
-        .options(selectinload(Appointment.doctor), selectinload(Appointment.clinic))
+    q = (
+        select(*_APPT_COLUMNS)
         .where(Appointment.patient_id == my_pt_id)
-        .order_by(Appointment.starts_at)
+        .order_by(Appointment.starts_at, Appointment.id)
+    )
+    return await _appointment_rows(db, q, expand_set)
+
+# ---------- conflictos (admin) ----------
+@router.get(
+    "/conflicts",
+    response_model=list[AppointmentConflictOut],
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
+async def list_conflicts(
+    date_from: datetime = Query(...),
+    date_to:   datetime = Query(...),
+    clinic_id: str | None = Query(None),
+    limit:     int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Doble reservas de doctores y pacientes entre clínicas dentro del rango."""
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="date_to debe ser posterior a date_from")
+    return await conflict_report(db, date_from, date_to, clinic_id, limit)
+
+# ---------- calendario (agregado) ----------
+async def _resolve_scope(
+    db: AsyncSession, current: User, scope: str, scope_id: str | None
+) -> str:
+    """Resuelve el scope_id (por defecto el propio perfil) y valida el acceso (calendario y stream)."""
+    if current.role == RoleEnum.admin:
+        if not scope_id:
+            raise HTTPException(status_code=400, detail="Falta scope_id")
+        return scope_id
+
+    if current.role == RoleEnum.doctor:
+        my_doc_id = await _get_doctor_id_for_user(current, db)
+        if scope == "doctor" and my_doc_id and scope_id in (None, my_doc_id):
+            return my_doc_id
+        if scope == "clinic" and my_doc_id and scope_id:
+            res = await db.execute(
+                select(ClinicDoctor.clinic_id).where(
+                    ClinicDoctor.doctor_id == my_doc_id,
+                    ClinicDoctor.clinic_id == scope_id,
+                )
+            )
+            if res.scalar_one_or_none():
+                return scope_id
+
+    if current.role == RoleEnum.patient:
+        my_pt_id = await _get_patient_id_for_user(current, db)
+        if scope == "patient" and my_pt_id and scope_id in (None, my_pt_id):
+            return my_pt_id
+
+    raise HTTPException(status_code=403, detail="Permiso denegado")
+
+@router.get("/calendar", response_model=list[CalendarBucketOut], dependencies=[Depends(get_current_user)])
+async def calendar_counts(
+    scope:     Literal["doctor", "clinic", "patient"] = Query(...),
+    date_from: datetime = Query(...),
+    date_to:   datetime = Query(...),
+    scope_id:  str | None = Query(None, description="Por defecto, el perfil propio"),
+    bucket:    Literal["day", "hour"] = Query("day"),
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Conteos por día (u hora) desglosados por estado y tipo, para pintar el calendario
+    sin traer los turnos. Un solo GROUP BY; se cachea unos segundos por scope.
+    """
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="date_to debe ser posterior a date_from")
+    max_span = timedelta(days=31) if bucket == "hour" else timedelta(days=400)
+    if date_to - date_from > max_span:
+        raise HTTPException(status_code=400, detail=f"Rango máximo para bucket={bucket}: {max_span.days} días")
+
+    scope_id = await _resolve_scope(db, current, scope, scope_id)
+
+    key = ((scope, scope_id), bucket, date_from, date_to)
+    cached = _calendar_cache.get(key)
+    if cached is not None:
+        return cached
+
+    scope_col = getattr(Appointment, f"{scope}_id")
+    b = date_bucket(dialect_name(db), Appointment.starts_at, bucket).label("bucket")
+    q = (
+        select(b, Appointment.status, Appointment.type, func.count().label("n"))
+        .where(
+            scope_col == scope_id,
+            Appointment.starts_at >= date_from,
+            Appointment.starts_at < date_to,
+        )
+        .group_by(b, Appointment.status, Appointment.type)
+        .order_by(b)
+    )
+    res = await db.execute(q)
+
+    buckets: dict[str, CalendarBucketOut] = {}
+    for row in res.all():
+        out = buckets.setdefault(row.bucket, CalendarBucketOut(bucket=row.bucket, total=0))
+        st, tp = row.status.value, row.type.value
+        out.total += row.n
+        out.by_status[st] = out.by_status.get(st, 0) + row.n
+        out.by_type[tp] = out.by_type.get(tp, 0) + row.n
+
+    result = list(buckets.values())
+    _calendar_cache.set(key, result)
+    return result
+
+# ---------- stream (SSE) ----------
+@router.get("/stream")
+async def stream_appointment_changes(
+    request: Request,
+    scope:    Literal["doctor", "clinic", "patient"] = Query(...),
+    scope_id: str | None = Query(None, description="Por defecto, el perfil propio"),
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+    current: User = Depends(get_current_user_sse),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Server-Sent Events con altas/cambios/bajas de turnos del scope, en vez de hacer
+    polling de GET /appointments/. Reanuda con Last-Event-ID mientras siga en el log;
+    si no, manda un evento "reset" y el cliente debe recargar la lista.
+    """
+    scope_id = await _resolve_scope(db, current, scope, scope_id)
+    # no retener una conexión del pool mientras dura el stream
+    await db.close()
+    return sse_response(
+        appointment_bus, request, {(scope, scope_id)}, last_event_id, settings.SSE_HEARTBEAT_SECONDS
     )
-    return res.scalars().all()
 
 # ---------- get ----------
 @router.get("/{id}", response_model=AppointmentOut, dependencies=[Depends(get_current_user)])
@@ -249,35 +516,38 @@ async def update_appointment(id: str, patch: AppointmentUpdate, current: User =
 
     data = patch.model_dump(exclude_unset=True)
 
-    if "starts_at" in data or "ends_at" in data or "doctor_id" in data or "clinic_id" in data:
+    if data.keys() & {"starts_at", "ends_at", "doctor_id", "patient_id", "status"}:
         new_starts = data.get("starts_at", ap.starts_at)
         new_ends   = data.get("ends_at",   ap.ends_at)
-        # si permiten cambiar doctor/clinica en PATCH (p.ej. admin)
-        eff_doctor_id = data.get("doctor_id", ap.doctor_id)
-        eff_clinic_id = data.get("clinic_id", ap.clinic_id)
+        # si permiten cambiar doctor/paciente en PATCH (p.ej. admin)
+        eff_doctor_id  = data.get("doctor_id",  ap.doctor_id)
+        eff_patient_id = data.get("patient_id", ap.patient_id)
 
         _validate_times(new_starts, new_ends)
 
-        # evitar solapamiento con otros turnos del mismo doctor en la misma clínica
-        overlap_q = select(Appointment.id).where(
-            Appointment.doctor_id == eff_doctor_id,
-            Appointment.clinic_id == eff_clinic_id,
-            Appointment.id != ap.id,            # excluir el propio
-            Appointment.starts_at < new_ends,
-            Appointment.ends_at   > new_starts,
-            Appointment.status != "cancelled",  # opcional: ignorar cancelados
-        )
-        res = await db.execute(overlap_q)
-        if res.scalar_one_or_none():
-            raise HTTPException(
-                status_code=400,
-                detail="El nuevo horario se solapa con otro turno del doctor en esa clínica"
-            )
-
+        # evitar solapamiento con otros turnos del doctor o del paciente (en cualquier clínica);
+        # un turno cancelado no ocupa agenda, pero reactivarlo sí se valida
+        if data.get("status", ap.status) != "cancelled":
+            busy = await busy_facts(db, eff_doctor_id, eff_patient_id, new_starts, new_ends, exclude_id=ap.id)
+            if busy.doctor_busy:
+                raise HTTPException(
+                    status_code=400,
+                    detail="El nuevo horario se solapa con otro turno del doctor"
+                )
+            if busy.patient_busy:
+                raise HTTPException(
+                    status_code=400,
+                    detail="El nuevo horario se solapa con otro turno del paciente"
+                )
+
+    before = _snapshot(ap)
     for k, v in data.items():
         setattr(ap, k, v)
+    after = _snapshot(ap)
+    await _sync_side_tables(db, [(before, after)])
     await db.commit()
     await db.refresh(ap)
+    _after_write(before, after)
     return ap
 
 # ---------- delete ----------
@@ -299,11 +569,126 @@ async def delete_appointment(id: str, current: User = Depends(get_current_user),
     if not _can_edit(current, ap, my_doc_id):
         raise HTTPException(status_code=403, detail="Permiso denegado")
 
-    await db.delete(ap)       # respeta cascadas del ORM
+    before = _snapshot(ap)
+    await _sync_side_tables(db, [(before, None)])
+    await db.delete(ap)       # respeta cascadas del ORM (los recordatorios caen por FK CASCADE)
     await db.commit()
+    _after_write(before, None)
     return
 
 
+
+# ---------- bulk: ausencia de doctor (admin) ----------
+@router.post(
+    "/bulk/doctor-absence",
+    response_model=BulkOperationOut,
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
+async def doctor_absence(payload: DoctorAbsenceIn, db: AsyncSession = Depends(get_db)):
+    """
+    Cancela o mueve (corre N minutos y/o reasigna a otro doctor) todos los turnos activos
+    del doctor que empiezan en [date_from, date_to), en una sola transacción y con UPDATEs
+    por lote. Al mover revalida los solapamientos en bloque: si hay alguno no se escribe nada.
+    Devuelve el antes/después de cada turno con el contacto del paciente para notificarlo.
+    """
+    if payload.date_to <= payload.date_from:
+        raise HTTPException(status_code=400, detail="date_to debe ser posterior a date_from")
+    moving = payload.action == "move"
+    if moving and not (payload.shift_minutes or payload.new_doctor_id):
+        raise HTTPException(status_code=400, detail="Para mover hace falta shift_minutes o new_doctor_id")
+    if moving and payload.new_doctor_id == payload.doctor_id:
+        raise HTTPException(status_code=400, detail="new_doctor_id debe ser otro doctor")
+
+    found = await db.execute(
+        select(Doctor.id).where(Doctor.id.in_({payload.doctor_id, payload.new_doctor_id} - {None}))
+    )
+    found_ids = set(found.scalars().all())
+    if payload.doctor_id not in found_ids or (payload.new_doctor_id and payload.new_doctor_id not in found_ids):
+        raise HTTPException(status_code=404, detail="Doctor no encontrado")
+
+    # turnos afectados (bloqueados hasta el commit para que nadie los toque en el medio)
+    q = select(*_APPT_COLUMNS).where(
+        Appointment.doctor_id == payload.doctor_id,
+        Appointment.status != ApptStatus.cancelled,
+        Appointment.starts_at >= payload.date_from,
+        Appointment.starts_at < payload.date_to,
+    )
+    if payload.clinic_id:
+        q = q.where(Appointment.clinic_id == payload.clinic_id)
+    q = q.order_by(Appointment.starts_at, Appointment.id).with_for_update()
+    befores = [_snapshot(r) for r in (await db.execute(q)).all()]
+
+    if moving:
+        shift = timedelta(minutes=payload.shift_minutes or 0)
+        new_doctor_id = payload.new_doctor_id or payload.doctor_id
+        afters = [
+            {**b, "doctor_id": new_doctor_id, "starts_at": b["starts_at"] + shift, "ends_at": b["ends_at"] + shift}
+            for b in befores
+        ]
+        if payload.new_doctor_id and afters:
+            res = await db.execute(
+                select(ClinicDoctor.clinic_id).where(
+                    ClinicDoctor.doctor_id == new_doctor_id,
+                    ClinicDoctor.clinic_id.in_({a["clinic_id"] for a in afters}),
+                )
+            )
+            missing = {a["clinic_id"] for a in afters} - set(res.scalars().all())
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"El doctor destino no pertenece a las clínicas: {', '.join(sorted(missing))}",
+                )
+        conflicts = await bulk_move_conflicts(db, afters)
+        if conflicts:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "message": "Los nuevos horarios se solapan con otros turnos",
+                    "conflicts": jsonable_encoder(conflicts),
+                },
+            )
+    else:
+        afters = [{**b, "status": "cancelled"} for b in befores]
+
+    changes = list(zip(befores, afters))
+    if afters and not payload.dry_run:
+        if moving:
+            # UPDATE por PK en un executemany
+            await db.execute(
+                update(Appointment),
+                [{k: a[k] for k in ("id", "doctor_id", "starts_at", "ends_at")} for a in afters],
+            )
+        else:
+            await db.execute(
+                update(Appointment)
+                .where(Appointment.id.in_([b["id"] for b in befores]))
+                .values(status=ApptStatus.cancelled)
+                .execution_options(synchronize_session=False)
+            )
+        await _sync_side_tables(db, changes)
+        await db.commit()
+        for before, after in changes:
+            _after_write(before, after)
+
+    res = await db.execute(
+        select(Patient.id, Patient.name, Patient.email, Patient.phone)
+        .where(Patient.id.in_({b["patient_id"] for b in befores}))
+    )
+    contacts = {r.id: r for r in res.all()}
+    items = []
+    for before, after in changes:
+        pt = contacts.get(after["patient_id"])
+        items.append({
+            **after,
+            "patient_name":  pt.name if pt else None,
+            "patient_email": pt.email if pt else None,
+            "patient_phone": pt.phone if pt else None,
+            "old_doctor_id": before["doctor_id"],
+            "old_starts_at": before["starts_at"],
+            "old_ends_at":   before["ends_at"],
+        })
+    return {"action": payload.action, "dry_run": payload.dry_run, "affected": len(items), "items": items}
+
 # ---------- availability ----------
 @router.get("/availability", dependencies=[Depends(get_current_user)])
 async def availability(
@@ -340,52 +725,58 @@ async def availability(
 
     return slots
 
-@router.get("/patient/me/with-specialty", dependencies=[Depends(require_roles(RoleEnum.patient))])
+@router.get(
+    "/patient/me/with-specialty",
+    response_model=list[AppointmentWithSpecialtyOut],
+    dependencies=[Depends(require_roles(RoleEnum.patient))],
+)
 async def my_patient_appointments_with_specialty(
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
 ):
     my_pt_id = await _get_patient_id_for_user(current, db)
     if not my_pt_id:
         return []
 
-    # Traemos las citas con las relaciones de doctor y clínica
+    # Una sola query: Appointment ⨝ Doctor ⨝ Clinic, proyectando sólo lo que devuelve el schema
     res = await db.execute(
-        select(Appointment)
-        .options(
-            selectinload(Appointment.clinic)   # Incluye la clínica, no es necesario cargar el doctor aún
+        select(
+            Appointment.id,
+            Appointment.doctor_id,
+            Appointment.patient_id,
+            Appointment.clinic_id,
+            Appointment.starts_at,
+            Appointment.ends_at,
+            Appointment.type,
+            Appointment.status,
+            Doctor.specialty,
+            Doctor.name.label("doctor_name"),
+            *(col.label(f"clinic_{name}") for name, col in _CLINIC_OUT_COLUMNS.items()),
         )
+        .outerjoin(Doctor, Doctor.id == Appointment.doctor_id)
+        .outerjoin(Clinic, Clinic.id == Appointment.clinic_id)
         .where(Appointment.patient_id == my_pt_id)
-        .order_by(Appointment.starts_at)
+        .order_by(Appointment.starts_at, Appointment.id)
+        .offset(offset)
+        .limit(limit)
     )
 
-    appointments = res.scalars().all()
-
-    # Crear un nuevo objeto que combine Appointment y specialty
-    appointments_with_specialty = []
-    for appointment in appointments:
-        # Crear un objeto con los datos de Appointment
-        appointment_data = appointment.__dict__.copy()
-
-        # Buscar al doctor por su ID para obtener la especialidad
-        if appointment.doctor_id:  # Verificar que el doctor_id esté presente
-            doctor_res = await db.execute(
-                select(Doctor.specialty, Doctor.name)
-                .where(Doctor.id == appointment.doctor_id)
-            )
-            doctor_res_name = await db.execute(
-                select(Doctor.name)
-                .where(Doctor.id == appointment.doctor_id)
-            )
-            doctor = doctor_res.scalar_one_or_none()
-            doctor_name = doctor_res_name.scalar_one_or_none()
-            appointment_data['specialty'] = doctor if doctor else None
-            appointment_data['doctor_name'] = doctor_name if doctor_name else None
-            appointments_with_specialty.append(appointment_data)
-        else:
-            appointment_data['specialty'] = None
-            appointment_data['doctor_name'] = None
-
-    
-
-    return appointments_with_specialty
+    return [
+        AppointmentWithSpecialtyOut(
+            id=row.id,
+            doctor_id=row.doctor_id,
+            patient_id=row.patient_id,
+            clinic_id=row.clinic_id,
+            starts_at=row.starts_at,
+            ends_at=row.ends_at,
+            type=row.type,
+            status=row.status,
+            specialty=row.specialty,
+            doctor_name=row.doctor_name,
+            clinic=ClinicOut(id=row.clinic_id, **{k: row._mapping[f"clinic_{k}"] for k in _CLINIC_OUT_COLUMNS})
+            if row.clinic_name is not None else None,
+        )
+        for row in res.all()
+    ]
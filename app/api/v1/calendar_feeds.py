@@ -0,0 +1,197 @@
+# app/api/v1/calendar_feeds.py
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_db, SessionLocal
+from app.api.deps import get_current_user, require_roles
+from app.models.user import User, RoleEnum
+from app.models.appointment import Appointment
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.clinic import Clinic
+from app.models.calendar_feed import CalendarFeedToken
+from app.schemas.calendar_feed import CalendarFeedOut
+from app.services.ical import calendar_header, calendar_footer, vevent
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+_OWNER_ROLES = (RoleEnum.doctor, RoleEnum.patient)
+
+# ---------- helpers ----------
+async def _owner_for_user(user: User, db: AsyncSession) -> tuple[str, str]:
+    """(scope, owner_id) del feed del usuario: su perfil de doctor o de paciente."""
+    model = Doctor if user.role == RoleEnum.doctor else Patient
+    res = await db.execute(select(model.id).where(model.user_id == user.id))
+    owner_id = res.scalar_one_or_none()
+    if not owner_id:
+        raise HTTPException(status_code=404, detail="No hay perfil vinculado a este usuario")
+    return user.role.value, owner_id
+
+def _feed_out(request: Request, feed: CalendarFeedToken) -> CalendarFeedOut:
+    return CalendarFeedOut(
+        scope=feed.scope,
+        token=feed.token,
+        url=str(request.url_for("calendar_feed_ics", token=feed.token)),
+        created_at=feed.created_at,
+    )
+
+def _http_date(dt: datetime) -> str:
+    return format_datetime(dt.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+def _not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    # If-None-Match manda sobre If-Modified-Since (RFC 9110); comparación débil
+    inm = request.headers.get("if-none-match")
+    if inm:
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= since
+    return False
+
+# ---------- token del feed (usuario autenticado) ----------
+@router.get("/feed", response_model=CalendarFeedOut, dependencies=[Depends(require_roles(*_OWNER_ROLES))])
+async def get_my_feed(
+    request: Request,
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    scope, owner_id = await _owner_for_user(current, db)
+    res = await db.execute(
+        select(CalendarFeedToken).where(CalendarFeedToken.scope == scope, CalendarFeedToken.owner_id == owner_id)
+    )
+    feed = res.scalar_one_or_none()
+    if not feed:
+        raise HTTPException(status_code=404, detail="Todavía no hay feed de calendario")
+    return _feed_out(request, feed)
+
+@router.post("/feed", response_model=CalendarFeedOut, status_code=201, dependencies=[Depends(require_roles(*_OWNER_ROLES))])
+async def create_or_rotate_my_feed(
+    request: Request,
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Crea el feed o, si ya existía, rota el token (la URL anterior deja de funcionar)."""
+    scope, owner_id = await _owner_for_user(current, db)
+    res = await db.execute(
+        select(CalendarFeedToken).where(CalendarFeedToken.scope == scope, CalendarFeedToken.owner_id == owner_id)
+    )
+    feed = res.scalar_one_or_none()
+    if not feed:
+        feed = CalendarFeedToken(scope=scope, owner_id=owner_id)
+        db.add(feed)
+    feed.token = secrets.token_urlsafe(32)
+    feed.created_at = datetime.utcnow()
+    await db.commit()
+    return _feed_out(request, feed)
+
+@router.delete("/feed", status_code=204, dependencies=[Depends(require_roles(*_OWNER_ROLES))])
+async def revoke_my_feed(current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    scope, owner_id = await _owner_for_user(current, db)
+    await db.execute(
+        delete(CalendarFeedToken).where(CalendarFeedToken.scope == scope, CalendarFeedToken.owner_id == owner_id)
+    )
+    await db.commit()
+    return
+
+# ---------- feed .ics (público, autenticado por el token de la URL) ----------
+@router.get("/{token}.ics", name="calendar_feed_ics")
+async def calendar_feed(token: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Turnos del doctor o paciente entre ICAL_PAST_DAYS atrás e ICAL_FUTURE_DAYS adelante.
+    Responde 304 si el feed no cambió (ETag por los id + updated_at de los turnos de la
+    ventana); si cambió, lo transmite fila a fila desde un cursor del servidor.
+    """
+    res = await db.execute(select(CalendarFeedToken).where(CalendarFeedToken.token == token))
+    feed = res.scalar_one_or_none()
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed no encontrado")
+
+    now = datetime.utcnow()
+    scope_col = Appointment.doctor_id if feed.scope == "doctor" else Appointment.patient_id
+    window = (
+        scope_col == feed.owner_id,
+        Appointment.starts_at >= now - timedelta(days=settings.ICAL_PAST_DAYS),
+        Appointment.starts_at < now + timedelta(days=settings.ICAL_FUTURE_DAYS),
+    )
+    # la ventana se corre con `now`: el ETag sale de los (id, updated_at) que hay en ella, así
+    # un turno que entra o sale del rango (o una baja) cambia el digest aunque no cambie el max
+    stamps = (
+        await db.execute(select(Appointment.id, Appointment.updated_at).where(*window).order_by(Appointment.id))
+    ).all()
+    h = hashlib.sha1(feed.token.encode())
+    for appt_id, updated_at in stamps:
+        h.update(f"|{appt_id}:{updated_at}".encode())
+    digest = h.hexdigest()[:24]
+    last_modified = max((u for _, u in stamps if u), default=None)
+    headers = {
+        "ETag": f'W/"{digest}"',
+        "Cache-Control": f"private, max-age={settings.ICAL_CACHE_SECONDS}",
+    }
+    if last_modified:
+        headers["Last-Modified"] = _http_date(last_modified)
+    if _not_modified(request, headers["ETag"], last_modified):
+        return Response(status_code=304, headers=headers)
+
+    owner_model = Doctor if feed.scope == "doctor" else Patient
+    owner_name = (await db.execute(select(owner_model.name).where(owner_model.id == feed.owner_id))).scalar()
+    # no retener una conexión del pool de la request mientras dura la transmisión
+    await db.close()
+
+    q = (
+        select(
+            Appointment.id,
+            Appointment.starts_at,
+            Appointment.ends_at,
+            Appointment.updated_at,
+            Appointment.type,
+            Appointment.status,
+            Doctor.name.label("doctor_name"),
+            Doctor.specialty,
+            Patient.name.label("patient_name"),
+            Clinic.name.label("clinic_name"),
+            Clinic.address,
+            Clinic.city,
+        )
+        .outerjoin(Doctor, Doctor.id == Appointment.doctor_id)
+        .outerjoin(Patient, Patient.id == Appointment.patient_id)
+        .outerjoin(Clinic, Clinic.id == Appointment.clinic_id)
+        .where(*window)
+        .order_by(Appointment.starts_at, Appointment.id)
+        .execution_options(yield_per=200)
+    )
+
+    async def body():
+        yield calendar_header(f"Turnos - {owner_name or ''}".strip(" -"))
+        async with SessionLocal() as s:
+            result = await s.stream(q)
+            async for r in result:
+                if feed.scope == "doctor":
+                    summary = f"Turno: {r.patient_name or 'Paciente'}"
+                else:
+                    summary = f"Turno con {r.doctor_name or 'Doctor'}" + (f" ({r.specialty})" if r.specialty else "")
+                yield vevent(
+                    uid=f"{r.id}@clinic-hub",
+                    starts_at=r.starts_at,
+                    ends_at=r.ends_at,
+                    updated_at=r.updated_at,
+                    status=r.status.value,
+                    summary=summary,
+                    location=", ".join(p for p in (r.clinic_name, r.address, r.city) if p),
+                    description=f"Tipo: {r.type.value}",
+                )
+        yield calendar_footer()
+
+    return StreamingResponse(body(), media_type="text/calendar; charset=utf-8", headers=headers)
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.api.deps import get_current_user, require_roles
 from app.models.user import RoleEnum
@@ -11,7 +10,12 @@ from app.models.clinic import Clinic
 from app.models.doctor import Doctor
 from app.models.patient import Patient
 from app.models.links import ClinicDoctor, ClinicPatient  # <- ajusta si el nombre difiere
-from app.schemas.clinic import ClinicCreate, ClinicOut, ClinicUpdate
+from app.models.next_slot import DoctorNextSlot
+from app.models.search_term import SearchTerm
+from app.schemas.clinic import ClinicCreate, ClinicOut, ClinicUpdate, ClinicNearbyOut
+from app.services.next_slots import refresh_doctors
+from app.services.geo import covering_cells, geohash_of, haversine_km
+from app.services.search_index import DOCTOR, index_clinic_doctors, index_doctors, prefix_range, prefix_search
 
 router = APIRouter(prefix="/clinics", tags=["clinics"])
 
@@ -24,12 +28,32 @@ async def _get_clinic_or_404(id: str, db: AsyncSession) -> Clinic:
         raise HTTPException(status_code=404, detail="Clínica no encontrada")
     return c
 
+def _with_counts(q, summary: bool):
+    """summary=true: agrega doctor_count / patient_count con subconsultas COUNT por clínica."""
+    if not summary:
+        return q
+    doctors = select(func.count()).where(ClinicDoctor.clinic_id == Clinic.id).correlate(Clinic).scalar_subquery()
+    patients = select(func.count()).where(ClinicPatient.clinic_id == Clinic.id).correlate(Clinic).scalar_subquery()
+    return q.add_columns(doctors.label("doctor_count"), patients.label("patient_count"))
+
+def _clinic_out(row, summary: bool) -> ClinicOut:
+    if not summary:
+        return ClinicOut.model_validate(row)
+    c, doctor_count, patient_count = row
+    return ClinicOut.model_validate(c).model_copy(update={"doctor_count": doctor_count, "patient_count": patient_count})
+
+async def _list_clinics(db: AsyncSession, q, summary: bool) -> list[ClinicOut]:
+    res = await db.execute(_with_counts(q, summary))
+    rows = res.all() if summary else res.scalars().all()
+    return [_clinic_out(r, summary) for r in rows]
+
 # ---------- endpoints ----------
 
 # ---------- create ----------
 @router.post("/", response_model=ClinicOut, status_code=201, dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
 async def create_clinic(payload: ClinicCreate, db: AsyncSession = Depends(get_db)):
     clinic = Clinic(**payload.model_dump())
+    clinic.geohash = geohash_of(clinic.lat, clinic.lng)
     db.add(clinic)
     await db.commit()
     await db.refresh(clinic)
@@ -41,25 +65,58 @@ async def list_clinics(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    summary: bool = Query(False, description="Incluir doctor_count y patient_count"),
 ):
-    q = (
-        select(Clinic)
-        .options(selectinload(Clinic.doctors), selectinload(Clinic.patients))
-        .offset(offset)
-        .limit(limit)
+    q = select(Clinic).offset(offset).limit(limit)
+    return await _list_clinics(db, q, summary)
+
+# ---------- cercanas ----------
+@router.get("/nearby", response_model=list[ClinicNearbyOut])
+async def list_nearby_clinics(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(5, gt=0, le=100, description="Radio en km"),
+    specialty: str | None = Query(None, description="Sólo clínicas con un doctor de esta especialidad (prefijo, sin acentos)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    # candidatos: celdas de geohash que cubren el radio (rangos sobre ix_clinic_geohash)
+    q = select(Clinic.id, Clinic.lat, Clinic.lng).where(
+        or_(*(prefix_range(Clinic.geohash, cell) for cell in covering_cells(lat, lng, radius)))
     )
-    rows = (await db.execute(q)).scalars().all()
-    return rows
+    if specialty:
+        hits = prefix_search(DOCTOR, specialty, SearchTerm.field == "specialty")
+        if hits is None:
+            return []   # sin palabras buscables no hay especialidad que matchee
+        q = q.where(Clinic.id.in_(
+            select(ClinicDoctor.clinic_id).join(hits, hits.c.entity_id == ClinicDoctor.doctor_id)
+        ))
+    dist = {}
+    for cid, clat, clng in (await db.execute(q)).all():
+        d = haversine_km(lat, lng, clat, clng)
+        if d <= radius:
+            dist[cid] = d
+    nearest = sorted(dist, key=lambda cid: (dist[cid], cid))[:limit]
+    if not nearest:
+        return []
+    rows = (await db.execute(select(Clinic).where(Clinic.id.in_(nearest)))).scalars().all()
+    by_id = {c.id: c for c in rows}
+    return [
+        ClinicNearbyOut(**ClinicOut.model_validate(by_id[cid]).model_dump(), distance_km=round(dist[cid], 3))
+        for cid in nearest
+    ]
 
 @router.get("/{id}", response_model=ClinicOut)
-async def get_clinic(id: str, db: AsyncSession = Depends(get_db)):
-    q = select(Clinic).options(
-        selectinload(Clinic.doctors), selectinload(Clinic.patients)
-    ).where(Clinic.id == id)
-    c = (await db.execute(q)).scalar_one_or_none()
-    if not c:
+async def get_clinic(
+    id: str,
+    summary: bool = Query(False, description="Incluir doctor_count y patient_count"),
+    db: AsyncSession = Depends(get_db),
+):
+    res = await db.execute(_with_counts(select(Clinic).where(Clinic.id == id), summary))
+    row = res.one_or_none() if summary else res.scalar_one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Clínica no encontrada")
-    return c
+    return _clinic_out(row, summary)
 
 # ---------- filtros útiles ----------
 # 1) Clínicas por DOCTOR (ID explícito)
@@ -69,20 +126,19 @@ async def list_by_doctor(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    summary: bool = Query(False, description="Incluir doctor_count y patient_count"),
 ):
     q = (
         select(Clinic)
         .join(ClinicDoctor, ClinicDoctor.clinic_id == Clinic.id)
         .where(ClinicDoctor.doctor_id == doctor_id)
-        .options(selectinload(Clinic.doctors), selectinload(Clinic.patients))
         # .order_by(Clinic.created_at.desc())  # <- quitar si no existe
         # .order_by(Clinic.name.asc())
         # .order_by(Clinic.id.desc())
         .offset(offset)
         .limit(limit)
     )
-    rows = (await db.execute(q)).scalars().all()
-    return rows
+    return await _list_clinics(db, q, summary)
 
 
 # 2) Clínicas por PACIENTE (ID explícito)
@@ -92,20 +148,19 @@ async def list_by_patient(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    summary: bool = Query(False, description="Incluir doctor_count y patient_count"),
 ):
     q = (
         select(Clinic)
         .join(ClinicPatient, ClinicPatient.clinic_id == Clinic.id)
         .where(ClinicPatient.patient_id == patient_id)
-        .options(selectinload(Clinic.doctors), selectinload(Clinic.patients))
         # .order_by(Clinic.created_at.desc())  # <- quitar si no existe
         # .order_by(Clinic.name.asc())
         # .order_by(Clinic.id.desc())
         .offset(offset)
         .limit(limit)
     )
-    rows = (await db.execute(q)).scalars().all()
-    return rows
+    return await _list_clinics(db, q, summary)
 
 # 3) Clínicas del DOCTOR autenticado (/clinics/doctor/me)
 @router.get("/doctor/me", response_model=list[ClinicOut])
@@ -114,6 +169,7 @@ async def list_my_clinics_as_doctor(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    summary: bool = Query(False, description="Incluir doctor_count y patient_count"),
 ):
     # buscar el doctor por user_id
     doc = (await db.execute(select(Doctor).where(Doctor.user_id == current_user.id))).scalar_one_or_none()
@@ -123,10 +179,8 @@ async def list_my_clinics_as_doctor(
         select(Clinic)
         .join(ClinicDoctor, ClinicDoctor.clinic_id == Clinic.id)
         .where(ClinicDoctor.doctor_id == doc.id)
-        .options(selectinload(Clinic.doctors), selectinload(Clinic.patients))
     )
-    rows = (await db.execute(q.offset(offset).limit(limit))).scalars().all()
-    return rows
+    return await _list_clinics(db, q.offset(offset).limit(limit), summary)
 
 # 4) Clínicas del PACIENTE autenticado (/clinics/patient/me)
 @router.get("/patient/me", response_model=list[ClinicOut])
@@ -135,6 +189,7 @@ async def list_my_clinics_as_patient(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    summary: bool = Query(False, description="Incluir doctor_count y patient_count"),
 ):
     pat = (await db.execute(select(Patient).where(Patient.user_id == current_user.id))).scalar_one_or_none()
     if not pat:
@@ -143,10 +198,8 @@ async def list_my_clinics_as_patient(
         select(Clinic)
         .join(ClinicPatient, ClinicPatient.clinic_id == Clinic.id)
         .where(ClinicPatient.patient_id == pat.id)
-        .options(selectinload(Clinic.doctors), selectinload(Clinic.patients))
     )
-    rows = (await db.execute(q.offset(offset).limit(limit))).scalars().all()
-    return rows
+    return await _list_clinics(db, q.offset(offset).limit(limit), summary)
 
 # ---------- update ----------
 @router.put("/{id}", response_model=ClinicOut, dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
@@ -160,10 +213,14 @@ async def replace_clinic(
         raise HTTPException(status_code=404, detail="Clínica no encontrada")
 
     data = payload.model_dump()
+    renamed = data["name"] != clinic.name
     for k, v in data.items():
         setattr(clinic, k, v)
+    clinic.geohash = geohash_of(clinic.lat, clinic.lng)
 
     await db.flush()
+    if renamed:
+        await index_clinic_doctors(db, id)
     await db.commit()
     await db.refresh(clinic)
     return clinic
@@ -180,10 +237,15 @@ async def update_clinic(
         raise HTTPException(status_code=404, detail="Clínica no encontrada")
 
     updates = payload.model_dump(exclude_unset=True)
+    renamed = "name" in updates and updates["name"] != clinic.name
     for k, v in updates.items():
         setattr(clinic, k, v)
+    if updates.keys() & {"lat", "lng"}:
+        clinic.geohash = geohash_of(clinic.lat, clinic.lng)
 
     await db.flush()
+    if renamed:
+        await index_clinic_doctors(db, id)
     await db.commit()
     await db.refresh(clinic)
     return clinic
@@ -195,7 +257,13 @@ async def delete_clinic(id: str, db: AsyncSession = Depends(get_db)):
     if not clinic:
         raise HTTPException(status_code=404, detail="Clínica no encontrada")
 
+    doctor_ids = (await db.execute(
+        select(ClinicDoctor.doctor_id).where(ClinicDoctor.clinic_id == id)
+    )).scalars().all()
+    await db.execute(delete(DoctorNextSlot).where(DoctorNextSlot.clinic_id == id))
     await db.delete(clinic)
+    await db.flush()
+    await index_doctors(db, list(doctor_ids))
     await db.commit()
 
 # ---------- asignaciones ----------
@@ -210,12 +278,17 @@ async def assign_doctor_to_clinic(id: str, doctor_id: str, db: AsyncSession = De
     )).scalar_one_or_none()
     if not exists:
         db.add(ClinicDoctor(clinic_id=id, doctor_id=doctor_id))
+        await db.flush()
+        await refresh_doctors(db, [doctor_id])
+        await index_doctors(db, [doctor_id])
         await db.commit()
     return
 
 @router.delete("/{id}/doctors/{doctor_id}", status_code=204, dependencies=[Depends(require_roles(RoleEnum.admin))])
 async def unassign_doctor_from_clinic(id: str, doctor_id: str, db: AsyncSession = Depends(get_db)):
     await db.execute(delete(ClinicDoctor).where(ClinicDoctor.clinic_id == id, ClinicDoctor.doctor_id == doctor_id))
+    await refresh_doctors(db, [doctor_id])
+    await index_doctors(db, [doctor_id])
     await db.commit()
     return
 
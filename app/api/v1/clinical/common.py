@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.doctor import Doctor
 from app.models.patient import Patient
 from app.models.user import User, RoleEnum
 
@@ -9,6 +10,11 @@ async def ensure_patient_exists(db: AsyncSession, patient_id: str):
     if not res.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
 
+async def ensure_doctor_exists(db: AsyncSession, doctor_id: str):
+    res = await db.execute(select(Doctor.id).where(Doctor.id == doctor_id))
+    if not res.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Doctor no encontrado")
+
 def can_write(user: User) -> bool:
     return user.role in (RoleEnum.admin, RoleEnum.doctor)
 
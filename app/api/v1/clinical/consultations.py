@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_db
 from app.api.deps import get_current_user, require_roles
+from app.api.v1._helpers import decode_cursor, keyset_before, paginate
 from app.models.user import RoleEnum, User
 from app.models.clinical import Consultation
 from app.models.patient import Patient
+from app.models.doctor import Doctor
 from app.schemas.clinical import (
-    ConsultationCreate, ConsultationOut, ConsultationUpdate,
+    ConsultationCreate, ConsultationOut, ConsultationUpdate, ConsultationSearchHitOut,
 )
+from app.services.consultation_search import search_consultations, index_consultation, unindex_consultation
+from app.services.text_search import tokenize, highlight
 from .common import ensure_patient_exists
 
 router = APIRouter(prefix="/clinical/consultations", tags=["Clinical - Consultations"])
@@ -23,18 +29,80 @@ async def create_consultation(payload: ConsultationCreate, db: AsyncSession = De
     db.add(c)
     await db.commit()
     await db.refresh(c)
+    index_consultation(c)
     return c
 
 # LIST (por patient_id)
 @router.get("", response_model=list[ConsultationOut],
             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
-async def list_consultations(patient_id: str = Query(...), db: AsyncSession = Depends(get_db)):
-    res = await db.execute(
-        select(Consultation)
-        .where(Consultation.patient_id == patient_id)
-        .order_by(Consultation.date.desc())
-    )
-    return res.scalars().all()
+async def list_consultations(
+    response: Response,
+    patient_id: str = Query(...),
+    date_from: datetime | None = Query(None),
+    date_to:   datetime | None = Query(None),
+    doctor_id: str | None = Query(None),
+    specialty: str | None = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db),
+):
+    q = select(Consultation).where(Consultation.patient_id == patient_id)
+    if date_from:
+        q = q.where(Consultation.date >= date_from)
+    if date_to:
+        q = q.where(Consultation.date < date_to)
+    if doctor_id:
+        q = q.where(Consultation.doctor_id == doctor_id)
+    if specialty:
+        q = q.where(Consultation.specialty == specialty)
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor, 1)
+        q = q.where(keyset_before(Consultation.date, Consultation.id, c_ts, c_id))
+    res = await db.execute(q.order_by(Consultation.date.desc(), Consultation.id.desc()).limit(limit + 1))
+    return paginate(res.scalars().all(), limit, response)
+
+# SEARCH (texto en diagnóstico y notas): declarada antes de /{id}
+@router.get("/search", response_model=list[ConsultationSearchHitOut],
+            dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
+async def search_consultations_text(
+    q: str = Query(..., min_length=2, description="Términos (sin importar acentos ni mayúsculas)"),
+    patient_id: str | None = Query(None),
+    doctor_id: str | None = Query(None, description="Doctor: por defecto el propio si no se pide un paciente"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Búsqueda con ranking por relevancia en diagnosis y notes, acotada a un paciente y/o
+    doctor. Un doctor busca en sus consultas o en la historia de un paciente; un paciente,
+    sólo en la propia.
+    """
+    terms = tokenize(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="La búsqueda no tiene términos válidos")
+    if current.role == RoleEnum.doctor:
+        my_doc = (await db.execute(select(Doctor.id).where(Doctor.user_id == current.id))).scalar_one_or_none()
+        if not my_doc or (doctor_id and doctor_id != my_doc):
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+        if not patient_id:
+            doctor_id = my_doc
+    elif current.role == RoleEnum.patient:
+        my_pt = (await db.execute(select(Patient.id).where(Patient.user_id == current.id))).scalar_one_or_none()
+        if not my_pt or (patient_id and patient_id != my_pt):
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+        patient_id = my_pt
+
+    hits = await search_consultations(db, q, limit, offset, patient_id=patient_id, doctor_id=doctor_id)
+    return [
+        ConsultationSearchHitOut(
+            id=c.id, patient_id=c.patient_id, doctor_id=c.doctor_id, appointment_id=c.appointment_id,
+            date=c.date, specialty=c.specialty, diagnosis=c.diagnosis, score=round(score, 4),
+            diagnosis_highlight=highlight(c.diagnosis, terms),
+            notes_highlight=highlight(c.notes, terms),
+        )
+        for c, score in hits
+    ]
 
 # GET by id
 @router.get("/{id}", response_model=ConsultationOut,
@@ -60,6 +128,7 @@ async def update_consultation(id: str, patch: ConsultationUpdate, db: AsyncSessi
 
     await db.commit()
     await db.refresh(c)
+    index_consultation(c)
     return c
 
 # DELETE
@@ -68,6 +137,7 @@ async def update_consultation(id: str, patch: ConsultationUpdate, db: AsyncSessi
 async def delete_consultation(id: str, db: AsyncSession = Depends(get_db)):
     await db.execute(delete(Consultation).where(Consultation.id == id))
     await db.commit()
+    unindex_consultation(id)
     return
 
 # by appointment
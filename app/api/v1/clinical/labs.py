@@ -1,36 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, delete
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, delete, exists
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
+from app.core.config import settings
 from app.core.db import get_db
-from app.api.deps import get_current_user, require_roles
+from app.api.deps import get_current_user, get_current_user_sse, require_roles
+from app.api.v1._helpers import decode_cursor, keyset_after, keyset_before, paginate
 from app.models.user import RoleEnum, User
-from app.models.labs_vitals import LabResult
+from app.models.labs_vitals import LabResult, LabResultBody, LabStatus
+from app.models.doctor import Doctor
 from app.models.patient import Patient
-from app.schemas.clinical import LabCreate, LabUpdate, LabOut
-from .common import ensure_patient_exists
+from app.models.links import ClinicPatient
+from app.schemas.clinical import LabCreate, LabUpdate, LabOut, LabSummaryOut
+from app.services.event_bus import EventBus, sse_response
+from app.services.lab_bodies import store_lab_result, load_lab_result
+from .common import ensure_doctor_exists, ensure_patient_exists
 
 router = APIRouter(prefix="/clinical/labs", tags=["Clinical - Labs"])
 
+# eventos de laboratorio (alta pendiente, completado, baja) para el doctor, el paciente y la worklist
+lab_bus = EventBus(settings.EVENT_LOG_SIZE)
+_WORKLIST: tuple[str, str] = ("worklist", "all")
+
+def _publish_lab(kind: str, lab: LabResult) -> None:
+    """Publica post-commit; sin el cuerpo del resultado (se pide con GET /{id})."""
+    scopes = {_WORKLIST, ("patient", lab.patient_id)}
+    if lab.doctor_id:
+        scopes.add(("doctor", lab.doctor_id))
+    lab_bus.publish(kind, scopes, jsonable_encoder({
+        "id": lab.id, "patient_id": lab.patient_id, "doctor_id": lab.doctor_id,
+        "test": lab.test, "date": lab.date, "status": lab.status,
+        "result_summary": lab.result_summary, "result_size": lab.result_size,
+    }))
+
+# los listados no cargan lab_results.result (puede ser grande)
+_NO_BODY = defer(LabResult.result, raiseload=True)
+
+def _lab_out(lab: LabResult, text: str) -> LabOut:
+    return LabOut.model_validate(lab, from_attributes=True).model_copy(update={"result": text})
+
+async def _profile_id(db: AsyncSession, model, user: User) -> str | None:
+    return (await db.execute(select(model.id).where(model.user_id == user.id))).scalar_one_or_none()
+
 @router.post("", response_model=LabOut, status_code=201,
              dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
-async def add_lab(payload: LabCreate, db: AsyncSession = Depends(get_db)):
+async def add_lab(payload: LabCreate, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     await ensure_patient_exists(db, payload.patient_id)
-    lab = LabResult(**payload.model_dump())
+    if payload.doctor_id:
+        await ensure_doctor_exists(db, payload.doctor_id)
+    data = payload.model_dump()
+    text = data.pop("result") or ""
+    lab = LabResult(**data)
+    if not lab.doctor_id and current.role == RoleEnum.doctor:
+        lab.doctor_id = await _profile_id(db, Doctor, current)
     db.add(lab)
+    await store_lab_result(db, lab, text)
     await db.commit()
     await db.refresh(lab)
-    return lab
+    _publish_lab("lab.completed" if lab.status == LabStatus.complete else "lab.pending", lab)
+    return _lab_out(lab, text)
 
-@router.get("", response_model=list[LabOut],
+@router.get("", response_model=list[LabSummaryOut],
             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
-async def list_labs(patient_id: str = Query(...), db: AsyncSession = Depends(get_db)):
-    res = await db.execute(
-        select(LabResult)
-        .where(LabResult.patient_id == patient_id)
-        .order_by(LabResult.date.desc())
-    )
-    return res.scalars().all()
+async def list_labs(
+    response: Response,
+    patient_id: str = Query(...),
+    date_from: datetime | None = Query(None),
+    date_to:   datetime | None = Query(None),
+    status:    LabStatus | None = Query(None),
+    test:      str | None = Query(None, description="Nombre exacto del estudio"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db),
+):
+    q = select(LabResult).options(_NO_BODY).where(LabResult.patient_id == patient_id)
+    if date_from:
+        q = q.where(LabResult.date >= date_from)
+    if date_to:
+        q = q.where(LabResult.date < date_to)
+    if status:
+        q = q.where(LabResult.status == status)
+    if test:
+        q = q.where(LabResult.test == test)
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor, 1)
+        q = q.where(keyset_before(LabResult.date, LabResult.id, c_ts, c_id))
+    res = await db.execute(q.order_by(LabResult.date.desc(), LabResult.id.desc()).limit(limit + 1))
+    return paginate(res.scalars().all(), limit, response)
+
+# WORKLIST (todos los pacientes): declarada antes de /{id}
+@router.get("/worklist", response_model=list[LabSummaryOut],
+            dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
+async def lab_worklist(
+    response: Response,
+    status: LabStatus = Query(LabStatus.pending),
+    test: str | None = Query(None, description="Nombre exacto del estudio"),
+    doctor_id: str | None = Query(None, description="Doctor que lo pidió"),
+    clinic_id: str | None = Query(None, description="Sólo pacientes de la clínica"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Cola del laboratorio: estudios en `status` (por defecto pendientes), los más viejos
+    primero, paginada por (date, id) sobre el índice ix_lab_status_date.
+    """
+    q = select(LabResult).options(_NO_BODY).where(LabResult.status == status)
+    if test:
+        q = q.where(LabResult.test == test)
+    if doctor_id:
+        q = q.where(LabResult.doctor_id == doctor_id)
+    if clinic_id:
+        q = q.where(exists().where(
+            ClinicPatient.patient_id == LabResult.patient_id, ClinicPatient.clinic_id == clinic_id,
+        ))
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor, 1)
+        q = q.where(keyset_after(LabResult.date, LabResult.id, c_ts, c_id))
+    res = await db.execute(q.order_by(LabResult.date.asc(), LabResult.id.asc()).limit(limit + 1))
+    return paginate(res.scalars().all(), limit, response)
+
+# STREAM (SSE): declarada antes de /{id}
+@router.get("/stream")
+async def stream_lab_changes(
+    request: Request,
+    scope: Literal["doctor", "patient", "worklist"] = Query(...),
+    scope_id: str | None = Query(None, description="Por defecto, el perfil propio (admin: obligatorio)"),
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+    current: User = Depends(get_current_user_sse),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Server-Sent Events de laboratorio: lab.pending, lab.completed y lab.deleted. El doctor
+    que pidió el estudio (scope=doctor) ve el resultado al completarse sin hacer polling de
+    list_labs; scope=worklist recibe los de todos los pacientes (admin y doctores).
+    """
+    if scope == "worklist":
+        if current.role not in (RoleEnum.admin, RoleEnum.doctor):
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+        key = _WORKLIST
+    elif current.role == RoleEnum.admin:
+        if not scope_id:
+            raise HTTPException(status_code=400, detail="Falta scope_id")
+        key = (scope, scope_id)
+    else:
+        own = await _profile_id(db, Doctor if scope == "doctor" else Patient, current)
+        if current.role.value != scope or not own or scope_id not in (None, own):
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+        key = (scope, own)
+    # no retener una conexión del pool mientras dura el stream
+    await db.close()
+    return sse_response(lab_bus, request, {key}, last_event_id, settings.SSE_HEARTBEAT_SECONDS)
 
 @router.get("/{id}", response_model=LabOut,
             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
@@ -39,7 +164,7 @@ async def get_lab(id: str, db: AsyncSession = Depends(get_db)):
     lab = res.scalar_one_or_none()
     if not lab:
         raise HTTPException(status_code=404, detail="Laboratorio no encontrado")
-    return lab
+    return _lab_out(lab, await load_lab_result(db, lab))
 
 @router.patch("/{id}", response_model=LabOut,
               dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
@@ -48,21 +173,36 @@ async def update_lab(id: str, patch: LabUpdate, db: AsyncSession = Depends(get_d
     lab = res.scalar_one_or_none()
     if not lab:
         raise HTTPException(status_code=404, detail="Laboratorio no encontrado")
-    for k, v in patch.model_dump(exclude_unset=True).items():
+    was = lab.status
+    data = patch.model_dump(exclude_unset=True)
+    text = data.pop("result", None)
+    if data.get("doctor_id"):
+        await ensure_doctor_exists(db, data["doctor_id"])
+    for k, v in data.items():
         setattr(lab, k, v)
+    if text is not None:
+        await store_lab_result(db, lab, text)
+    else:
+        text = await load_lab_result(db, lab)
     await db.commit()
     await db.refresh(lab)
-    return lab
+    if lab.status != was:
+        _publish_lab("lab.completed" if lab.status == LabStatus.complete else "lab.pending", lab)
+    return _lab_out(lab, text)
 
 @router.delete("/{id}", status_code=204,
                dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
 async def delete_lab(id: str, db: AsyncSession = Depends(get_db)):
+    lab = (await db.execute(select(LabResult).options(_NO_BODY).where(LabResult.id == id))).scalar_one_or_none()
+    await db.execute(delete(LabResultBody).where(LabResultBody.lab_id == id))
     await db.execute(delete(LabResult).where(LabResult.id == id))
     await db.commit()
+    if lab:
+        _publish_lab("lab.deleted", lab)
     return
 
 # ------- “me” --------
-@router.get("/patient/me", response_model=list[LabOut],
+@router.get("/patient/me", response_model=list[LabSummaryOut],
             dependencies=[Depends(require_roles(RoleEnum.patient))])
 async def my_labs_patient(
     current: User = Depends(get_current_user),
@@ -75,6 +215,7 @@ async def my_labs_patient(
         return []
     res = await db.execute(
         select(LabResult)
+        .options(_NO_BODY)
         .where(LabResult.patient_id == pat.id)
         .order_by(LabResult.date.desc())
         .offset(offset).limit(limit)
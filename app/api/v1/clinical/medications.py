@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_db
 from app.api.deps import get_current_user, require_roles
+from app.api.v1._helpers import decode_cursor, keyset_before, paginate
 from app.models.user import RoleEnum, User
-from app.models.clinical import Medication
+from app.models.clinical import Medication, MedStatus
 from app.models.patient import Patient
 from app.schemas.clinical import MedicationCreate, MedicationUpdate, MedicationOut
 from .common import ensure_patient_exists
@@ -25,11 +28,30 @@ async def add_medication(payload: MedicationCreate, db: AsyncSession = Depends(g
 @router.get("", response_model=list[MedicationOut],
             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
 async def list_medications(
+    response: Response,
     patient_id: str = Query(...),
-    db: AsyncSession = Depends(get_db)
+    status: MedStatus | None = Query(None),
+    start_from: date | None = Query(None),
+    start_to:   date | None = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db),
 ):
-    res = await db.execute(select(Medication).where(Medication.patient_id == patient_id))
-    return res.scalars().all()
+    # orden: start_date desc (las que no tienen fecha al final), id desc
+    q = select(Medication).where(Medication.patient_id == patient_id)
+    if status:
+        q = q.where(Medication.status == status)
+    if start_from:
+        q = q.where(Medication.start_date >= start_from)
+    if start_to:
+        q = q.where(Medication.start_date < start_to)
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor, 1)
+        q = q.where(keyset_before(
+            Medication.start_date, Medication.id, c_ts.date() if c_ts else None, c_id, nulls_last=True,
+        ))
+    res = await db.execute(q.order_by(Medication.start_date.desc(), Medication.id.desc()).limit(limit + 1))
+    return paginate(res.scalars().all(), limit, response, ts_attr="start_date")
 
 @router.patch("/{id}", response_model=MedicationOut,
               dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
@@ -67,6 +89,7 @@ async def my_medications_patient(
     res = await db.execute(
         select(Medication)
         .where(Medication.patient_id == pat.id)
+        .order_by(Medication.start_date.desc(), Medication.id.desc())
         .offset(offset).limit(limit)
     )
     return res.scalars().all()
@@ -1,36 +1,282 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, delete
+import json
+from datetime import datetime
+from typing import AsyncIterator, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
+from sqlalchemy import select, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.config import settings
+from app.core.db import get_db, dialect_name, date_bucket
+from app.api.v1._helpers import decode_cursor, keyset_before, paginate
 from app.api.deps import get_current_user, require_roles
 from app.models.user import RoleEnum, User
-from app.models.labs_vitals import Vital
+from app.models.labs_vitals import Vital, VitalStatus, PatientLatestVital
 from app.models.patient import Patient
-from app.schemas.clinical import VitalCreate, VitalUpdate, VitalOut
-from .common import ensure_patient_exists
+from app.schemas.clinical import (
+    VitalCreate, VitalUpdate, VitalOut, VitalSeriesOut, VitalIngestOut, PatientLatestVitalsOut,
+)
+from app.services.vitals_parse import parse_vital, metric_code_for, metric_unit
+from app.services.vitals_ingest import ingest_vitals, enqueue_vitals, buffer_free
+from app.services.vitals_ranges import classify_vitals
+from app.services.latest_vitals import bump_latest_vitals, refresh_latest_vitals
+from app.services.timeseries import lttb
+from .common import ensure_patient_exists, is_patient
 
 router = APIRouter(prefix="/clinical/vitals", tags=["Clinical - Vitals"])
 
+def _apply_parsed(vt: Vital) -> None:
+    """Completa la representación numérica (metric_code, num_value/2, unit) desde el texto."""
+    p = parse_vital(vt.metric, vt.value)
+    vt.metric_code, vt.num_value, vt.num_value2, vt.unit = p.metric_code, p.num_value, p.num_value2, p.unit
+
 @router.post("", response_model=VitalOut, status_code=201,
              dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
 async def add_vital(payload: VitalCreate, db: AsyncSession = Depends(get_db)):
     await ensure_patient_exists(db, payload.patient_id)
     vt = Vital(**payload.model_dump())
+    _apply_parsed(vt)
     db.add(vt)
-    await db.commit()
+    await db.flush()
+    await classify_vitals(db, Vital.id == vt.id)
     await db.refresh(vt)
+    await bump_latest_vitals(db, [vt])
+    await db.commit()
     return vt
 
+def vitals_page_query(
+    patient_id: str,
+    date_from: datetime | None,
+    date_to: datetime | None,
+    status: VitalStatus | None,
+    limit: int,
+    cursor: str | None,
+):
+    """Página (limit + 1 filas) de vitals del paciente en orden (date desc, id desc)."""
+    q = select(Vital).where(Vital.patient_id == patient_id)
+    if date_from:
+        q = q.where(Vital.date >= date_from)
+    if date_to:
+        q = q.where(Vital.date < date_to)
+    if status:
+        q = q.where(Vital.status == status)
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor, 1)
+        q = q.where(keyset_before(Vital.date, Vital.id, c_ts, c_id))
+    return q.order_by(Vital.date.desc(), Vital.id.desc()).limit(limit + 1)
+
+# ---------- ingesta masiva (dispositivos) ----------
+async def _readings(request: Request) -> AsyncIterator[tuple[int, object]]:
+    """(índice, objeto) del cuerpo: NDJSON leído a medida que llega, o un arreglo JSON."""
+    ctype = request.headers.get("content-type", "")
+    if "ndjson" in ctype or "jsonlines" in ctype:
+        buf, index = b"", 0
+        async for chunk in request.stream():
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                index += 1
+        if buf.strip():
+            yield index, buf
+        return
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="JSON inválido")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Se esperaba un arreglo JSON o NDJSON")
+    for index, obj in enumerate(body):
+        yield index, obj
+
+@router.post("/ingest", response_model=VitalIngestOut,
+             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
+async def ingest_vitals_bulk(
+    request: Request,
+    response: Response,
+    buffered: bool = Query(False, description="Encolar y volcar en segundo plano (202)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Carga masiva de lecturas (campos de VitalCreate), como arreglo JSON o NDJSON
+    (application/x-ndjson). Se valida cada fila y se inserta por lotes; cada lote se
+    confirma por separado, así que un error en una fila no descarta a las demás.
+    Con buffered=true se valida la forma, se encola y se responde 202: los pacientes
+    inexistentes se descartan al volcar.
+    """
+    received, inserted = 0, 0
+    errors: list[dict] = []
+    pending: list[tuple[int, dict]] = []
+
+    async def _flush():
+        nonlocal inserted
+        n, errs = await ingest_vitals(db, pending)
+        await db.commit()
+        inserted += n
+        errors.extend(errs)
+        pending.clear()
+
+    async for index, obj in _readings(request):
+        received += 1
+        try:
+            if isinstance(obj, bytes):
+                obj = json.loads(obj)
+            reading = VitalCreate.model_validate(obj)
+        except ValueError as e:  # JSON mal formado o ValidationError
+            if isinstance(e, ValidationError):
+                err = e.errors()[0]
+                msg = f"{'.'.join(map(str, err['loc'])) or 'fila'}: {err['msg']}"
+            else:
+                msg = "JSON inválido"
+            errors.append({"index": index, "detail": msg})
+            continue
+        pending.append((index, reading.model_dump()))
+        if not buffered and len(pending) >= settings.VITALS_INGEST_CHUNK:
+            await _flush()
+
+    queued = 0
+    if buffered:
+        if len(pending) > buffer_free():
+            raise HTTPException(status_code=503, detail="Buffer de ingesta lleno, reintentá más tarde")
+        enqueue_vitals([r for _, r in pending])
+        queued = len(pending)
+        response.status_code = status.HTTP_202_ACCEPTED
+    elif pending:
+        await _flush()
+
+    errors.sort(key=lambda e: e["index"])
+    return VitalIngestOut(
+        received=received, inserted=inserted, queued=queued,
+        errors=errors[:settings.VITALS_INGEST_MAX_ERRORS],
+    )
+
 @router.get("", response_model=list[VitalOut],
             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
-async def list_vitals(patient_id: str = Query(...), db: AsyncSession = Depends(get_db)):
+async def list_vitals(
+    response: Response,
+    patient_id: str = Query(...),
+    date_from: datetime | None = Query(None),
+    date_to:   datetime | None = Query(None),
+    metric: str | None = Query(None, description="Código o alias (bp, TA, FC, Peso...)"),
+    status: VitalStatus | None = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db),
+):
+    q = vitals_page_query(patient_id, date_from, date_to, status, limit, cursor)
+    if metric:
+        code = metric_code_for(metric)
+        q = q.where(Vital.metric_code == code) if code else q.where(Vital.metric == metric)
+    res = await db.execute(q)
+    return paginate(res.scalars().all(), limit, response)
+
+# ÚLTIMOS VALORES de varios pacientes (dashboards): declarada antes de /{id}
+@router.get("/latest", response_model=list[PatientLatestVitalsOut],
+            dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
+async def latest_vitals(
+    patient_ids: str = Query(..., description="IDs de pacientes separados por coma (máx. 200)"),
+    metrics: str | None = Query(None, description="Códigos o alias separados por coma (bp,hr,weight...)"),
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Última lectura por métrica de cada paciente pedido, desde patient_latest_vitals."""
+    ids = list(dict.fromkeys(i.strip() for i in patient_ids.split(",") if i.strip()))
+    if not ids or len(ids) > 200:
+        raise HTTPException(status_code=400, detail="patient_ids debe tener entre 1 y 200 IDs")
+    if is_patient(current):
+        my_pt = (await db.execute(select(Patient.id).where(Patient.user_id == current.id))).scalar_one_or_none()
+        if ids != [my_pt]:
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+
+    q = select(PatientLatestVital).where(PatientLatestVital.patient_id.in_(ids))
+    if metrics:
+        codes = {m.strip(): metric_code_for(m) for m in metrics.split(",") if m.strip()}
+        unknown = [m for m, code in codes.items() if not code]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Métrica desconocida: {', '.join(unknown)}")
+        q = q.where(PatientLatestVital.metric_code.in_(set(codes.values())))
+
+    by_patient: dict[str, list] = {pid: [] for pid in ids}
+    for row in (await db.execute(q.order_by(PatientLatestVital.metric_code))).scalars():
+        by_patient[row.patient_id].append(row)
+    return [PatientLatestVitalsOut(patient_id=pid, vitals=rows) for pid, rows in by_patient.items()]
+
+# SERIE (gráficos): declarada antes de /{id}
+@router.get("/series", response_model=VitalSeriesOut,
+            dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
+async def vital_series(
+    patient_id: str = Query(...),
+    metric: str = Query(..., description="Código (bp, hr, temp, spo2, weight...) o alias (TA, FC, Peso...)"),
+    date_from: datetime | None = Query(None),
+    date_to:   datetime | None = Query(None),
+    mode:      Literal["lttb", "buckets"] = Query("lttb"),
+    points:    int = Query(500, ge=10, le=5000, description="Máximo de puntos en modo lttb"),
+    bucket:    Literal["hour", "day", "week", "month"] = Query("day"),
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Serie numérica de una métrica del paciente: puntos reducidos con LTTB (o crudos si
+    entran en `points`) o baldes min/max/promedio agregados en SQL. Lee sólo el índice
+    ix_vital_patient_metric_date. LTTB trabaja en memoria: lee como mucho las
+    VITALS_SERIES_MAX_ROWS lecturas más recientes del rango (truncated=True si había más).
+    """
+    code = metric_code_for(metric)
+    if not code:
+        raise HTTPException(status_code=400, detail=f"Métrica desconocida: {metric}")
+    if is_patient(current):
+        my_pt = (await db.execute(select(Patient.id).where(Patient.user_id == current.id))).scalar_one_or_none()
+        if my_pt != patient_id:
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+
+    where = [Vital.patient_id == patient_id, Vital.metric_code == code, Vital.num_value.is_not(None)]
+    if date_from:
+        where.append(Vital.date >= date_from)
+    if date_to:
+        where.append(Vital.date < date_to)
+
+    if mode == "buckets":
+        b = date_bucket(dialect_name(db), Vital.date, bucket).label("bucket")
+        res = await db.execute(
+            select(
+                b,
+                func.count().label("n"),
+                func.min(Vital.num_value).label("min"),
+                func.max(Vital.num_value).label("max"),
+                func.avg(Vital.num_value).label("avg"),
+                func.min(Vital.num_value2).label("min2"),
+                func.max(Vital.num_value2).label("max2"),
+                func.avg(Vital.num_value2).label("avg2"),
+            )
+            .where(*where)
+            .group_by(b)
+            .order_by(b)
+        )
+        buckets = [dict(r._mapping) for r in res.all()]
+        return VitalSeriesOut(
+            patient_id=patient_id, metric_code=code, unit=metric_unit(code), mode="buckets",
+            total=sum(x["n"] for x in buckets), buckets=buckets,
+        )
+
+    cap = settings.VITALS_SERIES_MAX_ROWS
     res = await db.execute(
-        select(Vital)
-        .where(Vital.patient_id == patient_id)
+        select(Vital.date, Vital.num_value, Vital.num_value2)
+        .where(*where)
         .order_by(Vital.date.desc())
+        .limit(cap + 1)
+    )
+    newest = res.all()
+    truncated = len(newest) > cap
+    rows = [(d.timestamp(), v, v2, d) for d, v, v2 in reversed(newest[:cap])]
+    sampled = lttb(rows, points)
+    return VitalSeriesOut(
+        patient_id=patient_id, metric_code=code, unit=metric_unit(code),
+        mode="raw" if len(sampled) == len(rows) else "lttb",
+        total=len(rows), truncated=truncated,
+        points=[{"date": d, "value": v, "value2": v2} for _, v, v2, d in sampled],
     )
-    return res.scalars().all()
 
 @router.get("/{id}", response_model=VitalOut,
             dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
@@ -48,8 +294,19 @@ async def update_vital(id: str, patch: VitalUpdate, db: AsyncSession = Depends(g
     vt = res.scalar_one_or_none()
     if not vt:
         raise HTTPException(status_code=404, detail="Signo vital no encontrado")
-    for k, v in patch.model_dump(exclude_unset=True).items():
+    data = patch.model_dump(exclude_unset=True)
+    old_key = (vt.patient_id, vt.metric_code)
+    for k, v in data.items():
         setattr(vt, k, v)
+    if data.keys() & {"metric", "value"}:
+        _apply_parsed(vt)
+        if "status" not in data:
+            vt.status = None   # el status previo era de la lectura anterior
+    if data.keys() & {"metric", "value", "date", "status"}:
+        await db.flush()
+        await classify_vitals(db, Vital.id == vt.id)
+    if data:
+        await refresh_latest_vitals(db, {old_key, (vt.patient_id, vt.metric_code)})
     await db.commit()
     await db.refresh(vt)
     return vt
@@ -57,7 +314,10 @@ async def update_vital(id: str, patch: VitalUpdate, db: AsyncSession = Depends(g
 @router.delete("/{id}", status_code=204,
                dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
 async def delete_vital(id: str, db: AsyncSession = Depends(get_db)):
+    key = (await db.execute(select(Vital.patient_id, Vital.metric_code).where(Vital.id == id))).first()
     await db.execute(delete(Vital).where(Vital.id == id))
+    if key:
+        await refresh_latest_vitals(db, {tuple(key)})
     await db.commit()
     return
 
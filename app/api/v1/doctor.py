@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Literal
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,8 +11,13 @@ from app.api.deps import get_current_user, require_roles
 from app.models.user import RoleEnum, User
 from app.models.doctor import Doctor
 from app.models.clinic import Clinic
-from app.models.links import ClinicDoctor
-from app.schemas.doctor import DoctorCreate, DoctorUpdate, DoctorOut
+from app.models.links import ClinicDoctor, ClinicPatient
+from app.models.patient import Patient
+from app.models.next_slot import DoctorNextSlot
+from app.models.search_term import SearchTerm
+from app.schemas.doctor import DoctorCreate, DoctorUpdate, DoctorOut, DoctorSuggestionOut
+from app.services.next_slots import refresh_doctors
+from app.services.search_index import DOCTOR, index_doctors, prefix_search, remove_entity_terms
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 
@@ -29,6 +37,8 @@ def _can_edit_doctor(user: User, doc: Doctor) -> bool:
 async def create_doctor(payload: DoctorCreate, db: AsyncSession = Depends(get_db)):
     d = Doctor(**payload.model_dump())
     db.add(d)
+    await db.flush()
+    await index_doctors(db, [d.id])
     await db.commit()
     # recargar con relaciones
     d = await _get_doctor_or_404(d.id, db)
@@ -84,32 +94,23 @@ async def list_doctors_by_clinic(
     return [DoctorOut.from_model(d) for d in docs]
 
 
-# --- DOCTORES POR PACIENTE (ID explícito) ---
-# Une clínicas del paciente con clínicas de los doctores
-from app.models.links import ClinicPatient  # asegúrate de tenerlo importado en el header
-
-@router.get("/patient/{patient_id}", response_model=list[DoctorOut])
-async def list_doctors_by_patient(
-    patient_id: str,
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
-):
-    q = (
-        select(Doctor)
-        .join(ClinicDoctor, ClinicDoctor.doctor_id == Doctor.id)
+# --- DOCTORES POR PACIENTE ---
+def _doctors_of_patient_q(patient_id: str):
+    """Doctores que comparten alguna clínica con el paciente: semi-join EXISTS, sin duplicados."""
+    shared = (
+        select(ClinicDoctor.doctor_id)
         .join(ClinicPatient, ClinicPatient.clinic_id == ClinicDoctor.clinic_id)
-        .where(ClinicPatient.patient_id == patient_id)
+        .where(ClinicDoctor.doctor_id == Doctor.id, ClinicPatient.patient_id == patient_id)
+    )
+    return (
+        select(Doctor)
+        .where(shared.exists())
         .options(selectinload(Doctor.clinics))
+        .order_by(Doctor.name, Doctor.id)
     )
-    res = await db.execute(q.offset(offset).limit(limit))
-    docs = res.scalars().unique().all()
-    return [DoctorOut.from_model(d) for d in docs]
 
 
-# --- DOCTORES DEL PACIENTE AUTENTICADO (/doctors/patient/me) ---
-from app.models.patient import Patient
-
+# /patient/me va antes que /patient/{patient_id}
 @router.get("/patient/me", response_model=list[DoctorOut], dependencies=[Depends(require_roles(RoleEnum.patient))])
 async def list_my_doctors_as_patient(
     current: User = Depends(get_current_user),
@@ -118,25 +119,30 @@ async def list_my_doctors_as_patient(
     db: AsyncSession = Depends(get_db),
 ):
     # Buscar perfil paciente por user_id
-    pat = (await db.execute(select(Patient).where(Patient.user_id == current.id))).scalar_one_or_none()
-    if not pat:
+    pat_id = (await db.execute(select(Patient.id).where(Patient.user_id == current.id))).scalar_one_or_none()
+    if not pat_id:
         return []
-    q = (
-        select(Doctor)
-        .join(ClinicDoctor, ClinicDoctor.doctor_id == Doctor.id)
-        .join(ClinicPatient, ClinicPatient.clinic_id == ClinicDoctor.clinic_id)
-        .where(ClinicPatient.patient_id == pat.id)
-        .options(selectinload(Doctor.clinics))
-    )
-    res = await db.execute(q.offset(offset).limit(limit))
-    docs = res.scalars().unique().all()
-    return [DoctorOut.from_model(d) for d in docs]
+    res = await db.execute(_doctors_of_patient_q(pat_id).offset(offset).limit(limit))
+    return [DoctorOut.from_model(d) for d in res.scalars().all()]
+
+
+@router.get("/patient/{patient_id}", response_model=list[DoctorOut])
+async def list_doctors_by_patient(
+    patient_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    res = await db.execute(_doctors_of_patient_q(patient_id).offset(offset).limit(limit))
+    return [DoctorOut.from_model(d) for d in res.scalars().all()]
 
 # --- LISTA PÚBLICA DE DOCTORES POR CLÍNICA (sin auth) ---
 @router.get("/public/clinics/{clinic_id}/doctors", response_model=list[DoctorOut])
 async def public_list_doctors_by_clinic(
     clinic_id: str,
     q: str | None = Query(None, description="Búsqueda por nombre/especialidad"),
+    sort: Literal["name", "availability"] = Query("name"),
+    available_before: datetime | None = Query(None, description="Sólo doctores con un turno libre antes de esta fecha"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     db: AsyncSession = Depends(get_db),
@@ -146,24 +152,59 @@ async def public_list_doctors_by_clinic(
     if not exists.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Clínica no encontrada")
 
+    # próximo turno libre mantenido en doctor_next_slots (ix_next_slot_clinic_free)
     stmt = (
-        select(Doctor)
+        select(Doctor, DoctorNextSlot.next_free_at)
         .join(ClinicDoctor, ClinicDoctor.doctor_id == Doctor.id)
+        .outerjoin(
+            DoctorNextSlot,
+            (DoctorNextSlot.doctor_id == Doctor.id) & (DoctorNextSlot.clinic_id == clinic_id),
+        )
         .where(ClinicDoctor.clinic_id == clinic_id)
         .options(selectinload(Doctor.clinics))
-        .order_by(Doctor.name)
         .offset(offset).limit(limit)
     )
+    if sort == "availability":
+        # los que no tienen lugar (NULL) al final
+        stmt = stmt.order_by(DoctorNextSlot.next_free_at.is_(None), DoctorNextSlot.next_free_at, Doctor.name)
+    else:
+        stmt = stmt.order_by(Doctor.name)
+    if available_before:
+        stmt = stmt.where(DoctorNextSlot.next_free_at < available_before)
 
-    # Filtro simple por nombre/especialidad (opcional)
+    # nombre/especialidad/clínica por prefijo sobre search_terms (sin acentos); un `q` sin
+    # palabras buscables no matchea nada (como el autocomplete), no anula el filtro
     if q:
-        from sqlalchemy import or_
-        like = f"%{q}%"
-        stmt = stmt.where(or_(Doctor.name.ilike(like), Doctor.specialty.ilike(like)))
+        hits = prefix_search(DOCTOR, q)
+        if hits is None:
+            return []
+        stmt = stmt.join(hits, hits.c.entity_id == Doctor.id)
 
     res = await db.execute(stmt)
-    docs = res.scalars().unique().all()
-    return [DoctorOut.from_model(d) for d in docs]
+    return [DoctorOut.from_model(d, next_available_at=nf) for d, nf in res.unique().all()]
+
+@router.get("/public/autocomplete", response_model=list[DoctorSuggestionOut])
+async def public_autocomplete_doctors(
+    q: str = Query(..., min_length=2, max_length=100, description="Prefijo de nombre, especialidad o clínica"),
+    clinic_id: str | None = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    where = []
+    if clinic_id:
+        where.append(SearchTerm.entity_id.in_(
+            select(ClinicDoctor.doctor_id).where(ClinicDoctor.clinic_id == clinic_id)
+        ))
+    hits = prefix_search(DOCTOR, q, *where)
+    if hits is None:
+        return []
+    res = await db.execute(
+        select(Doctor.id, Doctor.name, Doctor.specialty, Doctor.photo_url, hits.c.score)
+        .join(hits, hits.c.entity_id == Doctor.id)
+        .order_by(hits.c.score.desc(), Doctor.name, Doctor.id)
+        .limit(limit)
+    )
+    return [DoctorSuggestionOut.model_validate(r) for r in res.all()]
 
 # ---------- update ----------
 @router.patch("/{id}", response_model=DoctorOut)
@@ -176,8 +217,11 @@ async def update_doctor(
     d = await _get_doctor_or_404(id, db)
     if not _can_edit_doctor(current, d):
         raise HTTPException(status_code=403, detail="Permiso denegado")
-    for k, v in patch.model_dump(exclude_unset=True).items():
+    changes = patch.model_dump(exclude_unset=True)
+    for k, v in changes.items():
         setattr(d, k, v)
+    if changes.keys() & {"name", "specialty"}:
+        await index_doctors(db, [id])
     await db.commit()
     d = await _get_doctor_or_404(id, db)
     return DoctorOut.from_model(d)
@@ -192,13 +236,18 @@ async def assign_doctor_to_clinic(id: str, clinic_id: str, db: AsyncSession = De
     res2 = await db.execute(select(ClinicDoctor).where(ClinicDoctor.doctor_id == id, ClinicDoctor.clinic_id == clinic_id))
     if not res2.scalar_one_or_none():
         db.add(ClinicDoctor(doctor_id=id, clinic_id=clinic_id))
+        await db.flush()
+        await refresh_doctors(db, [id])
+        await index_doctors(db, [id])
         await db.commit()
     return
 
 # ---------- delete ----------
 @router.delete("/{id}", status_code=204, dependencies=[Depends(require_roles(RoleEnum.admin))])
 async def delete_doctor(id: str, db: AsyncSession = Depends(get_db)):
+    await db.execute(delete(DoctorNextSlot).where(DoctorNextSlot.doctor_id == id))
     await db.execute(delete(ClinicDoctor).where(ClinicDoctor.doctor_id == id))
+    await remove_entity_terms(db, DOCTOR, [id])
     await db.execute(delete(Doctor).where(Doctor.id == id))
     await db.commit()
     return
@@ -206,6 +255,8 @@ async def delete_doctor(id: str, db: AsyncSession = Depends(get_db)):
 @router.delete("/{id}/clinics/{clinic_id}", status_code=204, dependencies=[Depends(require_roles(RoleEnum.admin))])
 async def unassign_doctor_from_clinic(id: str, clinic_id: str, db: AsyncSession = Depends(get_db)):
     await db.execute(delete(ClinicDoctor).where(ClinicDoctor.doctor_id == id, ClinicDoctor.clinic_id == clinic_id))
+    await refresh_doctors(db, [id])
+    await index_doctors(db, [id])
     await db.commit()
     return
 
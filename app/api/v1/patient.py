@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+from datetime import datetime, time
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.core.db import get_db
+from app.core.db import get_db, SessionLocal
 from app.api.deps import get_current_user, require_roles
 from app.models.user import RoleEnum, User
 from app.models.patient import Patient
 from app.models.clinic import Clinic
-from app.models.links import ClinicPatient
-from app.schemas.patient import PatientCreate, PatientUpdate, PatientOut
+from app.models.links import ClinicPatient, ClinicDoctor
+from app.schemas.patient import PatientCreate, PatientUpdate, PatientOut, PatientTimelineOut, TimelineItemOut
 from app.models.doctor import Doctor
 from app.schemas.clinical import VitalOut
-from app.models.labs_vitals import Vital 
+from app.models.labs_vitals import Vital, VitalStatus, LabResult
+from app.models.clinical import Consultation, Medication
+from app.models.prescription import Prescription
+from app.models.certificate import Certificate
+from app.api.v1._helpers import encode_cursor, decode_cursor, keyset_before, paginate
+from app.api.v1.clinical.vitals import vitals_page_query
+from app.services.vitals_ranges import classify_vitals
+from app.services.latest_vitals import refresh_patient_latest_vitals
+from app.services.patient_search import apply_lookup_keys, search_patients
+from app.services.search_index import PATIENT, index_patients, remove_entity_terms
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
@@ -61,7 +73,10 @@ async def create_patient(
         data["user_id"] = current.id
 
         pt = Patient(**data)
+        apply_lookup_keys(pt)
         db.add(pt)
+        await db.flush()
+        await index_patients(db, [pt.id])
         await db.commit()
         pt = await _get_patient_or_404(pt.id, db)
         return PatientOut.from_model(pt)
@@ -77,7 +92,10 @@ async def create_patient(
                 raise HTTPException(status_code=400, detail="Ese usuario ya tiene un perfil de paciente.")
 
         pt = Patient(**data)
+        apply_lookup_keys(pt)
         db.add(pt)
+        await db.flush()
+        await index_patients(db, [pt.id])
         await db.commit()
         pt = await _get_patient_or_404(pt.id, db)
         return PatientOut.from_model(pt)
@@ -102,6 +120,29 @@ async def list_patients(
     pts = res.scalars().unique().all()
     return [PatientOut.from_model(p) for p in pts]
 
+@router.get("/search", response_model=list[PatientOut], dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
+async def search_patients_route(
+    q: str = Query(..., min_length=2, max_length=100, description="DNI, email, teléfono o nombre"),
+    clinic_id: str | None = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    # alcance: el doctor sólo ve pacientes de sus clínicas; el admin, todos
+    allowed = None
+    if current.role == RoleEnum.doctor:
+        doc = (await db.execute(select(Doctor.id).where(Doctor.user_id == current.id))).scalar_one_or_none()
+        if not doc:
+            return []
+        allowed = select(ClinicPatient.patient_id).where(
+            ClinicPatient.clinic_id.in_(select(ClinicDoctor.clinic_id).where(ClinicDoctor.doctor_id == doc))
+        )
+    if clinic_id:
+        in_clinic = select(ClinicPatient.patient_id).where(ClinicPatient.clinic_id == clinic_id)
+        allowed = in_clinic if allowed is None else allowed.where(ClinicPatient.clinic_id == clinic_id)
+    pts = await search_patients(db, q, limit, allowed)
+    return [PatientOut.from_model(p) for p in pts]
+
 @router.get("/me", response_model=PatientOut, dependencies=[Depends(require_roles(RoleEnum.patient))])
 async def get_my_patient(current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     q = select(Patient).where(Patient.user_id == current.id)
@@ -123,8 +164,18 @@ async def update_patient(id: str, patch: PatientUpdate, current: User = Depends(
     p = await _get_patient_or_404(id, db)
     if not _can_edit_patient(current, p) and current.role not in (RoleEnum.doctor, RoleEnum.admin):
         raise HTTPException(status_code=403, detail="Permiso denegado")
-    for k, v in patch.model_dump(exclude_unset=True).items():
+    data = patch.model_dump(exclude_unset=True)
+    for k, v in data.items():
         setattr(p, k, v)
+    if data.keys() & {"doc_id", "email", "phone"}:
+        apply_lookup_keys(p)
+    if "name" in data:
+        await index_patients(db, [p.id])
+    if data.keys() & {"sex", "birth_date"}:
+        # los rangos de referencia dependen de edad y sexo
+        await db.flush()
+        await classify_vitals(db, Vital.patient_id == p.id)
+        await refresh_patient_latest_vitals(db, p.id)
     await db.commit()
     await db.refresh(p)
     p = await _get_patient_or_404(id, db)
@@ -133,6 +184,7 @@ async def update_patient(id: str, patch: PatientUpdate, current: User = Depends(
 @router.delete("/{id}", status_code=204, dependencies=[Depends(require_roles(RoleEnum.admin))])
 async def delete_patient(id: str, db: AsyncSession = Depends(get_db)):
     await db.execute(delete(ClinicPatient).where(ClinicPatient.patient_id == id))
+    await remove_entity_terms(db, PATIENT, [id])
     await db.execute(delete(Patient).where(Patient.id == id))
     await db.commit()
     return
@@ -175,29 +227,23 @@ async def list_patients_by_clinic(
     return [PatientOut.from_model(p) for p in pts]
 
 
-# --- PACIENTES POR DOCTOR (ID explícito) ---
-from app.models.links import ClinicDoctor  # asegúrate de tenerlo importado en el header
-
-@router.get("/doctor/{doctor_id}", response_model=list[PatientOut], dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
-async def list_patients_by_doctor(
-    doctor_id: str,
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
-):
-    q = (
-        select(Patient)
-        .join(ClinicPatient, ClinicPatient.patient_id == Patient.id)
+# --- PACIENTES POR DOCTOR ---
+def _patients_of_doctor_q(doctor_id: str):
+    """Pacientes que comparten alguna clínica con el doctor: semi-join EXISTS, sin duplicados."""
+    shared = (
+        select(ClinicPatient.patient_id)
         .join(ClinicDoctor, ClinicDoctor.clinic_id == ClinicPatient.clinic_id)
-        .where(ClinicDoctor.doctor_id == doctor_id)
+        .where(ClinicPatient.patient_id == Patient.id, ClinicDoctor.doctor_id == doctor_id)
+    )
+    return (
+        select(Patient)
+        .where(shared.exists())
         .options(selectinload(Patient.clinics))
+        .order_by(Patient.name, Patient.id)
     )
-    res = await db.execute(q.offset(offset).limit(limit))
-    pts = res.scalars().unique().all()
-    return [PatientOut.from_model(p) for p in pts]
 
 
-# --- PACIENTES DEL DOCTOR AUTENTICADO (/patients/doctor/me) ---
+# /doctor/me va antes que /doctor/{doctor_id}
 @router.get("/doctor/me", response_model=list[PatientOut], dependencies=[Depends(require_roles(RoleEnum.doctor))])
 async def list_my_patients_as_doctor(
     current: User = Depends(get_current_user),
@@ -206,22 +252,35 @@ async def list_my_patients_as_doctor(
     db: AsyncSession = Depends(get_db),
 ):
     # Buscar perfil doctor por user_id
-    doc = (await db.execute(select(Doctor).where(Doctor.user_id == current.id))).scalar_one_or_none()
-    if not doc:
+    doc_id = (await db.execute(select(Doctor.id).where(Doctor.user_id == current.id))).scalar_one_or_none()
+    if not doc_id:
         return []
-    q = (
-        select(Patient)
-        .join(ClinicPatient, ClinicPatient.patient_id == Patient.id)
-        .join(ClinicDoctor, ClinicDoctor.clinic_id == ClinicPatient.clinic_id)
-        .where(ClinicDoctor.doctor_id == doc.id)
-        .options(selectinload(Patient.clinics))
-    )
-    res = await db.execute(q.offset(offset).limit(limit))
-    pts = res.scalars().unique().all()
-    return [PatientOut.from_model(p) for p in pts]
+    res = await db.execute(_patients_of_doctor_q(doc_id).offset(offset).limit(limit))
+    return [PatientOut.from_model(p) for p in res.scalars().all()]
+
+
+@router.get("/doctor/{doctor_id}", response_model=list[PatientOut], dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor))])
+async def list_patients_by_doctor(
+    doctor_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    res = await db.execute(_patients_of_doctor_q(doctor_id).offset(offset).limit(limit))
+    return [PatientOut.from_model(p) for p in res.scalars().all()]
 
 @router.get("/{id}/vital_signs", response_model=list[VitalOut], dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))])
-async def get_patient_vital_signs(id: str, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_patient_vital_signs(
+    id: str,
+    response: Response,
+    date_from: datetime | None = Query(None),
+    date_to:   datetime | None = Query(None),
+    status:    VitalStatus | None = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     # Obtener el ID del usuario (current_user es el usuario autenticado a partir del token)
     user_id = current_user.id
     
@@ -232,13 +291,137 @@ async def get_patient_vital_signs(id: str, db: AsyncSession = Depends(get_db), c
     if not patient:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
 
-    # Obtener los signos vitales del paciente
-    q = select(Vital).where(Vital.patient_id == patient.id)
-    res = await db.execute(q)
-    vital_signs = res.scalars().all()
+    # Obtener los signos vitales del paciente (paginados por cursor, más recientes primero)
+    res = await db.execute(vitals_page_query(patient.id, date_from, date_to, status, limit, cursor))
+    vital_signs = paginate(res.scalars().all(), limit, response)
     
-    if not vital_signs:
+    if not vital_signs and not cursor:
         raise HTTPException(status_code=404, detail="No se encontraron signos vitales para el paciente")
     
     # Devolver los signos vitales como una lista de modelos Pydantic
     return vital_signs
+
+
+# ---------- timeline clínico ----------
+# kind -> (modelo, fecha clínica, es Date, columnas que se devuelven en data)
+_TIMELINE = {
+    "consultation": (Consultation, Consultation.date, False, (
+        Consultation.id, Consultation.doctor_id, Consultation.appointment_id,
+        Consultation.specialty, Consultation.diagnosis, Consultation.notes,
+    )),
+    "medication": (Medication, Medication.start_date, True, (
+        Medication.id, Medication.name, Medication.dosage, Medication.frequency,
+        Medication.status, Medication.start_date, Medication.end_date,
+    )),
+    "lab": (LabResult, LabResult.date, False, (
+        LabResult.id, LabResult.test, LabResult.result_summary, LabResult.result_size, LabResult.status,
+    )),
+    "vital": (Vital, Vital.date, False, (
+        Vital.id, Vital.metric, Vital.value, Vital.status,
+    )),
+    "prescription": (Prescription, Prescription.issued_date, True, (
+        Prescription.id, Prescription.doctor_id, Prescription.diagnosis,
+        Prescription.notes, Prescription.verify_code,
+    )),
+    "certificate": (Certificate, Certificate.issued_date, True, (
+        Certificate.id, Certificate.doctor_id, Certificate.type, Certificate.reason,
+        Certificate.rest_days, Certificate.start_date, Certificate.end_date, Certificate.verify_code,
+    )),
+}
+
+def _timeline_key(item: dict) -> tuple:
+    # orden global del timeline: (ts, kind, id) descendente
+    return item["ts"], item["kind"], item["id"]
+
+def _timeline_after(kind: str, cursor: tuple):
+    """Condición SQL "después del cursor" para una sección, respetando el orden global."""
+    model, ts_col, is_date, _ = _TIMELINE[kind]
+    c_ts, c_kind, c_id = cursor
+    if is_date:
+        # un Date vale su medianoche: si el cursor no cae a medianoche, entra todo el día
+        if c_ts.time() != time():
+            return ts_col <= c_ts.date()
+        c_ts = c_ts.date()
+    if kind < c_kind:
+        return ts_col <= c_ts
+    if kind > c_kind:
+        return ts_col < c_ts
+    return keyset_before(ts_col, model.id, c_ts, c_id)
+
+async def _timeline_section(kind: str, patient_id: str, cursor: tuple | None, n: int) -> list[dict]:
+    """Una sección del timeline en su propia sesión (conexión del pool), para correr en paralelo."""
+    model, ts_col, is_date, cols = _TIMELINE[kind]
+    q = select(ts_col.label("ts"), *cols).where(model.patient_id == patient_id, ts_col.is_not(None))
+    if cursor:
+        q = q.where(_timeline_after(kind, cursor))
+    q = q.order_by(ts_col.desc(), model.id.desc()).limit(n)
+    async with SessionLocal() as s:
+        rows = (await s.execute(q)).all()
+    items = []
+    for r in rows:
+        data = dict(r._mapping)
+        ts = data.pop("ts")
+        items.append({
+            "kind": kind,
+            "id": r.id,
+            "ts": datetime.combine(ts, time()) if is_date else ts,
+            "data": data,
+        })
+    return items
+
+@router.get(
+    "/{id}/timeline",
+    response_model=PatientTimelineOut,
+    dependencies=[Depends(require_roles(RoleEnum.admin, RoleEnum.doctor, RoleEnum.patient))],
+)
+async def get_patient_timeline(
+    id: str,
+    types: str | None = Query(None, description="consultation,medication,lab,vital,prescription,certificate"),
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    per_type_limit: int | None = Query(None, ge=1, le=200, description="Máximo de ítems de cada tipo por página"),
+    current: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Historia clínica del paciente (consultas, medicación, laboratorios, signos vitales,
+    recetas y certificados) en un solo stream, del más reciente al más antiguo.
+    Las secciones se consultan en paralelo, cada una en su conexión, y se mezclan
+    con un cursor (ts, kind, id) común.
+    """
+    pt_id = (await db.execute(select(Patient.id).where(Patient.id == id))).scalar_one_or_none()
+    if not pt_id:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    if current.role == RoleEnum.patient:
+        my_pt = (await db.execute(select(Patient.id).where(Patient.user_id == current.id))).scalar_one_or_none()
+        if my_pt != id:
+            raise HTTPException(status_code=403, detail="Permiso denegado")
+    # no retener la conexión de la request mientras corren las secciones
+    await db.close()
+
+    kinds = list(_TIMELINE)
+    if types:
+        kinds = [k.strip() for k in types.split(",") if k.strip()]
+        unknown = set(kinds) - _TIMELINE.keys()
+        if unknown or not kinds:
+            raise HTTPException(status_code=400, detail=f"types inválido: {', '.join(sorted(unknown)) or types}")
+    after = decode_cursor(cursor, 2) if cursor else None
+    if after and (after[0] is None or after[1] not in _TIMELINE):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    n = min(limit, per_type_limit or limit)
+    sections = await asyncio.gather(*(_timeline_section(k, id, after, n) for k in kinds))
+
+    # una sección que llenó su cupo puede tener más filas: el merge sólo es seguro
+    # hasta su último ítem, el resto queda para la página siguiente
+    truncated = [_timeline_key(items[-1]) for items in sections if len(items) == n]
+    floor = max(truncated) if truncated else None
+    merged = sorted((it for items in sections for it in items), key=_timeline_key, reverse=True)
+    page = [it for it in merged if floor is None or _timeline_key(it) >= floor][:limit]
+
+    next_cursor = None
+    if page and (len(page) == limit or truncated):
+        last = page[-1]
+        next_cursor = encode_cursor(last["ts"], last["kind"], last["id"])
+    return PatientTimelineOut(items=[TimelineItemOut(**it) for it in page], next_cursor=next_cursor)
+
@@ -0,0 +1,43 @@
+# app/core/cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+
+class TTLCache:
+    """
+    Cache en memoria (por proceso) con vencimiento y tamaño acotado.
+    Las claves son tuplas cuyo primer elemento es el "scope" (p.ej. ("doctor", id)),
+    así se puede invalidar todo lo de un scope cuando cambia.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl = ttl_seconds
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate_scopes(self, scopes: Iterable[Hashable]) -> None:
+        scopes = set(scopes)
+        for key in [k for k in self._data if k[0] in scopes]:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
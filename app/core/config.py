@@ -36,6 +36,54 @@ class Settings(BaseSettings):
     ZOOM_API: str 
     APP_NAME: str 
 
+    # --- Agenda ---
+    CALENDAR_CACHE_SECONDS: int = 30   # cache del agregado de calendario por scope
+    EVENT_LOG_SIZE: int = 1000         # eventos retenidos para reanudar SSE (Last-Event-ID)
+    SSE_HEARTBEAT_SECONDS: int = 15
+
+    # --- Recordatorios de turnos ---
+    REMINDERS_ENABLED: bool = True
+    REMINDER_OFFSETS_MINUTES: str = "1440,120"   # anticipaciones, separadas por coma
+    REMINDER_CHANNELS: str = "log"               # canales registrados, separados por coma
+    REMINDER_WORKERS: int = 2
+    REMINDER_BATCH_SIZE: int = 100
+    REMINDER_POLL_SECONDS: float = 5.0
+    REMINDER_LEASE_SECONDS: int = 120
+    REMINDER_MAX_ATTEMPTS: int = 5
+
+    # --- Próximo turno libre (directorio público) ---
+    NEXT_SLOT_MINUTES: int = 30
+    NEXT_SLOT_DAY_START_HOUR: int = 8      # franja atendible, no hay modelo de horarios por doctor
+    NEXT_SLOT_DAY_END_HOUR: int = 20
+    NEXT_SLOT_HORIZON_DAYS: int = 60
+    NEXT_SLOT_REFRESH_SECONDS: float = 300.0
+    NEXT_SLOT_REFRESH_BATCH: int = 200
+
+    # --- Feeds iCalendar ---
+    ICAL_PAST_DAYS: int = 30        # horizonte del feed hacia atrás
+    ICAL_FUTURE_DAYS: int = 180     # y hacia adelante
+    ICAL_CACHE_SECONDS: int = 300   # Cache-Control max-age para los clientes de calendario
+
+    # --- Analítica (rollups diarios de turnos) ---
+    ANALYTICS_OFFERED_MINUTES_PER_DAY: int = 480   # oferta por doctor/clínica/día, no hay modelo de horarios
+    ANALYTICS_RECONCILE_ENABLED: bool = True
+    ANALYTICS_RECONCILE_HOUR: int = 3              # hora UTC de la reconciliación nocturna
+    ANALYTICS_RECONCILE_PAST_DAYS: int = 7
+    ANALYTICS_RECONCILE_FUTURE_DAYS: int = 90
+
+    # --- Ingesta masiva de signos vitales (dispositivos) ---
+    VITALS_INGEST_CHUNK: int = 500         # filas por SELECT de pacientes + INSERT executemany
+    VITALS_INGEST_MAX_ERRORS: int = 1000   # errores por fila informados en la respuesta
+    VITALS_BUFFER_FLUSH_MS: int = 500      # modo diferido: cada cuánto se vuelca el buffer
+    VITALS_BUFFER_MAX: int = 50000         # lecturas en espera antes de rechazar con 503
+    VITALS_REFERENCE_RANGES: str = ""      # JSON con rangos (ver app.services.vitals_ranges); vacío = defaults
+    VITALS_DEFAULT_AGE: int = 30           # edad asumida si el paciente no tiene birth_date
+    VITALS_SERIES_MAX_ROWS: int = 20000    # lecturas (las más recientes) que lee una serie lttb
+
+    # --- Resultados de laboratorio ---
+    LAB_RESULT_INLINE_BYTES: int = 4096    # más grandes van comprimidos a lab_result_bodies
+    LAB_RESULT_SUMMARY_CHARS: int = 200    # resumen que devuelven los listados
+
     @property
     def async_database_url(self) -> str:
         return (f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}"
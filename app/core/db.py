@@ -1,5 +1,8 @@
 # app/core/db.py
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from sqlalchemy import Integer, cast, func, literal_column, select
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
@@ -13,3 +16,71 @@ class Base(DeclarativeBase):
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
+
+
+def dialect_name(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+# unidad -> (formato MySQL DATE_FORMAT, formato SQLite strftime)
+_BUCKET_FORMATS = {
+    "hour":  ("%Y-%m-%d %H:00", "%Y-%m-%d %H:00"),
+    "day":   ("%Y-%m-%d",       "%Y-%m-%d"),
+    "week":  ("%x-W%v",         "%Y-W%W"),
+    "month": ("%Y-%m",          "%Y-%m"),
+}
+
+def date_bucket(dialect: str, col, unit: str):
+    """Expresión SQL que agrupa un DateTime en baldes (hour/day/week/month) como texto."""
+    mysql_fmt, sqlite_fmt = _BUCKET_FORMATS[unit]
+    if dialect == "sqlite":
+        return func.strftime(sqlite_fmt, col)
+    return func.date_format(col, mysql_fmt)
+
+def minutes_between(dialect: str, start, end):
+    """Minutos enteros entre dos DateTime (TIMESTAMPDIFF en MySQL, julianday en SQLite)."""
+    if dialect == "sqlite":
+        return cast(func.round((func.julianday(end) - func.julianday(start)) * 1440), Integer)
+    return func.timestampdiff(literal_column("MINUTE"), start, end)
+
+def years_between(dialect: str, start, end):
+    """Años cumplidos entre dos fechas (edad); en SQLite es aproximado por 365.25 días."""
+    if dialect == "sqlite":
+        return cast((func.julianday(end) - func.julianday(start)) / 365.25, Integer)
+    return func.timestampdiff(literal_column("YEAR"), start, end)
+
+
+def upsert(dialect: str, model, rows: list[dict], keys: tuple[str, ...], update=None):
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT DO UPDATE (SQLite).
+    Por defecto pisa las columnas no clave con los valores nuevos; `update(new)` permite
+    otras expresiones (p.ej. acumular), donde new.<col> es el valor que se intentó insertar.
+    En MySQL las asignaciones se aplican en el orden del dict y cada una ve las anteriores.
+    """
+    if dialect == "sqlite":
+        stmt = sqlite.insert(model).values(rows)
+        new = stmt.excluded
+    else:
+        stmt = mysql.insert(model).values(rows)
+        new = stmt.inserted
+    values = update(new) if update else {c: new[c] for c in rows[0] if c not in keys}
+    if dialect == "sqlite":
+        return stmt.on_conflict_do_update(index_elements=list(keys), set_=values)
+    return stmt.on_duplicate_key_update(list(values.items()))
+
+
+@asynccontextmanager
+async def named_lock(name: str) -> AsyncIterator[bool]:
+    """
+    Lock con nombre entre procesos (GET_LOCK de MySQL, sin espera) sobre una conexión propia.
+    Devuelve si se obtuvo; en SQLite (un solo proceso en dev) siempre es True.
+    """
+    if engine.dialect.name != "mysql":
+        yield True
+        return
+    async with engine.connect() as conn:
+        got = bool(await conn.scalar(select(func.get_lock(name, 0))))
+        try:
+            yield got
+        finally:
+            if got:
+                await conn.scalar(select(func.release_lock(name)))
@@ -1,11 +1,18 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.config import settings
+
 from app.api.v1.auth import router as auth_router
 from app.api.v1.clinic import router as clinic_router
 from app.api.v1.doctor import router as doctor_router
 from app.api.v1.patient import router as patient_router
 from app.api.v1.appointment import router as appointment_router
+from app.api.v1.calendar_feeds import router as calendar_feeds_router
+from app.api.v1.analytics import router as analytics_router
 # from app.api.v1.clinical import router as clinical_router
 from app.api.v1.files import router as files_router
 from app.api.v1.prescriptions import router as prescriptions_router
@@ -16,9 +23,29 @@ from app.api.v1.clinical.labs import router as labs_router
 from app.api.v1.clinical.vitals import router as vitals_router
 from app.api.v1.zoom import router as zoom_router
 from app.api.v1.ws_chat import router as ws_chat_router
+from app.services.reminders import run_reminder_worker
+from app.services.next_slots import run_next_slot_refresher
+from app.services.rollups import run_rollup_reconciler
+from app.services.vitals_ingest import run_vitals_flusher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # tareas de fondo (workers) que viven lo mismo que la app
+    stop = asyncio.Event()
+    tasks: list[asyncio.Task] = []
+    if settings.REMINDERS_ENABLED:
+        tasks += [asyncio.create_task(run_reminder_worker(stop)) for _ in range(settings.REMINDER_WORKERS)]
+    tasks.append(asyncio.create_task(run_next_slot_refresher(stop)))
+    if settings.ANALYTICS_RECONCILE_ENABLED:
+        tasks.append(asyncio.create_task(run_rollup_reconciler(stop)))
+    tasks.append(asyncio.create_task(run_vitals_flusher(stop)))
+    yield
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 
-app = FastAPI(title="Clinic Hub API", version="0.1.0")
+app = FastAPI(title="Clinic Hub API", version="0.1.0", lifespan=lifespan)
 
 # 🔓 ajustá origins con tu URL de Vite
 app.add_middleware(
@@ -27,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],   # paginación por cursor de los listados clínicos
 )
 
 app.include_router(auth_router)
@@ -34,6 +62,8 @@ app.include_router(clinic_router)
 app.include_router(doctor_router)
 app.include_router(patient_router)
 app.include_router(appointment_router)
+app.include_router(calendar_feeds_router)
+app.include_router(analytics_router)
 # app.include_router(clinical_router)
 app.include_router(files_router)
 app.include_router(prescriptions_router)
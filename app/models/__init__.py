@@ -5,9 +5,12 @@ from app.models.patient import Patient
 from app.models.links import ClinicDoctor, ClinicPatient
 from app.models.appointment import Appointment 
 from app.models.clinical import Consultation, Medication  
-from app.models.labs_vitals import LabResult, Vital 
+from app.models.labs_vitals import LabResult, LabResultBody, Vital, PatientLatestVital
 from app.models.certificate import Certificate 
 from app.models.prescription import Prescription 
 from app.models.zoom import AppointmentZoom, ZoomToken 
-
-
+from app.models.reminder import AppointmentReminder
+from app.models.next_slot import DoctorNextSlot
+from app.models.calendar_feed import CalendarFeedToken
+from app.models.rollup import AppointmentDailyRollup
+from app.models.search_term import SearchTerm
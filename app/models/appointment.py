@@ -1,9 +1,11 @@
 import uuid
 import enum
 from datetime import datetime
-from sqlalchemy import String, Enum, ForeignKey, DateTime
+from sqlalchemy import String, Enum, ForeignKey, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import mysql
+from sqlalchemy.sql import func
 
 from app.core.db import Base
 
@@ -37,7 +39,23 @@ class Appointment(Base):
     type: Mapped[ApptType] = mapped_column(Enum(ApptType), default=ApptType.presencial)
     status: Mapped[ApptStatus] = mapped_column(Enum(ApptStatus), default=ApptStatus.pending)
 
+    # última modificación (ETag/Last-Modified de los feeds iCalendar); con microsegundos
+    # para que dos cambios en el mismo segundo den ETags distintos
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=func.current_timestamp(),
+        nullable=False,
+    )
+
     # opcional (para cargas selectivas)
     doctor = relationship("Doctor")
     patient = relationship("Patient")
     clinic = relationship("Clinic")
+
+    __table_args__ = (
+        # intervalos ocupados por persona (solapamientos entre clínicas)
+        Index("ix_appt_doctor_busy", "doctor_id", "starts_at", "ends_at"),
+        Index("ix_appt_patient_busy", "patient_id", "starts_at", "ends_at"),
+    )
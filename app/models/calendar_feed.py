@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.db import Base
+
+class CalendarFeedToken(Base):
+    """Token secreto de la URL .ics de un doctor o paciente (uno vigente por dueño)."""
+    __tablename__ = "calendar_feed_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    token: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    scope: Mapped[str] = mapped_column(String(16))        # "doctor" | "patient"
+    owner_id: Mapped[str] = mapped_column(String(36))     # doctors.id / patients.id
+    created_at: Mapped[datetime] = mapped_column(DateTime(), server_default=func.current_timestamp(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("scope", "owner_id", name="uq_calendar_feed_owner"),
+    )
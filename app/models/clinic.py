@@ -1,5 +1,6 @@
 import uuid
-from sqlalchemy import String, Float
+from sqlalchemy import String, Float, Index
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 
@@ -14,6 +15,15 @@ class Clinic(Base):
     photo_url: Mapped[str | None] = mapped_column(String(255), nullable=True)
     lat: Mapped[float | None] = mapped_column(Float, nullable=True)
     lng: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # geohash de (lat, lng) para búsqueda por cercanía (app.services.geo); collation binaria
+    # en MySQL para que los rangos de prefijo sobre el índice valgan (ver search_index.prefix_range)
+    geohash: Mapped[str | None] = mapped_column(
+        String(12).with_variant(mysql.VARCHAR(12, collation="utf8mb4_bin"), "mysql"), nullable=True,
+    )
 
     doctors = relationship("Doctor", secondary="clinic_doctors", back_populates="clinics")
     patients = relationship("Patient", secondary="clinic_patients", back_populates="clinics")
+
+    __table_args__ = (
+        Index("ix_clinic_geohash", "geohash"),
+    )
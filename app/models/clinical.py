@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, date
-from sqlalchemy import String, ForeignKey, DateTime, Enum, Date, Text
+from sqlalchemy import String, ForeignKey, DateTime, Enum, Date, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from app.core.db import Base
 import enum
@@ -22,6 +22,13 @@ class Consultation(Base):
     diagnosis: Mapped[str] = mapped_column(Text)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    __table_args__ = (
+        # listado por paciente paginado por (date, id)
+        Index("ix_consultation_patient_date", "patient_id", "date"),
+        # búsqueda de texto (app.services.consultation_search); en SQLite se usa un índice en memoria
+        Index("ft_consultation_text", "diagnosis", "notes", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
 class MedStatus(str, enum.Enum):
     active = "active"
     suspended = "suspended"
@@ -37,3 +44,9 @@ class Medication(Base):
     status: Mapped[MedStatus] = mapped_column(Enum(MedStatus), default=MedStatus.active, index=True)
     start_date: Mapped[date | None] = mapped_column(Date, nullable=True)
     end_date:   Mapped[date | None] = mapped_column(Date, nullable=True)
+
+    __table_args__ = (
+        # listado por paciente, con o sin filtro de status, paginado por (start_date, id)
+        Index("ix_medication_patient_start", "patient_id", "start_date"),
+        Index("ix_medication_patient_status_start", "patient_id", "status", "start_date"),
+    )
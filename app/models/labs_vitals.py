@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, ForeignKey, DateTime, Enum, Text
+from sqlalchemy import String, ForeignKey, DateTime, Enum, Text, Float, Index, Integer, LargeBinary
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Mapped, mapped_column
 from app.core.db import Base
 import enum
@@ -15,8 +16,28 @@ class LabResult(Base):
     patient_id: Mapped[str] = mapped_column(String(36), ForeignKey("patients.id"), index=True)
     test: Mapped[str] = mapped_column(String(120))
     date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
-    result: Mapped[str] = mapped_column(Text, default="")
+    result: Mapped[str] = mapped_column(Text, default="")   # vacío si el cuerpo va comprimido en lab_result_bodies
+    result_summary: Mapped[str] = mapped_column(String(255), default="")   # lo que devuelven los listados
+    result_size: Mapped[int] = mapped_column(Integer, default=0)           # bytes (UTF-8) del resultado completo
     status: Mapped[LabStatus] = mapped_column(Enum(LabStatus), default=LabStatus.pending, index=True)
+    # doctor que lo pidió (recibe el aviso al completarse)
+    doctor_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("doctors.id"), nullable=True, index=True)
+
+    __table_args__ = (
+        # listado por paciente paginado por (date, id), con filtros de status o estudio
+        Index("ix_lab_patient_date", "patient_id", "date"),
+        Index("ix_lab_patient_status_date", "patient_id", "status", "date"),
+        Index("ix_lab_patient_test_date", "patient_id", "test", "date"),
+        # worklist del laboratorio: pendientes de todos los pacientes, los más viejos primero
+        Index("ix_lab_status_date", "status", "date"),
+    )
+
+class LabResultBody(Base):
+    """Resultado completo comprimido de los laboratorios grandes (app.services.lab_bodies)."""
+    __tablename__ = "lab_result_bodies"
+    lab_id: Mapped[str] = mapped_column(String(36), ForeignKey("lab_results.id", ondelete="CASCADE"), primary_key=True)
+    encoding: Mapped[str] = mapped_column(String(8), default="zlib")
+    body: Mapped[bytes] = mapped_column(LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"))
 
 class VitalStatus(str, enum.Enum):
     Normal = "Normal"
@@ -31,3 +52,34 @@ class Vital(Base):
     value: Mapped[str] = mapped_column(String(120))       # e.g. "120/80 mmHg"
     date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     status: Mapped[VitalStatus | None] = mapped_column(Enum(VitalStatus), nullable=True)
+
+    # representación numérica derivada de metric/value (app.services.vitals_parse)
+    metric_code: Mapped[str | None] = mapped_column(String(16), nullable=True)   # bp, hr, temp, ...
+    num_value: Mapped[float | None] = mapped_column(Float, nullable=True)        # sistólica en "bp"
+    num_value2: Mapped[float | None] = mapped_column(Float, nullable=True)       # diastólica en "bp"
+    unit: Mapped[str | None] = mapped_column(String(16), nullable=True)          # unidad canónica
+
+    __table_args__ = (
+        # series por paciente y métrica; cubre las columnas numéricas (gráficos sin tocar la tabla)
+        Index("ix_vital_patient_metric_date", "patient_id", "metric_code", "date", "num_value", "num_value2"),
+        # listado por paciente paginado por (date, id), con o sin filtro de status
+        Index("ix_vital_patient_date", "patient_id", "date"),
+        Index("ix_vital_patient_status_date", "patient_id", "status", "date"),
+    )
+
+class PatientLatestVital(Base):
+    """
+    Última lectura de cada (paciente, métrica) para dashboards. La mantienen en la misma
+    transacción las escrituras de vitals y la ingesta (app.services.latest_vitals).
+    """
+    __tablename__ = "patient_latest_vitals"
+    patient_id: Mapped[str] = mapped_column(String(36), ForeignKey("patients.id"), primary_key=True)
+    metric_code: Mapped[str] = mapped_column(String(16), primary_key=True)
+    vital_id: Mapped[str] = mapped_column(String(36))
+    metric: Mapped[str] = mapped_column(String(80))
+    value: Mapped[str] = mapped_column(String(120))
+    date: Mapped[datetime] = mapped_column(DateTime)
+    status: Mapped[VitalStatus | None] = mapped_column(Enum(VitalStatus), nullable=True)
+    num_value: Mapped[float | None] = mapped_column(Float, nullable=True)
+    num_value2: Mapped[float | None] = mapped_column(Float, nullable=True)
+    unit: Mapped[str | None] = mapped_column(String(16), nullable=True)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import String, ForeignKey, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+class DoctorNextSlot(Base):
+    """Próximo turno libre de cada doctor en cada clínica (lo mantiene app.services.next_slots)."""
+    __tablename__ = "doctor_next_slots"
+
+    doctor_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True
+    )
+    clinic_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("clinics.id", ondelete="CASCADE"), primary_key=True
+    )
+    # None = sin lugar dentro del horizonte
+    next_free_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=False))
+
+    __table_args__ = (
+        # directorio público: doctores de una clínica ordenados/filtrados por disponibilidad
+        Index("ix_next_slot_clinic_free", "clinic_id", "next_free_at"),
+        Index("ix_next_slot_computed", "computed_at"),
+    )
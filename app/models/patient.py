@@ -1,6 +1,7 @@
 import uuid
 import enum
-from sqlalchemy import String, Enum, ForeignKey, Date
+from sqlalchemy import String, Enum, ForeignKey, Date, Index
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 
@@ -32,4 +33,22 @@ class Patient(Base):
     sex: Mapped[SexEnum | None] = mapped_column(Enum(SexEnum), nullable=True)
     birth_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
 
+    # claves de búsqueda normalizadas (las mantiene app.services.patient_search); collation
+    # binaria en MySQL porque se buscan por rango de prefijo (ver search_index.prefix_range)
+    doc_id_key: Mapped[str | None] = mapped_column(      # sólo A-Z0-9
+        String(64).with_variant(mysql.VARCHAR(64, collation="utf8mb4_bin"), "mysql"), nullable=True,
+    )
+    email_key: Mapped[str | None] = mapped_column(       # minúsculas
+        String(255).with_variant(mysql.VARCHAR(255, collation="utf8mb4_bin"), "mysql"), nullable=True,
+    )
+    phone_key: Mapped[str | None] = mapped_column(       # dígitos invertidos
+        String(50).with_variant(mysql.VARCHAR(50, collation="utf8mb4_bin"), "mysql"), nullable=True,
+    )
+
     clinics = relationship("Clinic", secondary="clinic_patients", back_populates="patients")
+
+    __table_args__ = (
+        Index("ix_patient_doc_id_key", "doc_id_key"),
+        Index("ix_patient_email_key", "email_key"),
+        Index("ix_patient_phone_key", "phone_key"),
+    )
@@ -0,0 +1,37 @@
+import enum
+from datetime import datetime
+from sqlalchemy import String, Enum, ForeignKey, DateTime, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.db import Base
+
+class ReminderStatus(str, enum.Enum):
+    pending = "pending"
+    leased = "leased"
+    sent = "sent"
+    failed = "failed"
+    cancelled = "cancelled"
+
+class AppointmentReminder(Base):
+    """Cola durable de recordatorios: un job por (turno, canal, anticipación)."""
+    __tablename__ = "appointment_reminders"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    appointment_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("appointments.id", ondelete="CASCADE"), index=True
+    )
+    channel: Mapped[str] = mapped_column(String(32), default="log")
+    offset_minutes: Mapped[int] = mapped_column(Integer)
+    due_at: Mapped[datetime] = mapped_column(DateTime(timezone=False))
+    status: Mapped[ReminderStatus] = mapped_column(Enum(ReminderStatus), default=ReminderStatus.pending)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    leased_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(), server_default=func.current_timestamp(), nullable=False)
+
+    __table_args__ = (
+        # el worker sólo recorre (status='pending', due_at <= ahora)
+        Index("ix_reminder_status_due", "status", "due_at"),
+    )
@@ -0,0 +1,28 @@
+from datetime import date, datetime
+from sqlalchemy import String, Date, DateTime, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+class AppointmentDailyRollup(Base):
+    """
+    Agregado diario de turnos por (día de inicio, doctor, clínica). Lo mantienen las rutas
+    de escritura con deltas (app.services.rollups) y lo corrige la reconciliación nocturna.
+    """
+    __tablename__ = "appointment_daily_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    doctor_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    clinic_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+
+    total: Mapped[int] = mapped_column(Integer, default=0, server_default="0")            # incluye cancelados
+    cancelled: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    booked_minutes: Mapped[int] = mapped_column(Integer, default=0, server_default="0")   # sólo activos
+    virtual_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")    # sólo activos
+    presencial_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0") # sólo activos
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=False))
+
+    __table_args__ = (
+        Index("ix_rollup_clinic_day", "clinic_id", "day"),
+        Index("ix_rollup_doctor_day", "doctor_id", "day"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import String, Index
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+class SearchTerm(Base):
+    """
+    Términos normalizados (minúsculas, sin acentos) por entidad, para búsqueda por prefijo
+    con un range scan sobre el PK. Los mantiene app.services.search_index.
+    """
+    __tablename__ = "search_terms"
+
+    entity_type: Mapped[str] = mapped_column(String(16), primary_key=True)   # "doctor", ...
+    # collation binaria en MySQL: el índice ordena por bytes y los rangos de prefijo
+    # (term >= 'perez' AND term < 'pere{') valen; con *_ai_ci los signos van antes que las letras
+    term: Mapped[str] = mapped_column(
+        String(64).with_variant(mysql.VARCHAR(64, collation="utf8mb4_bin"), "mysql"), primary_key=True,
+    )
+    entity_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    field: Mapped[str] = mapped_column(String(16), primary_key=True)         # name / specialty / clinic
+
+    __table_args__ = (
+        # reindexar / borrar los términos de una entidad
+        Index("ix_search_term_entity", "entity_type", "entity_id"),
+    )
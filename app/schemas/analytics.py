@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class UtilizationRowOut(BaseModel):
+    day: Optional[date] = None          # según group_by
+    doctor_id: Optional[str] = None
+    clinic_id: Optional[str] = None
+    total: int
+    cancelled: int
+    booked_minutes: int
+    offered_minutes: int
+    utilization: float                  # booked / offered
+    cancellation_rate: float            # cancelled / total
+    virtual_share: float                # virtual / activos
+    presencial_share: float
+
+class RollupReconcileOut(BaseModel):
+    date_from: date
+    date_to: date
+    rows: int
@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from typing import Optional, Literal
 from datetime import datetime
 
+from app.schemas.clinic import ClinicOut
+
 ApptType = Literal["presencial", "virtual"]
 ApptStatus = Literal["pending", "confirmed", "cancelled"]
 
@@ -34,3 +36,83 @@ class AppointmentOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# --- resúmenes compactos para ?expand=doctor,patient,clinic ---
+class DoctorBrief(BaseModel):
+    id: str
+    name: str
+    specialty: str
+    color: Optional[str] = None
+    photo_url: Optional[str] = None
+
+class PatientBrief(BaseModel):
+    id: str
+    name: str
+    doc_id: Optional[str] = None
+    photo_url: Optional[str] = None
+
+class ClinicBrief(BaseModel):
+    id: str
+    name: str
+    city: Optional[str] = None
+
+class AppointmentExpandedOut(AppointmentOut):
+    doctor: Optional[DoctorBrief] = None
+    patient: Optional[PatientBrief] = None
+    clinic: Optional[ClinicBrief] = None
+
+class AppointmentWithSpecialtyOut(AppointmentOut):
+    specialty: Optional[str] = None
+    doctor_name: Optional[str] = None
+    clinic: Optional[ClinicOut] = None
+
+class AppointmentConflictOut(BaseModel):
+    kind: Literal["doctor", "patient"]
+    person_id: str
+    appointment_id: str
+    clinic_id: str
+    starts_at: datetime
+    ends_at: datetime
+    conflicting_id: str
+    conflicting_clinic_id: str
+    conflicting_starts_at: datetime
+    conflicting_ends_at: datetime
+
+class CalendarBucketOut(BaseModel):
+    bucket: str                      # "YYYY-MM-DD" o "YYYY-MM-DD HH:00"
+    total: int
+    by_status: dict[str, int] = {}
+    by_type: dict[str, int] = {}
+
+# --- operaciones masivas: ausencia de un doctor ---
+class DoctorAbsenceIn(BaseModel):
+    doctor_id: str
+    date_from: datetime
+    date_to: datetime
+    action: Literal["cancel", "move"]
+    clinic_id: Optional[str] = None        # limitar a una clínica
+    shift_minutes: Optional[int] = None    # move: correr los turnos N minutos (negativo = adelantar)
+    new_doctor_id: Optional[str] = None    # move: reasignar a otro doctor
+    dry_run: bool = False                  # calcula el resultado sin escribir
+
+class BulkAppointmentChangeOut(BaseModel):
+    id: str
+    patient_id: str
+    patient_name: Optional[str] = None
+    patient_email: Optional[str] = None
+    patient_phone: Optional[str] = None
+    clinic_id: str
+    old_doctor_id: str
+    doctor_id: str
+    old_starts_at: datetime
+    old_ends_at: datetime
+    starts_at: datetime
+    ends_at: datetime
+    status: ApptStatus
+
+class BulkOperationOut(BaseModel):
+    action: Literal["cancel", "move"]
+    dry_run: bool
+    affected: int
+    items: list[BulkAppointmentChangeOut] = []
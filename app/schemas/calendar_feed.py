@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Literal
+from datetime import datetime
+
+class CalendarFeedOut(BaseModel):
+    scope: Literal["doctor", "patient"]
+    token: str
+    url: str
+    created_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -12,9 +12,15 @@ class ClinicCreate(BaseModel):
 
 class ClinicOut(ClinicCreate):
     id: str
+    # sólo con summary=true
+    doctor_count: Optional[int] = None
+    patient_count: Optional[int] = None
     class Config:
         from_attributes = True
 
+class ClinicNearbyOut(ClinicOut):
+    distance_km: float
+
 class ClinicUpdate(BaseModel):
     name: str
     address: Optional[str] = None
@@ -33,6 +33,19 @@ class ConsultationOut(BaseModel):
     class Config:
         from_attributes = True
 
+class ConsultationSearchHitOut(BaseModel):
+    id: str
+    patient_id: str
+    doctor_id: str
+    appointment_id: Optional[str] = None
+    date: datetime
+    specialty: str
+    diagnosis: str
+    score: float
+    # fragmentos con <mark>...</mark> en las coincidencias (HTML escapado); None si no matchea ese campo
+    diagnosis_highlight: Optional[str] = None
+    notes_highlight: Optional[str] = None
+
 # --- Medications ---
 MedStatus = Literal["active", "suspended", "completed"]
 
@@ -74,23 +87,31 @@ class LabCreate(BaseModel):
     date: Optional[datetime] = None
     result: Optional[str] = ""
     status: LabStatus = "pending"
+    doctor_id: Optional[str] = None   # por defecto, el doctor que lo carga
 
 class LabUpdate(BaseModel):
     test: Optional[str] = None
     date: Optional[datetime] = None
     result: Optional[str] = None
     status: Optional[LabStatus] = None
+    doctor_id: Optional[str] = None
 
-class LabOut(BaseModel):
+class LabSummaryOut(BaseModel):
+    """Lo que devuelven los listados: sin el cuerpo del resultado (ver GET /clinical/labs/{id})."""
     id: str
     patient_id: str
     test: str
     date: datetime
-    result: str
     status: LabStatus
+    doctor_id: Optional[str] = None
+    result_summary: str = ""
+    result_size: int = 0
     class Config:
         from_attributes = True
 
+class LabOut(LabSummaryOut):
+    result: str
+
 # ---------- VITALS ----------
 VitalStatus = Literal["Normal", "Alto", "Bajo"]
 
@@ -114,5 +135,61 @@ class VitalOut(BaseModel):
     value: str
     date: datetime
     status: Optional[VitalStatus] = None
+    metric_code: Optional[str] = None
+    num_value: Optional[float] = None
+    num_value2: Optional[float] = None
+    unit: Optional[str] = None
+    class Config:
+        from_attributes = True
+
+class VitalIngestErrorOut(BaseModel):
+    index: int          # posición de la lectura en el lote / línea NDJSON (desde 0)
+    detail: str
+
+class VitalIngestOut(BaseModel):
+    received: int
+    inserted: int = 0
+    queued: int = 0
+    errors: list[VitalIngestErrorOut] = []
+
+class VitalPointOut(BaseModel):
+    date: datetime
+    value: Optional[float] = None
+    value2: Optional[float] = None
+
+class VitalBucketOut(BaseModel):
+    bucket: str
+    n: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    avg: Optional[float] = None
+    min2: Optional[float] = None
+    max2: Optional[float] = None
+    avg2: Optional[float] = None
+
+class VitalSeriesOut(BaseModel):
+    patient_id: str
+    metric_code: str
+    unit: Optional[str] = None
+    mode: Literal["raw", "lttb", "buckets"]
+    total: int                                   # lecturas en el rango
+    truncated: bool = False                      # lttb: había más de VITALS_SERIES_MAX_ROWS, sólo las recientes
+    points: list[VitalPointOut] = []
+    buckets: list[VitalBucketOut] = []
+
+class LatestVitalOut(BaseModel):
+    metric_code: str
+    vital_id: str
+    metric: str
+    value: str
+    date: datetime
+    status: Optional[VitalStatus] = None
+    num_value: Optional[float] = None
+    num_value2: Optional[float] = None
+    unit: Optional[str] = None
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PatientLatestVitalsOut(BaseModel):
+    patient_id: str
+    vitals: list[LatestVitalOut] = []
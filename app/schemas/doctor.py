@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime
 from app.models.doctor import SexEnum
 
 class DoctorCreate(BaseModel):
@@ -45,12 +45,13 @@ class DoctorOut(BaseModel):
     sex: Optional[SexEnum] = None
     birth_date: Optional[date] = None
     clinics: List[str] = []
+    next_available_at: Optional[datetime] = None   # sólo en el directorio público
 
     class Config:
         from_attributes = True  # permite pasarle un modelo ORM
 
     @staticmethod
-    def from_model(d) -> "DoctorOut":
+    def from_model(d, next_available_at: Optional[datetime] = None) -> "DoctorOut":
         """Construye seguro sin usar __dict__."""
         return DoctorOut(
             id=d.id,
@@ -67,4 +68,16 @@ class DoctorOut(BaseModel):
             sex=d.sex,
             birth_date=d.birth_date,
             clinics=[c.id for c in getattr(d, "clinics", [])],
+            next_available_at=next_available_at,
         )
+
+class DoctorSuggestionOut(BaseModel):
+    """Autocompletado del directorio público."""
+    id: str
+    name: str
+    specialty: str
+    photo_url: Optional[str] = None
+    score: float
+
+    class Config:
+        from_attributes = True
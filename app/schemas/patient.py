@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import date
+from typing import Any, Literal, Optional, List
+from datetime import date, datetime
 from app.models.patient import SexEnum
 
 class PatientCreate(BaseModel):
@@ -67,4 +67,17 @@ class PatientOut(BaseModel):
             sex=p.sex,
             birth_date=p.birth_date,
             clinics=[c.id for c in getattr(p, "clinics", [])],
-        )
\ No newline at end of file
+        )
+
+# --- timeline clínico ---
+TimelineKind = Literal["consultation", "medication", "lab", "vital", "prescription", "certificate"]
+
+class TimelineItemOut(BaseModel):
+    kind: TimelineKind
+    id: str
+    ts: datetime                 # fecha clínica (las de tipo Date, a medianoche)
+    data: dict[str, Any]
+
+class PatientTimelineOut(BaseModel):
+    items: List[TimelineItemOut]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,121 @@
+# app/services/consultation_search.py
+"""
+Búsqueda de texto en diagnóstico y notas de las consultas.
+
+- MySQL: índice FULLTEXT (diagnosis, notes) con MATCH ... AGAINST en modo natural; la
+  collation utf8mb4 *_ai_ci ya ignora acentos y mayúsculas.
+- SQLite (desarrollo): índice invertido en memoria (text_search.InvertedIndex), que se
+  carga de la base en la primera búsqueda y después se mantiene con index_consultation()
+  / unindex_consultation() desde las rutas de escritura. Es por proceso. Lo que se
+  escribe mientras dura la carga se anota y se reaplica antes de marcarlo listo.
+El diagnóstico pesa el doble que las notas en el ranking en memoria.
+"""
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import SessionLocal, dialect_name
+from app.models.clinical import Consultation
+from app.services.text_search import InvertedIndex, tokenize
+
+_LOAD_CHUNK = 1000
+
+consultation_index = InvertedIndex()
+_load_lock = asyncio.Lock()
+# escrituras durante una carga en curso: id -> (tokens, meta), o None si se borró
+_pending: dict[str, tuple[list[str], dict] | None] | None = None
+
+
+def _tokens(diagnosis: str | None, notes: str | None) -> list[str]:
+    diag = tokenize(diagnosis or "")
+    return diag + diag + tokenize(notes or "")
+
+
+def index_consultation(c: Consultation) -> None:
+    """Post-commit: (re)indexa la consulta si el índice en memoria está cargado (o cargándose)."""
+    tokens, meta = _tokens(c.diagnosis, c.notes), {"patient_id": c.patient_id, "doctor_id": c.doctor_id}
+    if _pending is not None:
+        _pending[c.id] = (tokens, meta)
+    elif consultation_index.ready:
+        consultation_index.add(c.id, tokens, **meta)
+
+
+def unindex_consultation(consultation_id: str) -> None:
+    if _pending is not None:
+        _pending[consultation_id] = None
+    elif consultation_index.ready:
+        consultation_index.remove(consultation_id)
+
+
+async def _ensure_loaded() -> None:
+    global _pending
+    if consultation_index.ready:
+        return
+    async with _load_lock:
+        if consultation_index.ready:
+            return
+        _pending = {}
+        try:
+            last_id = ""
+            async with SessionLocal() as db:
+                while True:
+                    res = await db.execute(
+                        select(
+                            Consultation.id, Consultation.patient_id, Consultation.doctor_id,
+                            Consultation.diagnosis, Consultation.notes,
+                        )
+                        .where(Consultation.id > last_id)
+                        .order_by(Consultation.id)
+                        .limit(_LOAD_CHUNK)
+                    )
+                    rows = res.all()
+                    if not rows:
+                        break
+                    for r in rows:
+                        consultation_index.add(
+                            r.id, _tokens(r.diagnosis, r.notes), patient_id=r.patient_id, doctor_id=r.doctor_id,
+                        )
+                    last_id = rows[-1].id
+            # lo commiteado mientras leíamos puede haber quedado detrás del cursor
+            for consultation_id, entry in _pending.items():
+                if entry is None:
+                    consultation_index.remove(consultation_id)
+                else:
+                    consultation_index.add(consultation_id, entry[0], **entry[1])
+            consultation_index.ready = True
+        finally:
+            _pending = None
+
+
+async def search_consultations(
+    db: AsyncSession,
+    q: str,
+    limit: int,
+    offset: int = 0,
+    patient_id: str | None = None,
+    doctor_id: str | None = None,
+) -> list[tuple[Consultation, float]]:
+    """(consulta, score) que matchean `q`, de mayor a menor relevancia."""
+    if dialect_name(db) == "mysql":
+        score = match(Consultation.diagnosis, Consultation.notes, against=q).in_natural_language_mode()
+        stmt = select(Consultation, score.label("score")).where(score > 0)
+        if patient_id:
+            stmt = stmt.where(Consultation.patient_id == patient_id)
+        if doctor_id:
+            stmt = stmt.where(Consultation.doctor_id == doctor_id)
+        res = await db.execute(
+            stmt.order_by(score.desc(), Consultation.date.desc()).offset(offset).limit(limit)
+        )
+        return [(c, float(s)) for c, s in res.all()]
+
+    await _ensure_loaded()
+    filters = {k: v for k, v in (("patient_id", patient_id), ("doctor_id", doctor_id)) if v}
+    hits = consultation_index.search(tokenize(q), offset + limit, **filters)[offset:]
+    if not hits:
+        return []
+    res = await db.execute(select(Consultation).where(Consultation.id.in_([h[0] for h in hits])))
+    by_id = {c.id: c for c in res.scalars().all()}
+    # una consulta borrada por otro proceso puede seguir en el índice: se descarta acá
+    return [(by_id[i], s) for i, s in hits if i in by_id]
@@ -0,0 +1,117 @@
+# app/services/event_bus.py
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+Scope = tuple[str, str]   # ("doctor" | "clinic" | "patient" | ..., id)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    kind: str
+    scopes: frozenset[Scope]
+    data: dict
+
+
+class EventBus:
+    """
+    Bus de eventos en memoria (por proceso) con un log acotado, para feeds SSE.
+    Los ids son crecientes y arrancan en el epoch en ms, así un Last-Event-ID de un
+    proceso anterior se detecta como hueco y el cliente recibe un "reset".
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self._log: deque[Event] = deque(maxlen=maxlen)
+        self._last_id = time.time_ns() // 1_000_000
+        self._wakeup = asyncio.Event()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, kind: str, scopes: Iterable[Scope], data: dict) -> Event:
+        self._last_id += 1
+        ev = Event(self._last_id, kind, frozenset(scopes), data)
+        self._log.append(ev)
+        # despierta a todos los suscriptores y arma el próximo "timbre"
+        wake, self._wakeup = self._wakeup, asyncio.Event()
+        wake.set()
+        return ev
+
+    def _has_gap(self, last_id: int) -> bool:
+        if last_id == self._last_id:
+            return False
+        if last_id > self._last_id or not self._log:
+            return True
+        return last_id < self._log[0].id - 1
+
+    async def subscribe(
+        self,
+        scopes: set[Scope],
+        last_id: int | None = None,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[Event | None]:
+        """
+        Itera los eventos que tocan alguno de `scopes`. Reanuda desde `last_id` si
+        sigue en el log; si no, emite un Event "reset" (el cliente debe recargar).
+        Emite None cada `heartbeat` segundos sin eventos.
+        """
+        cursor = self._last_id
+        if last_id is not None:
+            if self._has_gap(last_id):
+                yield Event(self._last_id, "reset", frozenset(), {})
+            else:
+                cursor = last_id
+
+        while True:
+            wake = self._wakeup
+            pending = [e for e in self._log if e.id > cursor]
+            for ev in pending:
+                cursor = ev.id
+                if ev.scopes & scopes:
+                    yield ev
+            if pending:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+def _format_sse(ev: Event | None) -> str:
+    if ev is None:
+        return ": ping\n\n"
+    return f"id: {ev.id}\nevent: {ev.kind}\ndata: {json.dumps(ev.data, default=str)}\n\n"
+
+
+def sse_response(
+    bus: EventBus,
+    request: Request,
+    scopes: set[Scope],
+    last_event_id: str | None,
+    heartbeat: float = 15.0,
+) -> StreamingResponse:
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = -1   # id ilegible -> forzamos reset
+
+    async def _gen():
+        yield "retry: 3000\n\n"
+        async for ev in bus.subscribe(scopes, last_id, heartbeat):
+            if await request.is_disconnected():
+                break
+            yield _format_sse(ev)
+
+    return StreamingResponse(
+        _gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
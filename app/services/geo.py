@@ -0,0 +1,73 @@
+# app/services/geo.py
+"""
+Búsqueda de clínicas cercanas con geohash (sirve igual en MySQL y SQLite).
+
+- clinics.geohash guarda el geohash de (lat, lng) con GEOHASH_PRECISION caracteres, con
+  índice. Un prefijo de geohash es una celda: "todas las clínicas en la celda" es un
+  rango sobre el índice (ver search_index.prefix_range).
+- Para un radio se elige la precisión más fina cuya celda mide al menos el radio, y se
+  buscan la celda del punto y sus 8 vecinas: el círculo queda siempre cubierto. Los
+  candidatos se filtran y ordenan por distancia real (haversine) en memoria.
+"""
+import math
+
+EARTH_KM = 6371.0
+KM_PER_DEG = 111.32
+GEOHASH_PRECISION = 9     # ~5 m
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            ch = ch * 2 + (lng >= mid)
+            lng_lo, lng_hi = (mid, lng_hi) if lng >= mid else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            ch = ch * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def geohash_of(lat: float | None, lng: float | None) -> str | None:
+    return geohash_encode(lat, lng) if lat is not None and lng is not None else None
+
+
+def _cell_deg(precision: int) -> tuple[float, float]:
+    """(alto, ancho) en grados de una celda de `precision` caracteres."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> list[str]:
+    """Prefijos de geohash (celda del punto + vecinas) que cubren el círculo."""
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    precision = 1
+    for p in range(GEOHASH_PRECISION, 0, -1):
+        h, w = _cell_deg(p)
+        if h * KM_PER_DEG >= radius_km and w * KM_PER_DEG * cos_lat >= radius_km:
+            precision = p
+            break
+    h, w = _cell_deg(precision)
+    cells = set()
+    for dy in (-h, 0.0, h):
+        for dx in (-w, 0.0, w):
+            y = min(max(lat + dy, -90.0), 90.0 - 1e-9)
+            x = (lng + dx + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(y, x, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_KM * math.asin(math.sqrt(a))
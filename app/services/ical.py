@@ -0,0 +1,83 @@
+# app/services/ical.py
+"""Serialización mínima de iCalendar (RFC 5545) para los feeds .ics de turnos."""
+from datetime import datetime
+
+_STATUS = {"pending": "TENTATIVE", "confirmed": "CONFIRMED", "cancelled": "CANCELLED"}
+
+
+def escape(text: str | None) -> str:
+    if not text:
+        return ""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Corta la línea en tramos de 75 octetos (continuación con un espacio) y agrega CRLF."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, start, width = [], 0, 75
+    while start < len(raw):
+        end = min(start + width, len(raw))
+        # no partir un carácter UTF-8 al medio
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode("utf-8"))
+        start, width = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def fmt_dt(dt: datetime) -> str:
+    # las fechas de la base son UTC naive
+    return dt.strftime("%Y%m%dT%H%M%SZ")
+
+
+def calendar_header(name: str) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Clinic Hub//Turnos//ES",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape(name)}",
+    ]
+    return "".join(fold(l) for l in lines)
+
+
+def calendar_footer() -> str:
+    return fold("END:VCALENDAR")
+
+
+def vevent(
+    uid: str,
+    starts_at: datetime,
+    ends_at: datetime,
+    updated_at: datetime | None,
+    status: str,
+    summary: str,
+    location: str | None = None,
+    description: str | None = None,
+) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{fmt_dt(updated_at or starts_at)}",
+        f"DTSTART:{fmt_dt(starts_at)}",
+        f"DTEND:{fmt_dt(ends_at)}",
+        f"STATUS:{_STATUS.get(status, 'TENTATIVE')}",
+        f"SUMMARY:{escape(summary)}",
+    ]
+    if updated_at:
+        lines.append(f"LAST-MODIFIED:{fmt_dt(updated_at)}")
+    if location:
+        lines.append(f"LOCATION:{escape(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{escape(description)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(l) for l in lines)
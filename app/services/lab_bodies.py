@@ -0,0 +1,56 @@
+# app/services/lab_bodies.py
+"""
+Almacenamiento de los resultados de laboratorio.
+
+- Hasta LAB_RESULT_INLINE_BYTES el texto queda en lab_results.result, como siempre.
+- Más grandes (informes completos de paneles) se guardan comprimidos con zlib en
+  lab_result_bodies y lab_results.result queda vacío: los listados no los arrastran.
+- result_summary / result_size se mantienen siempre; los listados devuelven sólo eso y el
+  cuerpo completo sale de GET /clinical/labs/{id} (load_lab_result).
+"""
+import zlib
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import dialect_name, upsert
+from app.models.labs_vitals import LabResult, LabResultBody
+
+
+def summarize(text: str) -> str:
+    """Texto con espacios colapsados, cortado a LAB_RESULT_SUMMARY_CHARS."""
+    flat = " ".join((text or "").split())
+    limit = settings.LAB_RESULT_SUMMARY_CHARS
+    return flat if len(flat) <= limit else flat[:limit - 1].rstrip() + "…"
+
+
+def split_result(text: str) -> tuple[dict, bytes | None]:
+    """(columnas de lab_results, cuerpo comprimido o None si el texto va inline)."""
+    raw = (text or "").encode("utf-8")
+    cols = {"result_summary": summarize(text), "result_size": len(raw)}
+    if len(raw) <= settings.LAB_RESULT_INLINE_BYTES:
+        return {**cols, "result": text or ""}, None
+    return {**cols, "result": ""}, zlib.compress(raw, 6)
+
+
+async def store_lab_result(db: AsyncSession, lab: LabResult, text: str) -> None:
+    """Asigna el resultado al laboratorio (inline o comprimido). No hace commit."""
+    cols, body = split_result(text)
+    for k, v in cols.items():
+        setattr(lab, k, v)
+    await db.flush()   # la fila de lab_results tiene que existir antes que su cuerpo
+    if body is None:
+        await db.execute(delete(LabResultBody).where(LabResultBody.lab_id == lab.id))
+    else:
+        await db.execute(upsert(
+            dialect_name(db), LabResultBody, [{"lab_id": lab.id, "encoding": "zlib", "body": body}], ("lab_id",),
+        ))
+
+
+async def load_lab_result(db: AsyncSession, lab: LabResult) -> str:
+    """Resultado completo: el inline o el cuerpo descomprimido."""
+    if lab.result or not lab.result_size:
+        return lab.result or ""
+    body = (await db.execute(select(LabResultBody.body).where(LabResultBody.lab_id == lab.id))).scalar_one_or_none()
+    return zlib.decompress(body).decode("utf-8") if body is not None else ""
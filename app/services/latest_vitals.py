@@ -0,0 +1,82 @@
+# app/services/latest_vitals.py
+"""
+Proyección patient_latest_vitals: la última lectura por (paciente, métrica).
+
+- Altas (POST y la ingesta): bump_latest_vitals() hace un upsert que sólo pisa si la
+  lectura es igual o más nueva que la guardada; no lee nada.
+- Ediciones y bajas: refresh_latest_vitals() recalcula las claves afectadas desde vitals
+  (puede que la última deje de serlo), borrando la fila si ya no quedan lecturas.
+- Sólo entran lecturas con metric_code (las métricas reconocidas por vitals_parse).
+Ninguna función hace commit: corren dentro de la transacción de la escritura.
+"""
+from sqlalchemy import case, delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import dialect_name, upsert
+from app.models.labs_vitals import PatientLatestVital, Vital
+
+_KEYS = ("patient_id", "metric_code")
+_COLUMNS = ("vital_id", "metric", "value", "status", "num_value", "num_value2", "unit")
+
+
+def _row(v: Vital) -> dict:
+    return {
+        "patient_id": v.patient_id, "metric_code": v.metric_code, "vital_id": v.id,
+        "metric": v.metric, "value": v.value, "date": v.date, "status": v.status,
+        "num_value": v.num_value, "num_value2": v.num_value2, "unit": v.unit,
+    }
+
+
+async def bump_latest_vitals(db: AsyncSession, vitals: list[Vital]) -> None:
+    """Registra lecturas nuevas si son las más recientes de su (paciente, métrica)."""
+    newest: dict[tuple, Vital] = {}
+    for v in vitals:
+        key = (v.patient_id, v.metric_code)
+        if v.metric_code and (key not in newest or v.date >= newest[key].date):
+            newest[key] = v
+    if not newest:
+        return
+    t = PatientLatestVital.__table__
+
+    def _if_newer(new):
+        newer = new["date"] >= t.c.date
+        values = {c: case((newer, new[c]), else_=t.c[c]) for c in _COLUMNS}
+        # date va última: MySQL evalúa las asignaciones en orden y las siguientes verían la nueva
+        values["date"] = case((newer, new["date"]), else_=t.c.date)
+        return values
+
+    await db.execute(upsert(
+        dialect_name(db), PatientLatestVital, [_row(v) for v in newest.values()], _KEYS, update=_if_newer,
+    ))
+
+
+async def refresh_latest_vitals(db: AsyncSession, keys: set[tuple[str, str | None]]) -> None:
+    """Recalcula desde vitals las claves (patient_id, metric_code) dadas."""
+    keys = {k for k in keys if k[1]}
+    if not keys:
+        return
+    rows = []
+    for patient_id, metric_code in keys:
+        res = await db.execute(
+            select(Vital)
+            .where(Vital.patient_id == patient_id, Vital.metric_code == metric_code)
+            .order_by(Vital.date.desc(), Vital.id.desc())
+            .limit(1)
+            .execution_options(populate_existing=True)   # el status pudo cambiar por un UPDATE masivo
+        )
+        v = res.scalar_one_or_none()
+        if v:
+            rows.append(_row(v))
+    await db.execute(
+        delete(PatientLatestVital).where(tuple_(PatientLatestVital.patient_id, PatientLatestVital.metric_code).in_(keys))
+    )
+    if rows:
+        await db.execute(PatientLatestVital.__table__.insert(), rows)
+
+
+async def refresh_patient_latest_vitals(db: AsyncSession, patient_id: str) -> None:
+    """Recalcula todas las métricas del paciente (p.ej. tras reclasificar sus lecturas)."""
+    res = await db.execute(
+        select(PatientLatestVital.metric_code).where(PatientLatestVital.patient_id == patient_id)
+    )
+    await refresh_latest_vitals(db, {(patient_id, code) for code in res.scalars().all()})
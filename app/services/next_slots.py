@@ -0,0 +1,187 @@
+# app/services/next_slots.py
+"""
+Próximo turno libre por (doctor, clínica), guardado en doctor_next_slots.
+
+- El valor sale de la agenda del doctor en todas sus clínicas (no puede estar en dos a la
+  vez) sobre una grilla de NEXT_SLOT_MINUTES dentro de la franja NEXT_SLOT_DAY_START_HOUR a
+  NEXT_SLOT_DAY_END_HOUR, hasta NEXT_SLOT_HORIZON_DAYS.
+- Las escrituras de turnos llaman a sync_next_slots() dentro de su transacción y sólo
+  recalculan los doctores cuyo valor puede moverse; las altas/bajas de membresía llaman a
+  refresh_doctors().
+- run_next_slot_refresher() (lifespan) recalcula las filas vencidas y las que faltan.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import SessionLocal, dialect_name, upsert
+from app.models.appointment import Appointment, ApptStatus
+from app.models.links import ClinicDoctor
+from app.models.next_slot import DoctorNextSlot
+
+logger = logging.getLogger(__name__)
+
+
+def _ceil_to_grid(t: datetime, step: timedelta) -> datetime:
+    """Redondea hacia arriba a la grilla de slots (alineada a la medianoche, como /availability)."""
+    day = datetime(t.year, t.month, t.day)
+    n = -((day - t) // step)
+    return day + n * step
+
+
+def first_free_slot(busy: list[tuple[datetime, datetime]], now: datetime) -> datetime | None:
+    """Inicio del primer slot libre a partir de `now`; None si no hay dentro del horizonte."""
+    step = timedelta(minutes=settings.NEXT_SLOT_MINUTES)
+    open_h = timedelta(hours=settings.NEXT_SLOT_DAY_START_HOUR)
+    close_h = timedelta(hours=settings.NEXT_SLOT_DAY_END_HOUR)
+    limit = now + timedelta(days=settings.NEXT_SLOT_HORIZON_DAYS)
+
+    busy = sorted(busy)
+    i = 0
+    cur = _ceil_to_grid(now, step)
+    while cur < limit:
+        day = datetime(cur.year, cur.month, cur.day)
+        if cur < day + open_h:
+            cur = day + open_h
+            continue
+        if cur + step > day + close_h:
+            cur = day + timedelta(days=1) + open_h
+            continue
+        # descartar ocupaciones que terminaron antes del candidato
+        while i < len(busy) and busy[i][1] <= cur:
+            i += 1
+        if i < len(busy) and busy[i][0] < cur + step:
+            cur = _ceil_to_grid(busy[i][1], step)
+            continue
+        return cur
+    return None
+
+
+async def refresh_doctors(db: AsyncSession, doctor_ids, now: datetime | None = None) -> None:
+    """
+    Recalcula el próximo slot de los doctores en todas sus clínicas (una query de agenda y
+    una de membresías para todo el lote) y borra las filas de clínicas que ya no son suyas.
+    No hace commit.
+    """
+    ids = set(doctor_ids)
+    if not ids:
+        return
+    now = now or datetime.utcnow()
+    limit = now + timedelta(days=settings.NEXT_SLOT_HORIZON_DAYS)
+
+    res = await db.execute(
+        select(Appointment.doctor_id, Appointment.starts_at, Appointment.ends_at).where(
+            Appointment.doctor_id.in_(ids),
+            Appointment.status != ApptStatus.cancelled,
+            Appointment.ends_at > now,
+            Appointment.starts_at < limit,
+        )
+    )
+    busy: dict[str, list[tuple[datetime, datetime]]] = defaultdict(list)
+    for doctor_id, starts_at, ends_at in res.all():
+        busy[doctor_id].append((starts_at, ends_at))
+
+    await db.execute(
+        delete(DoctorNextSlot)
+        .where(
+            DoctorNextSlot.doctor_id.in_(ids),
+            ~exists().where(
+                ClinicDoctor.doctor_id == DoctorNextSlot.doctor_id,
+                ClinicDoctor.clinic_id == DoctorNextSlot.clinic_id,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    res = await db.execute(
+        select(ClinicDoctor.doctor_id, ClinicDoctor.clinic_id).where(ClinicDoctor.doctor_id.in_(ids))
+    )
+    memberships = res.all()
+    if not memberships:
+        return
+    next_free = {d: first_free_slot(busy[d], now) for d in {m.doctor_id for m in memberships}}
+    rows = [
+        {"doctor_id": m.doctor_id, "clinic_id": m.clinic_id, "next_free_at": next_free[m.doctor_id], "computed_at": now}
+        for m in memberships
+    ]
+    await db.execute(upsert(dialect_name(db), DoctorNextSlot, rows, ("doctor_id", "clinic_id")))
+
+
+async def sync_next_slots(
+    db: AsyncSession,
+    changes: list[tuple[dict | None, dict | None]],
+    now: datetime | None = None,
+) -> None:
+    """
+    Actualización incremental tras altas, bajas y cambios de turnos (before, after): sólo
+    recalcula un doctor si algún intervalo ocupado o liberado empieza antes de que termine
+    su próximo slot libre actual (o si no tiene lugar en el horizonte).
+    """
+    now = now or datetime.utcnow()
+    touched: list[tuple[str, datetime]] = [
+        (snap["doctor_id"], snap["starts_at"])
+        for before, after in changes
+        for snap in (before, after)
+        if snap and snap["status"] != ApptStatus.cancelled and snap["ends_at"] > now
+    ]
+    if not touched:
+        return
+    res = await db.execute(
+        select(DoctorNextSlot.doctor_id, func.min(DoctorNextSlot.next_free_at))
+        .where(DoctorNextSlot.doctor_id.in_({d for d, _ in touched}))
+        .group_by(DoctorNextSlot.doctor_id)
+    )
+    current = dict(res.all())
+    step = timedelta(minutes=settings.NEXT_SLOT_MINUTES)
+    dirty = {
+        d for d, starts_at in touched
+        if d in current and (current[d] is None or starts_at < current[d] + step)
+    }
+    await refresh_doctors(db, dirty, now)
+
+
+async def stale_doctor_ids(db: AsyncSession, now: datetime, limit: int) -> list[str]:
+    """Doctores con el slot ya pasado, sin lugar y calculado hace más de un día, o sin fila."""
+    stale = select(DoctorNextSlot.doctor_id).where(
+        or_(
+            DoctorNextSlot.next_free_at < now,
+            (DoctorNextSlot.next_free_at.is_(None)) & (DoctorNextSlot.computed_at < now - timedelta(days=1)),
+        )
+    )
+    missing = (
+        select(ClinicDoctor.doctor_id)
+        .outerjoin(
+            DoctorNextSlot,
+            (DoctorNextSlot.doctor_id == ClinicDoctor.doctor_id)
+            & (DoctorNextSlot.clinic_id == ClinicDoctor.clinic_id),
+        )
+        .where(DoctorNextSlot.doctor_id.is_(None))
+    )
+    ids = set((await db.execute(stale.limit(limit))).scalars().all())
+    ids |= set((await db.execute(missing.limit(limit))).scalars().all())
+    return list(ids)[:limit]
+
+
+async def run_next_slot_refresher(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        ids: list[str] = []
+        try:
+            async with SessionLocal() as db:
+                now = datetime.utcnow()
+                ids = await stale_doctor_ids(db, now, settings.NEXT_SLOT_REFRESH_BATCH)
+                if ids:
+                    await refresh_doctors(db, ids, now)
+                    await db.commit()
+        except Exception:
+            logger.exception("Error refrescando doctor_next_slots")
+        if len(ids) >= settings.NEXT_SLOT_REFRESH_BATCH:
+            continue  # quedan más filas vencidas
+        try:
+            await asyncio.wait_for(stop.wait(), settings.NEXT_SLOT_REFRESH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
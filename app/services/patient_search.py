@@ -0,0 +1,99 @@
+# app/services/patient_search.py
+"""
+Búsqueda de pacientes para recepción: por documento, email, teléfono o nombre.
+
+- Claves normalizadas e indexadas en patients (apply_lookup_keys() en cada alta/edición):
+  doc_id_key  "30.123.456"        -> "30123456"   (sólo A-Z0-9)
+  email_key   " Jose@X.com"       -> "jose@x.com"
+  phone_key   "+54 11 5555-1234"  -> "432155551145" (dígitos al revés: buscar por los
+              últimos dígitos, con o sin característica, es un prefijo y usa el índice)
+- El nombre se busca por prefijo sin acentos en search_terms (search_index.PATIENT).
+- Todas las búsquedas son rangos sobre índices; cada una trae como mucho `limit` ids y el
+  ranking se arma en memoria: documento/email exactos > teléfono > documento/email
+  parciales > nombre.
+"""
+import re
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.patient import Patient
+from app.models.search_term import SearchTerm
+from app.services.search_index import PATIENT, prefix_range, prefix_search
+from app.services.text_search import fold
+
+_MIN_DOC = 4     # caracteres mínimos para buscar por documento parcial
+_MIN_PHONE = 6   # dígitos mínimos para buscar por teléfono
+
+_SCORE_EXACT = 100.0
+_SCORE_PHONE = 80.0
+_SCORE_PARTIAL = 50.0
+
+
+def doc_id_key(value: str | None) -> str | None:
+    return re.sub(r"[^0-9A-Z]", "", fold(value or "").upper()) or None
+
+
+def email_key(value: str | None) -> str | None:
+    return (value or "").strip().lower() or None
+
+
+def phone_key(value: str | None) -> str | None:
+    return re.sub(r"\D", "", value or "")[::-1] or None
+
+
+def lookup_keys(doc_id: str | None, email: str | None, phone: str | None) -> dict:
+    return {"doc_id_key": doc_id_key(doc_id), "email_key": email_key(email), "phone_key": phone_key(phone)}
+
+
+def apply_lookup_keys(p: Patient) -> None:
+    for k, v in lookup_keys(p.doc_id, p.email, p.phone).items():
+        setattr(p, k, v)
+
+
+async def search_patients(db: AsyncSession, q: str, limit: int, allowed: Select | None = None) -> list[Patient]:
+    """
+    Pacientes que matchean `q`, del más al menos relevante. `allowed` es un SELECT de
+    patient_id que acota el resultado (p.ej. los pacientes de las clínicas del doctor).
+    """
+    scores: dict[str, float] = {}
+
+    def _hit(patient_id: str, score: float) -> None:
+        scores[patient_id] = max(scores.get(patient_id, 0.0), score)
+
+    def _scoped(stmt, id_col):
+        return stmt.where(id_col.in_(allowed)) if allowed is not None else stmt
+
+    async def _by_key(col, key: str, partial: float) -> None:
+        res = await db.execute(_scoped(select(Patient.id, col).where(prefix_range(col, key)), Patient.id).limit(limit))
+        for patient_id, value in res.all():
+            _hit(patient_id, _SCORE_EXACT if value == key else partial)
+
+    if "@" in q:
+        await _by_key(Patient.email_key, email_key(q), _SCORE_PARTIAL)
+    else:
+        doc = doc_id_key(q)
+        if doc and len(doc) >= _MIN_DOC and any(ch.isdigit() for ch in doc):
+            await _by_key(Patient.doc_id_key, doc, _SCORE_PARTIAL)
+        phone = phone_key(q)
+        if phone and len(phone) >= _MIN_PHONE:
+            await _by_key(Patient.phone_key, phone, _SCORE_PHONE)
+
+        term_scope = [SearchTerm.entity_id.in_(allowed)] if allowed is not None else []
+        names = prefix_search(PATIENT, q, *term_scope)
+        if names is not None:
+            res = await db.execute(
+                select(names.c.entity_id, names.c.score)
+                .order_by(names.c.score.desc())
+                .limit(limit)
+            )
+            for patient_id, score in res.all():
+                _hit(patient_id, float(score))
+
+    if not scores:
+        return []
+    res = await db.execute(
+        select(Patient).options(selectinload(Patient.clinics)).where(Patient.id.in_(list(scores)))
+    )
+    return sorted(res.scalars().all(), key=lambda p: (-scores[p.id], p.name, p.id))[:limit]
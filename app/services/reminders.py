@@ -0,0 +1,215 @@
+# app/services/reminders.py
+"""
+Recordatorios de turnos con cola durable en la tabla appointment_reminders.
+
+- Las rutas de escritura de turnos llaman a schedule_reminders() dentro de su transacción.
+- Los workers (ver run_reminder_worker, arrancados en el lifespan de la app) reclaman
+  lotes con SELECT ... FOR UPDATE SKIP LOCKED + lease, y entregan por el canal del job.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Protocol
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.appointment import Appointment, ApptStatus
+from app.models.reminder import AppointmentReminder, ReminderStatus
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- canales ----------
+class ReminderChannel(Protocol):
+    name: str
+
+    async def send(self, reminder: AppointmentReminder, appt: Appointment) -> None: ...
+
+
+class LoggingChannel:
+    """Canal local de prueba: sólo deja el recordatorio en el log."""
+    name = "log"
+
+    async def send(self, reminder: AppointmentReminder, appt: Appointment) -> None:
+        logger.info(
+            "Recordatorio turno=%s paciente=%s doctor=%s inicio=%s (-%s min)",
+            appt.id, appt.patient_id, appt.doctor_id, appt.starts_at, reminder.offset_minutes,
+        )
+
+
+CHANNELS: dict[str, ReminderChannel] = {}
+
+def register_channel(channel: ReminderChannel) -> None:
+    CHANNELS[channel.name] = channel
+
+register_channel(LoggingChannel())
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def _offsets() -> list[int]:
+    return [int(v) for v in _csv(settings.REMINDER_OFFSETS_MINUTES)]
+
+
+# ---------- programación (dentro de la transacción del turno) ----------
+async def schedule_reminders(
+    db: AsyncSession,
+    appointments: list[tuple[str, datetime, str]],
+    now: datetime | None = None,
+) -> None:
+    """
+    (Re)programa los recordatorios de uno o varios turnos (id, starts_at, status):
+    cancela los pendientes con un solo UPDATE y, por cada turno que siga activo,
+    encola uno por canal y anticipación con due_at futuro. No hace commit.
+    """
+    if not appointments:
+        return
+    now = now or datetime.utcnow()
+    await db.execute(
+        update(AppointmentReminder)
+        .where(
+            AppointmentReminder.appointment_id.in_([a[0] for a in appointments]),
+            AppointmentReminder.status.in_([ReminderStatus.pending, ReminderStatus.leased]),
+        )
+        .values(status=ReminderStatus.cancelled, leased_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    channels, offsets = _csv(settings.REMINDER_CHANNELS), _offsets()
+    for appointment_id, starts_at, status in appointments:
+        if status == ApptStatus.cancelled:
+            continue
+        for channel in channels:
+            for offset in offsets:
+                due_at = starts_at - timedelta(minutes=offset)
+                if due_at > now:
+                    db.add(AppointmentReminder(
+                        appointment_id=appointment_id,
+                        channel=channel,
+                        offset_minutes=offset,
+                        due_at=due_at,
+                        status=ReminderStatus.pending,
+                    ))
+
+
+# ---------- worker ----------
+async def release_expired_leases(db: AsyncSession) -> None:
+    """Devuelve a la cola los jobs cuyo worker murió sin confirmar."""
+    await db.execute(
+        update(AppointmentReminder)
+        .where(
+            AppointmentReminder.status == ReminderStatus.leased,
+            AppointmentReminder.leased_until < datetime.utcnow(),
+        )
+        .values(status=ReminderStatus.pending, leased_until=None)
+    )
+    await db.commit()
+
+
+async def claim_batch(db: AsyncSession, limit: int) -> list[int]:
+    """
+    Reclama hasta `limit` jobs vencidos. SKIP LOCKED evita que dos workers tomen
+    el mismo job; el lease (leased_until) cubre caídas entre claim y entrega.
+    """
+    now = datetime.utcnow()
+    q = (
+        select(AppointmentReminder.id)
+        .where(AppointmentReminder.status == ReminderStatus.pending, AppointmentReminder.due_at <= now)
+        .order_by(AppointmentReminder.due_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = list((await db.execute(q)).scalars().all())
+    if ids:
+        await db.execute(
+            update(AppointmentReminder)
+            .where(AppointmentReminder.id.in_(ids))
+            .values(
+                status=ReminderStatus.leased,
+                leased_until=now + timedelta(seconds=settings.REMINDER_LEASE_SECONDS),
+                attempts=AppointmentReminder.attempts + 1,
+            )
+        )
+    await db.commit()
+    return ids
+
+
+async def _settle(db: AsyncSession, reminder: AppointmentReminder, **values) -> bool:
+    """
+    Cierra el job sólo si sigue con nuestro lease (status='leased' y el mismo leased_until):
+    si lo cancelaron (schedule_reminders) o lo reclamó otro worker mientras enviábamos,
+    no se pisa. Commit por job.
+    """
+    res = await db.execute(
+        update(AppointmentReminder)
+        .where(
+            AppointmentReminder.id == reminder.id,
+            AppointmentReminder.status == ReminderStatus.leased,
+            AppointmentReminder.leased_until == reminder.leased_until,
+        )
+        .values(leased_until=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if res.rowcount == 0:
+        logger.info("Recordatorio %s cancelado o reasignado durante la entrega", reminder.id)
+    return res.rowcount == 1
+
+
+async def deliver_batch(db: AsyncSession, ids: list[int]) -> None:
+    res = await db.execute(
+        select(AppointmentReminder, Appointment)
+        .outerjoin(Appointment, Appointment.id == AppointmentReminder.appointment_id)
+        .where(AppointmentReminder.id.in_(ids), AppointmentReminder.status == ReminderStatus.leased)
+    )
+    for reminder, appt in res.all():
+        now = datetime.utcnow()
+        if reminder.leased_until is None or reminder.leased_until <= now:
+            continue  # lease vencido: lo puede tomar otro worker
+        if appt is None or appt.status == ApptStatus.cancelled:
+            await _settle(db, reminder, status=ReminderStatus.cancelled)
+            continue
+        # el lote se leyó al principio: un cancel commiteado mientras enviábamos los anteriores
+        still_ours = await db.scalar(
+            select(AppointmentReminder.id).where(
+                AppointmentReminder.id == reminder.id,
+                AppointmentReminder.status == ReminderStatus.leased,
+                AppointmentReminder.leased_until == reminder.leased_until,
+            )
+        )
+        if still_ours is None:
+            continue
+        channel = CHANNELS.get(reminder.channel)
+        try:
+            if channel is None:
+                raise RuntimeError(f"Canal de recordatorio desconocido: {reminder.channel}")
+            await channel.send(reminder, appt)
+        except Exception as exc:  # el job se reintenta con backoff hasta REMINDER_MAX_ATTEMPTS
+            logger.warning("Falló recordatorio %s: %s", reminder.id, exc)
+            retry = {"status": ReminderStatus.failed}
+            if reminder.attempts < settings.REMINDER_MAX_ATTEMPTS:
+                retry = {"status": ReminderStatus.pending, "due_at": now + timedelta(minutes=2 ** reminder.attempts)}
+            await _settle(db, reminder, last_error=str(exc)[:255], **retry)
+        else:
+            await _settle(db, reminder, status=ReminderStatus.sent, sent_at=now)
+
+
+async def run_reminder_worker(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        ids: list[int] = []
+        try:
+            async with SessionLocal() as db:
+                await release_expired_leases(db)
+                ids = await claim_batch(db, settings.REMINDER_BATCH_SIZE)
+                if ids:
+                    await deliver_batch(db, ids)
+        except Exception:
+            logger.exception("Error en el worker de recordatorios")
+        if not ids:
+            try:
+                await asyncio.wait_for(stop.wait(), settings.REMINDER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
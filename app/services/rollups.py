@@ -0,0 +1,154 @@
+# app/services/rollups.py
+"""
+Rollups diarios de turnos (appointment_daily_rollups) para la analítica de ocupación.
+
+- Las escrituras de turnos llaman a apply_rollup_deltas() dentro de su transacción: cada
+  cambio resta el aporte del turno anterior y suma el del nuevo, con un upsert acumulativo.
+- reconcile_rollups() recalcula un rango de días desde appointments (un GROUP BY) y pisa
+  lo que haya; corre de noche (run_rollup_reconciler) y a pedido desde /analytics. Antes
+  bloquea los turnos de la ventana (FOR UPDATE): una reserva concurrente espera y suma su
+  delta sobre el recálculo, o ya commiteó y entra en el GROUP BY. El job nocturno corre
+  en un solo proceso (lock con nombre); los demás lo saltean.
+- Un turno cuenta en el día en que empieza.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import SessionLocal, date_bucket, dialect_name, minutes_between, named_lock, upsert
+from app.models.appointment import Appointment, ApptStatus, ApptType
+from app.models.rollup import AppointmentDailyRollup
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("total", "cancelled", "booked_minutes", "virtual_count", "presencial_count")
+_KEYS = ("day", "doctor_id", "clinic_id")
+_CHUNK = 500
+
+
+def _contribution(snap: dict) -> tuple[tuple, Counter]:
+    key = (snap["starts_at"].date(), snap["doctor_id"], snap["clinic_id"])
+    active = snap["status"] != ApptStatus.cancelled
+    minutes = int((snap["ends_at"] - snap["starts_at"]).total_seconds() // 60)
+    return key, Counter({
+        "total": 1,
+        "cancelled": 0 if active else 1,
+        "booked_minutes": minutes if active else 0,
+        "virtual_count": int(active and snap["type"] == ApptType.virtual),
+        "presencial_count": int(active and snap["type"] == ApptType.presencial),
+    })
+
+
+async def apply_rollup_deltas(db: AsyncSession, changes: list[tuple[dict | None, dict | None]]) -> None:
+    """Suma al rollup los deltas de un lote de cambios (before, after). No hace commit."""
+    deltas: dict[tuple, Counter] = {}
+    for before, after in changes:
+        for snap, sign in ((before, -1), (after, 1)):
+            if not snap:
+                continue
+            key, contrib = _contribution(snap)
+            acc = deltas.setdefault(key, Counter())
+            for metric in METRICS:
+                acc[metric] += sign * contrib[metric]
+
+    now = datetime.utcnow()
+    rows = [
+        {"day": k[0], "doctor_id": k[1], "clinic_id": k[2], **{m: d[m] for m in METRICS}, "updated_at": now}
+        for k, d in deltas.items()
+        if any(d[m] for m in METRICS)
+    ]
+    if not rows:
+        return
+    t = AppointmentDailyRollup.__table__
+    await db.execute(upsert(
+        dialect_name(db), AppointmentDailyRollup, rows, _KEYS,
+        update=lambda new: {**{m: t.c[m] + new[m] for m in METRICS}, "updated_at": new["updated_at"]},
+    ))
+
+
+async def reconcile_rollups(db: AsyncSession, date_from: date, date_to: date) -> int:
+    """
+    Recalcula los rollups de [date_from, date_to) desde appointments y reemplaza los
+    existentes en la misma transacción. Devuelve la cantidad de filas escritas. No hace commit.
+    """
+    dialect = dialect_name(db)
+    window = (
+        Appointment.starts_at >= datetime.combine(date_from, datetime.min.time()),
+        Appointment.starts_at < datetime.combine(date_to, datetime.min.time()),
+    )
+    # bloquea el rango de turnos (y sus huecos, por ix starts_at) hasta el commit: las
+    # reservas que tocan la ventana no pueden aplicar su delta entre el GROUP BY y el reemplazo
+    (await db.execute(select(Appointment.id).where(*window).with_for_update())).all()
+
+    day = date_bucket(dialect, Appointment.starts_at, "day").label("day")
+    active = Appointment.status != ApptStatus.cancelled
+    q = (
+        select(
+            day,
+            Appointment.doctor_id,
+            Appointment.clinic_id,
+            func.count().label("total"),
+            func.sum(case((active, 0), else_=1)).label("cancelled"),
+            func.sum(case((active, minutes_between(dialect, Appointment.starts_at, Appointment.ends_at)), else_=0))
+            .label("booked_minutes"),
+            func.sum(case((active & (Appointment.type == ApptType.virtual), 1), else_=0)).label("virtual_count"),
+            func.sum(case((active & (Appointment.type == ApptType.presencial), 1), else_=0)).label("presencial_count"),
+        )
+        .where(*window)
+        .group_by(day, Appointment.doctor_id, Appointment.clinic_id)
+    )
+    now = datetime.utcnow()
+    rows = []
+    for r in (await db.execute(q)).all():
+        row = dict(r._mapping)
+        row["day"] = date.fromisoformat(row["day"])
+        row.update({m: int(row[m] or 0) for m in METRICS}, updated_at=now)
+        rows.append(row)
+
+    await db.execute(
+        delete(AppointmentDailyRollup)
+        .where(AppointmentDailyRollup.day >= date_from, AppointmentDailyRollup.day < date_to)
+        .execution_options(synchronize_session=False)
+    )
+    for i in range(0, len(rows), _CHUNK):
+        await db.execute(AppointmentDailyRollup.__table__.insert(), rows[i:i + _CHUNK])
+    return len(rows)
+
+
+def _seconds_until_hour(now: datetime, hour: int) -> float:
+    nxt = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if nxt <= now:
+        nxt += timedelta(days=1)
+    return (nxt - now).total_seconds()
+
+
+async def run_rollup_reconciler(stop: asyncio.Event) -> None:
+    """Reconcilia todas las noches la ventana [hoy - PAST_DAYS, hoy + FUTURE_DAYS)."""
+    while not stop.is_set():
+        wait = _seconds_until_hour(datetime.utcnow(), settings.ANALYTICS_RECONCILE_HOUR)
+        try:
+            await asyncio.wait_for(stop.wait(), wait)
+            return
+        except asyncio.TimeoutError:
+            pass
+        today = datetime.utcnow().date()
+        try:
+            async with named_lock("appointment_rollup_reconcile") as got:
+                if not got:
+                    logger.info("Reconciliación de rollups en curso en otro proceso; se saltea")
+                    continue
+                async with SessionLocal() as db:
+                    n = await reconcile_rollups(
+                        db,
+                        today - timedelta(days=settings.ANALYTICS_RECONCILE_PAST_DAYS),
+                        today + timedelta(days=settings.ANALYTICS_RECONCILE_FUTURE_DAYS),
+                    )
+                    await db.commit()
+            logger.info("Rollups de turnos reconciliados (%s filas)", n)
+        except Exception:
+            logger.exception("Error reconciliando appointment_daily_rollups")
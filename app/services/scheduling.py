@@ -0,0 +1,174 @@
+# app/services/scheduling.py
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import Select, and_, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.appointment import Appointment, ApptStatus
+
+
+def busy_overlap_q(
+    person_col,
+    person_id: str,
+    starts_at: datetime,
+    ends_at: datetime,
+    exclude_id: str | None = None,
+) -> Select:
+    """
+    Turnos activos de una persona (doctor o paciente, en cualquier clínica)
+    que se solapan con [starts_at, ends_at). Usa ix_appt_doctor_busy / ix_appt_patient_busy.
+    """
+    q = select(Appointment.id).where(
+        person_col == person_id,
+        Appointment.starts_at < ends_at,    # empieza antes de que termine el nuevo
+        Appointment.ends_at   > starts_at,  # termina después de que empieza el nuevo
+        Appointment.status != ApptStatus.cancelled,
+    )
+    if exclude_id:
+        q = q.where(Appointment.id != exclude_id)
+    return q
+
+
+async def busy_facts(
+    db: AsyncSession,
+    doctor_id: str,
+    patient_id: str,
+    starts_at: datetime,
+    ends_at: datetime,
+    exclude_id: str | None = None,
+):
+    """Un solo SELECT con dos EXISTS: (doctor_busy, patient_busy)."""
+    q = select(
+        busy_overlap_q(Appointment.doctor_id, doctor_id, starts_at, ends_at, exclude_id)
+        .exists().label("doctor_busy"),
+        busy_overlap_q(Appointment.patient_id, patient_id, starts_at, ends_at, exclude_id)
+        .exists().label("patient_busy"),
+    )
+    return (await db.execute(q)).one()
+
+
+def _conflict_pairs_q(kind: str, col: str, date_from: datetime, date_to: datetime, clinic_id: str | None):
+    a = aliased(Appointment)
+    b = aliased(Appointment)
+    q = (
+        select(
+            literal(kind).label("kind"),
+            getattr(a, col).label("person_id"),
+            a.id.label("appointment_id"),
+            a.clinic_id.label("clinic_id"),
+            a.starts_at.label("starts_at"),
+            a.ends_at.label("ends_at"),
+            b.id.label("conflicting_id"),
+            b.clinic_id.label("conflicting_clinic_id"),
+            b.starts_at.label("conflicting_starts_at"),
+            b.ends_at.label("conflicting_ends_at"),
+        )
+        .join(
+            b,
+            and_(
+                getattr(b, col) == getattr(a, col),
+                b.id != a.id,
+                # cada par se reporta una sola vez, desde el turno que empieza primero
+                or_(b.starts_at > a.starts_at, and_(b.starts_at == a.starts_at, b.id > a.id)),
+                b.starts_at < a.ends_at,
+                b.status != ApptStatus.cancelled,
+            ),
+        )
+        .where(
+            a.status != ApptStatus.cancelled,
+            a.starts_at >= date_from,
+            a.starts_at < date_to,
+        )
+    )
+    if clinic_id:
+        q = q.where(or_(a.clinic_id == clinic_id, b.clinic_id == clinic_id))
+    return q
+
+
+async def conflict_report(
+    db: AsyncSession,
+    date_from: datetime,
+    date_to: datetime,
+    clinic_id: str | None = None,
+    limit: int = 500,
+) -> list[dict]:
+    """
+    Pares de turnos activos que se pisan para el mismo doctor o el mismo paciente,
+    en cualquier clínica. Un par se incluye si el turno que empieza primero cae en el rango.
+    """
+    u = union_all(
+        _conflict_pairs_q("doctor", "doctor_id", date_from, date_to, clinic_id),
+        _conflict_pairs_q("patient", "patient_id", date_from, date_to, clinic_id),
+    ).subquery()
+    q = select(u).order_by(u.c.starts_at, u.c.kind, u.c.appointment_id).limit(limit)
+    res = await db.execute(q)
+    return [dict(r._mapping) for r in res.all()]
+
+
+async def bulk_move_conflicts(db: AsyncSession, moves: list[dict]) -> list[dict]:
+    """
+    Revalida en bloque un lote de turnos movidos (dicts con id, doctor_id, patient_id,
+    clinic_id, starts_at, ends_at ya con los valores nuevos). Una query por tipo de persona
+    trae la agenda activa en la ventana del lote; el barrido se hace en memoria y también
+    compara los turnos movidos entre sí. Devuelve filas con la forma de conflict_report.
+    """
+    if not moves:
+        return []
+    moved_ids = {m["id"] for m in moves}
+    lo = min(m["starts_at"] for m in moves)
+    hi = max(m["ends_at"] for m in moves)
+
+    conflicts: list[dict] = []
+    for kind, col in (("doctor", "doctor_id"), ("patient", "patient_id")):
+        person_col = getattr(Appointment, col)
+        res = await db.execute(
+            select(
+                Appointment.id,
+                person_col.label("person_id"),
+                Appointment.clinic_id,
+                Appointment.starts_at,
+                Appointment.ends_at,
+            ).where(
+                person_col.in_({m[col] for m in moves}),
+                Appointment.starts_at < hi,
+                Appointment.ends_at > lo,
+                Appointment.status != ApptStatus.cancelled,
+                Appointment.id.not_in(moved_ids),
+            )
+        )
+        agenda: dict[str, list[dict]] = defaultdict(list)
+        for r in res.all():
+            agenda[r.person_id].append(dict(r._mapping))
+        for m in moves:
+            agenda[m[col]].append({
+                "id": m["id"], "person_id": m[col], "clinic_id": m["clinic_id"],
+                "starts_at": m["starts_at"], "ends_at": m["ends_at"],
+            })
+
+        for person_id, items in agenda.items():
+            items.sort(key=lambda it: (it["starts_at"], it["id"]))
+            active: list[dict] = []
+            for it in items:
+                active = [a for a in active if a["ends_at"] > it["starts_at"]]
+                for a in active:
+                    # los solapamientos previos entre turnos no movidos no son de este lote
+                    if a["id"] not in moved_ids and it["id"] not in moved_ids:
+                        continue
+                    # se reporta desde el turno movido
+                    m, o = (a, it) if a["id"] in moved_ids else (it, a)
+                    conflicts.append({
+                        "kind": kind,
+                        "person_id": person_id,
+                        "appointment_id": m["id"],
+                        "clinic_id": m["clinic_id"],
+                        "starts_at": m["starts_at"],
+                        "ends_at": m["ends_at"],
+                        "conflicting_id": o["id"],
+                        "conflicting_clinic_id": o["clinic_id"],
+                        "conflicting_starts_at": o["starts_at"],
+                        "conflicting_ends_at": o["ends_at"],
+                    })
+                active.append(it)
+    return conflicts
@@ -0,0 +1,128 @@
+# app/services/search_index.py
+"""
+Índice de búsqueda por prefijo en la tabla search_terms (directorio de doctores y
+nombres de pacientes).
+
+- Cada entidad guarda sus palabras normalizadas (text_search.tokenize: minúsculas, sin
+  acentos, sin stopwords) con el campo del que salen. Un doctor indexa su nombre, su
+  especialidad y el nombre de sus clínicas; un paciente, su nombre.
+- Cada palabra de la consulta matchea por prefijo con un rango sobre el PK
+  (term >= 'card' AND term < 'care'): usa el índice en MySQL y en SQLite, a diferencia
+  de ILIKE '%q%'. Tienen que matchear todas las palabras.
+- Ranking: suma de pesos por campo (nombre > especialidad > clínica) y +1 por palabra
+  completa.
+- Se mantiene desde las rutas de escritura (alta/edición/baja de doctores y pacientes,
+  asignación a clínicas, renombre de clínicas). Ninguna función hace commit.
+"""
+from sqlalchemy import and_, case, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.clinic import Clinic
+from app.models.doctor import Doctor
+from app.models.links import ClinicDoctor
+from app.models.patient import Patient
+from app.models.search_term import SearchTerm
+from app.services.text_search import tokenize
+
+DOCTOR = "doctor"
+PATIENT = "patient"
+TERM_MAX = 64
+_WEIGHTS = {"name": 3, "specialty": 2, "clinic": 1}
+
+
+def entity_terms(entity_type: str, entity_id: str, fields: dict[str, list[str | None]]) -> list[dict]:
+    """Filas de search_terms para una entidad: {campo: [textos]} -> términos únicos por campo."""
+    rows = set()
+    for field_name, texts in fields.items():
+        for text in texts:
+            for t in tokenize(text or ""):
+                rows.add((t[:TERM_MAX], field_name))
+    return [
+        {"entity_type": entity_type, "entity_id": entity_id, "term": t, "field": f}
+        for t, f in sorted(rows)
+    ]
+
+
+async def remove_entity_terms(db: AsyncSession, entity_type: str, ids: list[str]) -> None:
+    if ids:
+        await db.execute(
+            delete(SearchTerm).where(SearchTerm.entity_type == entity_type, SearchTerm.entity_id.in_(ids))
+        )
+
+
+async def index_doctors(db: AsyncSession, doctor_ids: list[str]) -> None:
+    """Reindexa los doctores dados (los que ya no existen quedan sin términos)."""
+    doctor_ids = list(set(doctor_ids))
+    if not doctor_ids:
+        return
+    await db.flush()
+    res = await db.execute(select(Doctor.id, Doctor.name, Doctor.specialty).where(Doctor.id.in_(doctor_ids)))
+    docs = res.all()
+    res = await db.execute(
+        select(ClinicDoctor.doctor_id, Clinic.name)
+        .join(Clinic, Clinic.id == ClinicDoctor.clinic_id)
+        .where(ClinicDoctor.doctor_id.in_(doctor_ids))
+    )
+    clinics: dict[str, list[str]] = {}
+    for doctor_id, clinic_name in res.all():
+        clinics.setdefault(doctor_id, []).append(clinic_name)
+
+    rows = []
+    for d in docs:
+        rows += entity_terms(DOCTOR, d.id, {
+            "name": [d.name], "specialty": [d.specialty], "clinic": clinics.get(d.id, []),
+        })
+    await remove_entity_terms(db, DOCTOR, doctor_ids)
+    if rows:
+        await db.execute(SearchTerm.__table__.insert(), rows)
+
+
+async def index_clinic_doctors(db: AsyncSession, clinic_id: str) -> None:
+    """Reindexa los doctores de una clínica (p.ej. tras renombrarla)."""
+    res = await db.execute(select(ClinicDoctor.doctor_id).where(ClinicDoctor.clinic_id == clinic_id))
+    await index_doctors(db, list(res.scalars().all()))
+
+
+async def index_patients(db: AsyncSession, patient_ids: list[str]) -> None:
+    """Reindexa el nombre de los pacientes dados."""
+    patient_ids = list(set(patient_ids))
+    if not patient_ids:
+        return
+    await db.flush()
+    res = await db.execute(select(Patient.id, Patient.name).where(Patient.id.in_(patient_ids)))
+    rows = []
+    for p in res.all():
+        rows += entity_terms(PATIENT, p.id, {"name": [p.name]})
+    await remove_entity_terms(db, PATIENT, patient_ids)
+    if rows:
+        await db.execute(SearchTerm.__table__.insert(), rows)
+
+
+def prefix_range(col, prefix: str):
+    """
+    col empieza con `prefix`, como rango (col >= 'abc' AND col < 'abd') para usar el índice.
+    La columna tiene que ordenar por código (collation utf8mb4_bin en MySQL).
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(col >= prefix, col < upper)
+
+
+def prefix_search(entity_type: str, q: str, *where):
+    """
+    Subconsulta (entity_id, score) de las entidades cuyos términos matchean todas las
+    palabras de `q` por prefijo, o None si `q` no tiene palabras buscables.
+    `where` agrega condiciones sobre SearchTerm (p.ej. entity_id IN (...)).
+    """
+    tokens = list(dict.fromkeys(tokenize(q)))
+    if not tokens:
+        return None
+    matches = [prefix_range(SearchTerm.term, t[:TERM_MAX]) for t in tokens]
+    weight = case(*((SearchTerm.field == f, w) for f, w in _WEIGHTS.items()), else_=1)
+    exact = case((SearchTerm.term.in_([t[:TERM_MAX] for t in tokens]), 1), else_=0)
+    return (
+        select(SearchTerm.entity_id, func.sum(weight + exact).label("score"))
+        .where(SearchTerm.entity_type == entity_type, or_(*matches), *where)
+        .group_by(SearchTerm.entity_id)
+        .having(and_(*(func.max(case((m, 1), else_=0)) == 1 for m in matches)))
+        .subquery()
+    )
@@ -0,0 +1,160 @@
+# app/services/text_search.py
+"""
+Utilidades de búsqueda de texto en español: normalización sin acentos, tokens,
+resaltado de coincidencias e índice invertido en memoria con ranking BM25.
+"""
+import bisect
+import html
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+
+STOPWORDS = frozenset("""
+a al algo como con de del e el en entre es esta este la las lo los mas me mi no o para
+pero por que se sin su sus un una uno unos unas y ya
+""".split())
+
+_WORD = re.compile(r"\w+")
+
+
+def _fold_char(ch: str) -> str:
+    base = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c)).lower()
+    return base if len(base) == 1 else ch
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin acentos, conservando la longitud (las posiciones siguen valiendo)."""
+    return "".join(_fold_char(ch) for ch in text or "")
+
+
+def tokenize(text: str, keep_stopwords: bool = False) -> list[str]:
+    """Palabras normalizadas (sin acentos, minúsculas) de 2+ caracteres, sin stopwords."""
+    return [
+        w for w in _WORD.findall(fold(text))
+        if len(w) > 1 and (keep_stopwords or w not in STOPWORDS)
+    ]
+
+
+def highlight(text: str | None, terms: list[str], width: int = 160) -> str | None:
+    """
+    Fragmento de `text` alrededor de la primera coincidencia, con las palabras que empiezan
+    por alguno de `terms` envueltas en <mark>. El resto del texto se escapa como HTML.
+    Devuelve None si no hay coincidencias.
+    """
+    if not text or not terms:
+        return None
+    folded = fold(text)
+    spans = [
+        (m.start(), m.end()) for m in _WORD.finditer(folded)
+        if any(m.group().startswith(t) for t in terms)
+    ]
+    if not spans:
+        return None
+    start = max(spans[0][0] - width // 4, 0)
+    if start:
+        start = text.rfind(" ", 0, start) + 1   # no cortar una palabra al medio
+    end = min(start + width, len(text))
+    out, pos = [], start
+    for s, e in spans:
+        if s < start or e > end:
+            continue
+        out.append(html.escape(text[pos:s]))
+        out.append(f"<mark>{html.escape(text[s:e])}</mark>")
+        pos = e
+    out.append(html.escape(text[pos:end]))
+    return ("…" if start > 0 else "") + "".join(out) + ("…" if end < len(text) else "")
+
+
+@dataclass
+class _Doc:
+    length: int
+    terms: tuple[str, ...]
+    meta: dict
+
+
+@dataclass
+class InvertedIndex:
+    """
+    Índice invertido en memoria (por proceso): término -> {doc_id: frecuencia}.
+    Se mantiene incrementalmente con add()/remove(); los términos de la consulta
+    matchean por prefijo ("amoxi" encuentra "amoxicilina").
+    """
+    k1: float = 1.2
+    b: float = 0.75
+    ready: bool = False
+    _postings: dict[str, dict[str, int]] = field(default_factory=dict)
+    _docs: dict[str, _Doc] = field(default_factory=dict)
+    _vocab: list[str] = field(default_factory=list)
+    _vocab_dirty: bool = False
+    _total_len: int = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: str, tokens: list[str], **meta) -> None:
+        """Indexa (o reindexa) un documento con sus tokens y metadatos para filtrar."""
+        self.remove(doc_id)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                self._vocab_dirty = True
+            posting[doc_id] = tf
+        self._docs[doc_id] = _Doc(len(tokens), tuple(counts), meta)
+        self._total_len += len(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total_len -= doc.length
+        for term in doc.terms:
+            posting = self._postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[term]
+                self._vocab_dirty = True
+
+    def expand(self, prefix: str, max_terms: int = 50) -> list[str]:
+        """Términos del vocabulario que empiezan con `prefix` (búsqueda binaria)."""
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        i = bisect.bisect_left(self._vocab, prefix)
+        out = []
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix) and len(out) < max_terms:
+            out.append(self._vocab[i])
+            i += 1
+        return out
+
+    def search(self, terms: list[str], limit: int, **filters) -> list[tuple[str, float]]:
+        """
+        (doc_id, score) de los documentos que contienen todos los términos (por prefijo),
+        ordenados por BM25. `filters` compara contra los metadatos (igualdad).
+        """
+        n = len(self._docs)
+        if not n or not terms:
+            return []
+        avg_len = self._total_len / n or 1
+        scores: dict[str, float] | None = None
+        for term in terms:
+            term_scores: dict[str, float] = {}
+            for t in self.expand(term):
+                posting = self._postings[t]
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    doc = self._docs[doc_id]
+                    if any(doc.meta.get(k) != v for k, v in filters.items()):
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * doc.length / avg_len)
+                    term_scores[doc_id] = term_scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+            if not scores:
+                return []
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:limit]
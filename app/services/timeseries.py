@@ -0,0 +1,37 @@
+# app/services/timeseries.py
+"""Reducción de series para gráficos."""
+
+
+def lttb(points: list[tuple], threshold: int) -> list[tuple]:
+    """
+    Largest-Triangle-Three-Buckets: reduce a `threshold` puntos conservando la forma.
+    Los puntos son tuplas (x, y, *extra) ordenadas por x; x e y numéricos, extra se conserva.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # promedio del balde siguiente (tercer vértice del triángulo)
+        nxt_start = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        span = points[nxt_start:nxt_end] or [points[-1]]
+        avg_x = sum(p[0] for p in span) / len(span)
+        avg_y = sum(p[1] for p in span) / len(span)
+
+        # punto del balde actual que forma el triángulo de mayor área con a y el promedio
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = points[a][0], points[a][1]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
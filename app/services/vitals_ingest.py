@@ -0,0 +1,125 @@
+# app/services/vitals_ingest.py
+"""
+Ingesta masiva de signos vitales (gateways de dispositivos de monitoreo domiciliario).
+
+- ingest_vitals() procesa lecturas ya validadas por lotes de VITALS_INGEST_CHUNK: un único
+  SELECT ... IN por lote para los pacientes y un INSERT executemany. Las lecturas de
+  pacientes inexistentes se informan por fila y no frenan al resto. Cada lote se
+  clasifica contra los rangos de referencia con un UPDATE (ver vitals_ranges) y
+  actualiza patient_latest_vitals (ver latest_vitals).
+- Modo diferido: enqueue_vitals() deja las lecturas en un buffer en memoria y
+  run_vitals_flusher() (arrancado en el lifespan) las vuelca cada VITALS_BUFFER_FLUSH_MS.
+  El buffer no es durable: lo pendiente se vuelca al apagar, no ante una caída.
+"""
+import asyncio
+import itertools
+import logging
+import uuid
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.labs_vitals import Vital
+from app.models.patient import Patient
+from app.services.vitals_parse import parse_vital
+from app.services.vitals_ranges import classify_vitals
+from app.services.latest_vitals import bump_latest_vitals
+
+logger = logging.getLogger(__name__)
+
+
+def _row(reading: dict, now: datetime) -> dict:
+    p = parse_vital(reading["metric"], reading["value"])
+    return {
+        "id": str(uuid.uuid4()),
+        "patient_id": reading["patient_id"],
+        "metric": reading["metric"],
+        "value": reading["value"],
+        "date": reading.get("date") or now,
+        "status": reading.get("status"),
+        "metric_code": p.metric_code,
+        "num_value": p.num_value,
+        "num_value2": p.num_value2,
+        "unit": p.unit,
+    }
+
+
+async def ingest_vitals(db: AsyncSession, readings: list[tuple[int, dict]]) -> tuple[int, list[dict]]:
+    """
+    Inserta lecturas (índice, campos de VitalCreate). Devuelve (insertadas, errores por fila)
+    con errores {"index", "detail"}. No hace commit.
+    """
+    inserted, errors = 0, []
+    now = datetime.utcnow()
+    chunk = settings.VITALS_INGEST_CHUNK
+    for i in range(0, len(readings), chunk):
+        part = readings[i:i + chunk]
+        ids = {r["patient_id"] for _, r in part}
+        res = await db.execute(select(Patient.id).where(Patient.id.in_(ids)))
+        known = set(res.scalars().all())
+
+        rows = []
+        for index, reading in part:
+            if reading["patient_id"] in known:
+                rows.append(_row(reading, now))
+            else:
+                errors.append({"index": index, "detail": "Paciente no encontrado"})
+        if rows:
+            await db.execute(Vital.__table__.insert(), rows)
+            ids = [r["id"] for r in rows]
+            await classify_vitals(db, Vital.id.in_(ids))
+            res = await db.execute(select(Vital).where(Vital.id.in_(ids), Vital.metric_code.is_not(None)))
+            await bump_latest_vitals(db, list(res.scalars().all()))
+            inserted += len(rows)
+    return inserted, errors
+
+
+# ---------- modo diferido ----------
+_buffer: deque[dict] = deque()
+_flush_lock = asyncio.Lock()
+
+
+def buffer_free() -> int:
+    return max(settings.VITALS_BUFFER_MAX - len(_buffer), 0)
+
+
+def enqueue_vitals(readings: list[dict]) -> None:
+    """Encola lecturas validadas; quien llama verifica el espacio con buffer_free()."""
+    _buffer.extend(readings)
+
+
+async def flush_vitals_buffer() -> int:
+    """
+    Vuelca lo acumulado (lo que haya al momento de llamar) y devuelve lo insertado.
+    Las lecturas salen del buffer recién después del commit: si la base falla quedan
+    para el próximo intento (y siguen ocupando lugar, así el 503 frena a los clientes).
+    """
+    async with _flush_lock:
+        n = len(_buffer)
+        if not n:
+            return 0
+        batch = list(enumerate(itertools.islice(_buffer, n)))
+        async with SessionLocal() as db:
+            inserted, errors = await ingest_vitals(db, batch)
+            await db.commit()
+        for _ in range(n):
+            _buffer.popleft()
+    if errors:
+        logger.warning("Ingesta diferida de vitales: %s lecturas descartadas (paciente inexistente)", len(errors))
+    return inserted
+
+
+async def run_vitals_flusher(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), settings.VITALS_BUFFER_FLUSH_MS / 1000)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await flush_vitals_buffer()
+        except Exception:
+            logger.exception("Error volcando el buffer de ingesta de vitales")
@@ -0,0 +1,113 @@
+# app/services/vitals_parse.py
+"""
+Representación numérica de los signos vitales cargados como texto libre.
+
+parse_vital("TA", "120/80 mmHg") -> ParsedVital("bp", 120.0, 80.0, "mmHg")
+
+- metric_code: código estable a partir de los alias en español/inglés de METRICS.
+- num_value / num_value2: valor (y segundo valor, p.ej. diastólica) en la unidad canónica.
+- Si algo no se reconoce, los campos quedan en None y el texto original sigue intacto.
+"""
+import re
+from dataclasses import dataclass
+
+from app.services.text_search import fold
+
+
+@dataclass(frozen=True)
+class MetricDef:
+    code: str
+    unit: str                                    # unidad canónica
+    aliases: tuple[str, ...]
+    conversions: dict[str, tuple[float, float]]  # unidad -> (factor, offset) hacia la canónica
+    pair: bool = False                           # "a/b" (presión arterial)
+
+
+_F_TO_C = (5 / 9, -160 / 9)
+
+METRICS: tuple[MetricDef, ...] = (
+    MetricDef("bp", "mmHg", ("ta", "pa", "presion arterial", "tension arterial", "presion", "bp", "blood pressure"),
+              {"mmhg": (1, 0), "kpa": (7.50062, 0), "cmhg": (10, 0)}, pair=True),
+    MetricDef("hr", "bpm", ("fc", "frecuencia cardiaca", "pulso", "hr", "heart rate"),
+              {"bpm": (1, 0), "lpm": (1, 0), "/min": (1, 0), "x'": (1, 0)}),
+    MetricDef("rr", "rpm", ("fr", "frecuencia respiratoria", "rr", "respiratory rate"),
+              {"rpm": (1, 0), "/min": (1, 0), "x'": (1, 0)}),
+    MetricDef("temp", "°C", ("t", "temp", "temperatura", "temperature"),
+              {"°c": (1, 0), "ºc": (1, 0), "c": (1, 0), "°f": _F_TO_C, "ºf": _F_TO_C, "f": _F_TO_C}),
+    MetricDef("spo2", "%", ("spo2", "sato2", "sat", "saturacion", "saturacion de oxigeno", "oximetria"),
+              {"%": (1, 0)}),
+    MetricDef("weight", "kg", ("peso", "weight"),
+              {"kg": (1, 0), "kgs": (1, 0), "g": (0.001, 0), "lb": (0.453592, 0), "lbs": (0.453592, 0)}),
+    MetricDef("height", "cm", ("talla", "altura", "estatura", "height"),
+              {"cm": (1, 0), "m": (100, 0), "mts": (100, 0), "in": (2.54, 0)}),
+    MetricDef("bmi", "kg/m2", ("imc", "bmi", "indice de masa corporal"),
+              {"kg/m2": (1, 0), "kg/m²": (1, 0)}),
+    MetricDef("glucose", "mg/dL", ("glucemia", "glucosa", "glucose", "hgt"),
+              {"mg/dl": (1, 0), "mmol/l": (18.016, 0)}),
+)
+
+_BY_ALIAS = {alias: m for m in METRICS for alias in m.aliases}
+_BY_CODE = {m.code: m for m in METRICS}
+
+_NUM = r"[-+]?\d+(?:[.,]\d+)?"
+_PAIR_RE = re.compile(rf"^\s*({_NUM})\s*/\s*({_NUM})\s*(.*)$")
+_SINGLE_RE = re.compile(rf"^\s*({_NUM})\s*(.*)$")
+
+
+@dataclass(frozen=True)
+class ParsedVital:
+    metric_code: str | None = None
+    num_value: float | None = None
+    num_value2: float | None = None
+    unit: str | None = None
+
+
+def metric_code_for(metric: str) -> str | None:
+    """Código de métrica a partir de un alias o de un código ("TA", "bp", "Presión arterial")."""
+    key = " ".join(fold(metric).replace(".", " ").split())
+    m = _BY_ALIAS.get(key) or _BY_CODE.get(key)
+    return m.code if m else None
+
+
+def metric_unit(code: str) -> str | None:
+    m = _BY_CODE.get(code)
+    return m.unit if m else None
+
+
+def _num(s: str) -> float:
+    return float(s.replace(",", "."))
+
+
+def _convert(m: MetricDef, unit_text: str, *values: float) -> tuple[float, ...] | None:
+    unit = unit_text.strip().lower().replace(" ", "")
+    if not unit:
+        factor, offset = 1, 0
+    elif unit in m.conversions:
+        factor, offset = m.conversions[unit]
+    else:
+        return None
+    return tuple(round(v * factor + offset, 3) for v in values)
+
+
+def parse_vital(metric: str, value: str) -> ParsedVital:
+    m = _BY_CODE.get(metric_code_for(metric) or "")
+    if not m:
+        return ParsedVital()
+    text = (value or "").strip()
+
+    if m.pair:
+        match = _PAIR_RE.match(text)
+        if not match:
+            return ParsedVital(m.code)
+        converted = _convert(m, match.group(3), _num(match.group(1)), _num(match.group(2)))
+        if not converted:
+            return ParsedVital(m.code)
+        return ParsedVital(m.code, converted[0], converted[1], m.unit)
+
+    match = _SINGLE_RE.match(text)
+    if not match:
+        return ParsedVital(m.code)
+    converted = _convert(m, match.group(2), _num(match.group(1)))
+    if not converted:
+        return ParsedVital(m.code)
+    return ParsedVital(m.code, converted[0], None, m.unit)
@@ -0,0 +1,132 @@
+# app/services/vitals_ranges.py
+"""
+Clasificación de signos vitales (Normal/Alto/Bajo) contra rangos de referencia por
+métrica, franja etaria y sexo.
+
+- La clasificación es un único UPDATE ... SET status = CASE ... sobre el conjunto de
+  filas (nunca un loop por fila), unido a patients (UPDATE ... JOIN en MySQL, UPDATE ...
+  FROM en SQLite): la edad es la de birth_date a la fecha de la lectura.
+- Si ningún rango aplica (métrica sin rango, valor no numérico) se conserva el status
+  que mandó el cliente.
+- Los rangos se pueden reemplazar con VITALS_REFERENCE_RANGES (JSON, mismos campos que
+  RefRange). Sin fecha de nacimiento se asume VITALS_DEFAULT_AGE; sin sexo sólo aplican
+  los rangos sin sexo.
+- Backfill de toda la tabla por lotes: python -m app.services.vitals_ranges [--chunk N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+
+from sqlalchemy import and_, case, func, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import SessionLocal, dialect_name, years_between
+from app.models.labs_vitals import Vital, VitalStatus
+from app.models.patient import Patient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RefRange:
+    metric_code: str
+    low: float
+    high: float
+    low2: float | None = None      # segundo valor (diastólica en "bp")
+    high2: float | None = None
+    sex: str | None = None         # male / female; None = ambos
+    age_min: int = 0               # años, inclusive
+    age_max: int | None = None     # años, exclusive; None = sin tope
+
+
+DEFAULT_RANGES: tuple[RefRange, ...] = (
+    RefRange("bp", 90, 139, 60, 89, age_min=18),
+    RefRange("bp", 80, 119, 50, 79, age_max=18),
+    RefRange("hr", 60, 100, age_min=12),
+    RefRange("hr", 70, 120, age_min=1, age_max=12),
+    RefRange("hr", 100, 160, age_max=1),
+    RefRange("rr", 12, 20, age_min=12),
+    RefRange("rr", 18, 30, age_min=1, age_max=12),
+    RefRange("rr", 30, 60, age_max=1),
+    RefRange("temp", 36.0, 37.5),
+    RefRange("spo2", 95, 100),
+    RefRange("bmi", 18.5, 24.9, age_min=18),
+    RefRange("glucose", 70, 140),
+)
+
+
+@lru_cache
+def reference_ranges() -> tuple[RefRange, ...]:
+    """Rangos vigentes, del más específico (con sexo, franja más angosta) al más general."""
+    ranges = DEFAULT_RANGES
+    if settings.VITALS_REFERENCE_RANGES:
+        ranges = tuple(RefRange(**r) for r in json.loads(settings.VITALS_REFERENCE_RANGES))
+    return tuple(sorted(ranges, key=lambda r: (r.sex is None, (r.age_max or 200) - r.age_min)))
+
+
+def _status_expr(dialect: str):
+    """CASE que calcula el status de cada fila de vitals (unida a su paciente)."""
+    age = func.coalesce(years_between(dialect, Patient.birth_date, Vital.date), settings.VITALS_DEFAULT_AGE)
+
+    whens = []
+    for r in reference_ranges():
+        cond = [Vital.metric_code == r.metric_code, age >= r.age_min]
+        if r.age_max is not None:
+            cond.append(age < r.age_max)
+        if r.sex:
+            cond.append(Patient.sex == r.sex)
+        high = [Vital.num_value > r.high]
+        low = [Vital.num_value < r.low]
+        if r.high2 is not None:
+            high.append(Vital.num_value2 > r.high2)
+        if r.low2 is not None:
+            low.append(Vital.num_value2 < r.low2)
+        whens.append((
+            and_(*cond),
+            case(
+                (or_(*high), literal(VitalStatus.Alto.value)),
+                (or_(*low), literal(VitalStatus.Bajo.value)),
+                else_=literal(VitalStatus.Normal.value),
+            ),
+        ))
+    return case(*whens, else_=Vital.status)
+
+
+async def classify_vitals(db: AsyncSession, *where) -> None:
+    """Reclasifica con un solo UPDATE las lecturas numéricas que cumplen `where`. No hace commit."""
+    await db.execute(
+        update(Vital)
+        .where(Vital.patient_id == Patient.id, Vital.num_value.is_not(None), *where)
+        .values(status=_status_expr(dialect_name(db)))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def backfill(chunk: int) -> int:
+    """Reclasifica toda la tabla vitals en tramos de `chunk` ids (keyset), un commit por tramo."""
+    total, last_id = 0, ""
+    async with SessionLocal() as db:
+        while True:
+            res = await db.execute(
+                select(Vital.id).where(Vital.id > last_id).order_by(Vital.id).limit(chunk)
+            )
+            ids = res.scalars().all()
+            if not ids:
+                return total
+            await classify_vitals(db, Vital.id > last_id, Vital.id <= ids[-1])
+            await db.commit()
+            total += len(ids)
+            last_id = ids[-1]
+            logger.info("Vitals reclasificados: %s", total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reclasifica el status de todos los signos vitales.")
+    parser.add_argument("--chunk", type=int, default=5000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(f"{asyncio.run(backfill(args.chunk))} filas revisadas")